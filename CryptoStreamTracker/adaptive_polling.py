@@ -0,0 +1,148 @@
+import math
+import statistics
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import clock
+
+
+class AdaptiveCadence:
+    """Controlador del intervalo de ingesta de precios según el estado del mercado.
+
+    La presión (0 = calma, 1 = máxima actividad) sale del mayor de tres factores:
+    volatilidad realizada entre sondeos, tasa de alertas en la última hora y una
+    alerta MARKET_CRASH reciente. El intervalo va de max_interval a min_interval
+    de forma geométrica con la presión, y el presupuesto de llamadas restante a la
+    API fija un mínimo: cuanto menos queda, más se espacian los sondeos.
+    """
+
+    def __init__(self, min_interval: float = 15, max_interval: float = 300,
+                 budget_per_hour: int = 300, calm_volatility: float = 0.05,
+                 high_volatility: float = 0.15, high_alert_rate: float = 6,
+                 crash_hold: float = 1800, volatility_window: float = 1800, hysteresis: float = 0.15):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_hour = budget_per_hour
+        # Volatilidad en % por raíz de minuto (2% diario ≈ 0.05, 6% diario ≈ 0.16)
+        self.calm_volatility = calm_volatility
+        self.high_volatility = high_volatility
+        self.high_alert_rate = high_alert_rate  # alertas/hora que llevan al intervalo mínimo
+        self.crash_hold = crash_hold
+        self.volatility_window = volatility_window
+        self.hysteresis = hysteresis  # cambios relativos menores no reprograman el sondeo
+
+        self.interval = max_interval
+        self.samples = deque()  # (timestamp, {symbol: precio})
+        self.alert_times = deque()
+        self.last_crash = None
+        self.daily_changes: List[float] = []
+        self.last_factors: Dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, prices: Dict[str, Dict], new_alerts: List, now: Optional[float] = None):
+        """Registra un snapshot de precios y las alertas que generó"""
+        now = now if now is not None else clock.timestamp()
+        with self._lock:
+            snapshot = {symbol: data.get('current_price') for symbol, data in prices.items()
+                        if data.get('current_price')}
+            if snapshot and (not self.samples or self.samples[-1][1] != snapshot):
+                self.samples.append((now, snapshot))
+            while self.samples and self.samples[0][0] < now - self.volatility_window:
+                self.samples.popleft()
+
+            for alert in new_alerts:
+                self.alert_times.append(now)
+                if getattr(alert.alert_type, 'value', None) == 'market_crash':
+                    self.last_crash = now
+            while self.alert_times and self.alert_times[0] < now - 3600:
+                self.alert_times.popleft()
+
+            # Respaldo hasta tener dos muestras: cambio de 24h llevado a escala de minuto
+            self.daily_changes = [abs(data.get('price_change_24h') or 0) for data in prices.values()]
+
+    def realized_volatility(self) -> Optional[float]:
+        """RMS de los retornos logarítmicos (en %) normalizados a raíz de minuto"""
+        squared = []
+        samples = list(self.samples)
+        for (t0, prev), (t1, curr) in zip(samples, samples[1:]):
+            minutes = (t1 - t0) / 60
+            if minutes <= 0:
+                continue
+            for symbol, price in curr.items():
+                if prev.get(symbol):
+                    ret = math.log(price / prev[symbol]) * 100
+                    squared.append(ret * ret / minutes)
+        return math.sqrt(statistics.fmean(squared)) if squared else None
+
+    def _volatility(self) -> float:
+        realized = self.realized_volatility()
+        if realized is not None:
+            return realized
+        changes = self.daily_changes
+        return statistics.median(changes) / math.sqrt(1440) if changes else 0.0
+
+    def budget_floor(self, calls_last_hour: int) -> float:
+        """Intervalo mínimo permitido por el presupuesto de llamadas restante"""
+        if self.budget_per_hour <= 0:
+            return self.min_interval
+        remaining = self.budget_per_hour - calls_last_hour
+        if remaining <= 0:
+            return self.max_interval
+        floor = max(self.min_interval, 3600 / self.budget_per_hour)
+        # Por debajo de la mitad del presupuesto el mínimo crece hasta max_interval
+        remaining_fraction = remaining / self.budget_per_hour
+        if remaining_fraction < 0.5:
+            floor = floor / (remaining_fraction * 2)
+        return min(self.max_interval, floor)
+
+    def next_interval(self, calls_last_hour: int = 0, now: Optional[float] = None) -> float:
+        """Calcula y guarda el intervalo para el próximo sondeo"""
+        now = now if now is not None else clock.timestamp()
+        with self._lock:
+            volatility = self._volatility()
+            span = self.high_volatility - self.calm_volatility
+            volatility_pressure = min(1.0, max(0.0, (volatility - self.calm_volatility) / span))
+            alert_rate = len(self.alert_times)
+            alert_pressure = min(1.0, alert_rate / self.high_alert_rate)
+            crash_active = self.last_crash is not None and now - self.last_crash < self.crash_hold
+            pressure = 1.0 if crash_active else max(volatility_pressure, alert_pressure)
+
+            interval = self.max_interval * (self.min_interval / self.max_interval) ** pressure
+            floor = self.budget_floor(calls_last_hour)
+            target = max(interval, floor)
+            if abs(target - self.interval) / self.interval > self.hysteresis:
+                self.interval = round(target, 1)
+
+            if crash_active:
+                reason = 'market_crash'
+            elif floor > interval:
+                reason = 'rate_budget'
+            elif pressure == 0:
+                reason = 'calm'
+            else:
+                reason = 'volatility' if volatility_pressure >= alert_pressure else 'alert_rate'
+
+            self.last_factors = {
+                'volatility': round(volatility, 4),
+                'volatility_pressure': round(volatility_pressure, 3),
+                'alerts_last_hour': alert_rate,
+                'alert_pressure': round(alert_pressure, 3),
+                'market_crash': crash_active,
+                'pressure': round(pressure, 3),
+                'api_calls_last_hour': calls_last_hour,
+                'budget_floor_seconds': round(floor, 1),
+                'target_interval_seconds': round(target, 1),
+                'reason': reason
+            }
+            return self.interval
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return dict(
+                self.last_factors,
+                interval_seconds=self.interval,
+                min_interval_seconds=self.min_interval,
+                max_interval_seconds=self.max_interval,
+                budget_per_hour=self.budget_per_hour
+            )
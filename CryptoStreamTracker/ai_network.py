@@ -4,8 +4,9 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-import feedparser
 import re
+import clock
+from text_matcher import get_matcher
 
 @dataclass
 class AIResponse:
@@ -19,12 +20,9 @@ class AIResponse:
 class CharlyNews:
     """IA especializada en noticias cripto actuales"""
     
-    def __init__(self):
+    def __init__(self, news_ingester=None):
         self.name = "charly_news"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'CharlyNet-News-AI/1.0'
-        })
+        self.news_ingester = news_ingester
     
     def get_current_news(self) -> AIResponse:
         """Obtiene y resume noticias cripto actuales"""
@@ -32,42 +30,28 @@ class CharlyNews:
             news_sources = []
             all_headlines = []
             
-            # Fuentes RSS especializadas
-            rss_feeds = [
-                'https://cointelegraph.com/rss',
-                'https://coindesk.com/arc/outboundfeeds/rss/',
-                'https://decrypt.co/feed',
-                'https://bitcoinmagazine.com/.rss/full/'
-            ]
-            
-            for feed_url in rss_feeds:
-                try:
-                    feed = feedparser.parse(feed_url)
-                    source_name = feed.feed.get('title', 'RSS Feed')
-                    news_sources.append(source_name)
-                    
-                    for entry in feed.entries[:3]:  # Top 3 por fuente
-                        published = entry.get('published_parsed')
-                        if published:
-                            pub_date = datetime(*published[:6])
-                            # Solo noticias de las últimas 12 horas
-                            if pub_date > datetime.now() - timedelta(hours=12):
-                                all_headlines.append({
-                                    'title': entry.get('title', ''),
-                                    'source': source_name,
-                                    'time': pub_date,
-                                    'url': entry.get('link', ''),
-                                    'summary': entry.get('summary', '')[:200]
-                                })
-                except Exception as e:
-                    logging.warning(f"Error parsing feed {feed_url}: {str(e)}")
+            if self.news_ingester:
+                # Consulta al almacén compartido: los feeds se descargan una vez por ciclo
+                self.news_ingester.ensure_fresh()
+                
+                # Top 3 por fuente de las últimas 12 horas
+                for article in self.news_ingester.store.recent(hours=12, per_source_limit=3):
+                    if article['source'] not in news_sources:
+                        news_sources.append(article['source'])
+                    all_headlines.append({
+                        'title': article['title'],
+                        'source': article['source'],
+                        'time': article['published'],
+                        'url': article['url'],
+                        'summary': article['summary'][:200]
+                    })
             
             # Analizar y resumir noticias
             analysis = self._analyze_news(all_headlines)
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=analysis,
                 confidence=0.85,
                 data_sources=news_sources,
@@ -78,13 +62,25 @@ class CharlyNews:
             logging.error(f"Error in charly_news: {str(e)}")
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error obteniendo noticias: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
                 recommendations=[]
             )
     
+    def search_news(self, query: Optional[str] = None, symbol: Optional[str] = None,
+                    hours: float = 48, limit: int = 10) -> List[Dict]:
+        """Consulta el archivo local de noticias (BM25) en lugar de descargar feeds"""
+        if not self.news_ingester:
+            return []
+        try:
+            since = clock.now() - timedelta(hours=hours)
+            return self.news_ingester.store.search(query=query, symbol=symbol, since=since, limit=limit)
+        except Exception as e:
+            logging.error(f"Error searching news archive: {str(e)}")
+            return []
+    
     def _analyze_news(self, headlines: List[Dict]) -> str:
         """Analiza y resume las noticias"""
         if not headlines:
@@ -99,20 +95,12 @@ class CharlyNews:
             'security': []
         }
         
+        # Primera categoría en orden de prioridad con algún término del título
+        matcher = get_matcher()
         for headline in headlines:
-            title_lower = headline['title'].lower()
-            if any(word in title_lower for word in ['regulation', 'sec', 'law', 'legal', 'government']):
-                categories['regulation'].append(headline)
-            elif any(word in title_lower for word in ['upgrade', 'protocol', 'blockchain', 'technology']):
-                categories['technology'].append(headline)
-            elif any(word in title_lower for word in ['price', 'market', 'trading', 'rally', 'crash']):
-                categories['market'].append(headline)
-            elif any(word in title_lower for word in ['adoption', 'partnership', 'integration', 'accept']):
-                categories['adoption'].append(headline)
-            elif any(word in title_lower for word in ['hack', 'security', 'breach', 'exploit']):
-                categories['security'].append(headline)
-            else:
-                categories['market'].append(headline)  # Default
+            counts = matcher.match(headline['title']).counts
+            category = next((name for name in categories if counts[name]), 'market')
+            categories[category].append(headline)
         
         summary = []
         summary.append("📰 RESUMEN DE NOTICIAS CRIPTO (Últimas 12h)")
@@ -135,7 +123,7 @@ class CharlyNews:
                     summary.append(f"  Fuente: {news['source']}")
         
         summary.append(f"\n📊 Total: {len(headlines)} noticias analizadas")
-        summary.append(f"🕒 Última actualización: {datetime.now().strftime('%H:%M:%S')}")
+        summary.append(f"🕒 Última actualización: {clock.now().strftime('%H:%M:%S')}")
         
         return "\n".join(summary)
     
@@ -144,16 +132,12 @@ class CharlyNews:
         recommendations = []
         
         # Analizar sentimiento general
-        positive_words = ['rally', 'surge', 'adoption', 'partnership', 'upgrade', 'bullish']
-        negative_words = ['crash', 'hack', 'regulation', 'ban', 'bearish', 'decline']
-        
         positive_count = 0
         negative_count = 0
         
-        for headline in headlines:
-            title_lower = headline['title'].lower()
-            positive_count += sum(1 for word in positive_words if word in title_lower)
-            negative_count += sum(1 for word in negative_words if word in title_lower)
+        for result in get_matcher().score_batch(headline['title'] for headline in headlines):
+            positive_count += result.counts['news_positive']
+            negative_count += result.counts['news_negative']
         
         if positive_count > negative_count * 1.5:
             recommendations.append("Las noticias muestran tendencia positiva - Considerar posiciones optimistas")
@@ -210,7 +194,7 @@ class PriceTracer:
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(analysis),
                 confidence=0.92,
                 data_sources=['CoinMarketCap API'],
@@ -220,7 +204,7 @@ class PriceTracer:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error verificando precios: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -258,23 +242,13 @@ class Sentinella:
             reliability_score = 0
             total_headlines = len(headlines)
             
-            # Palabras que indican sesgo o sensacionalismo
-            bias_indicators = [
-                'moon', 'crash', 'explode', 'rocket', 'pump', 'dump',
-                'shocking', 'amazing', 'incredible', 'unbelievable',
-                'secret', 'hidden', 'exposed', 'revealed'
-            ]
-            
-            # Palabras que indican neutralidad
-            neutral_indicators = [
-                'analysis', 'report', 'study', 'data', 'research',
-                'announced', 'launched', 'released', 'updated'
-            ]
+            # Términos de sesgo/sensacionalismo y de neutralidad (léxicos 'bias' y 'neutral')
+            matcher = get_matcher()
             
             for i, headline in enumerate(headlines):
-                headline_lower = headline.lower()
-                bias_count = sum(1 for word in bias_indicators if word in headline_lower)
-                neutral_count = sum(1 for word in neutral_indicators if word in headline_lower)
+                counts = matcher.match(headline).counts
+                bias_count = counts['bias']
+                neutral_count = counts['neutral']
                 
                 if bias_count > neutral_count:
                     reliability = "TENDENCIOSO"
@@ -316,7 +290,7 @@ class Sentinella:
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(summary),
                 confidence=avg_reliability,
                 data_sources=['Análisis de texto'],
@@ -326,7 +300,7 @@ class Sentinella:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error analizando confiabilidad: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -403,11 +377,11 @@ class CharlyAlert:
                     direction = "⬆️" if change > 0 else "⬇️"
                     analysis.append(f"   {direction} {symbol}: {change:+.2f}%")
             
-            analysis.append(f"\n🕒 Evaluación: {datetime.now().strftime('%H:%M:%S')}")
+            analysis.append(f"\n🕒 Evaluación: {clock.now().strftime('%H:%M:%S')}")
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(analysis),
                 confidence=confidence,
                 data_sources=['Datos de mercado', 'Análisis de noticias'],
@@ -417,7 +391,7 @@ class CharlyAlert:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error evaluando alertas: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -511,11 +485,11 @@ class CharlyPlan:
                 action_plan.append("   • Diversificar en múltiples activos")
                 action_plan.append("   • Reservar efectivo para oportunidades")
             
-            action_plan.append(f"\n📅 Revisión siguiente: {(datetime.now() + timedelta(hours=2)).strftime('%H:%M')}")
+            action_plan.append(f"\n📅 Revisión siguiente: {(clock.now() + timedelta(hours=2)).strftime('%H:%M')}")
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(action_plan),
                 confidence=0.85,
                 data_sources=['Análisis de mercado', 'Nivel de alerta', 'Sentimiento'],
@@ -525,7 +499,7 @@ class CharlyPlan:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error generando plan: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -581,11 +555,11 @@ class IAOpinion:
                 opinion.append("   • Metodología de análisis robusta")
                 opinion.append("   • Confianza alta en resultados")
             
-            opinion.append(f"\n🕒 Validación: {datetime.now().strftime('%H:%M:%S')}")
+            opinion.append(f"\n🕒 Validación: {clock.now().strftime('%H:%M:%S')}")
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(opinion),
                 confidence=0.9 if not needs_review else 0.6,
                 data_sources=['Análisis meta-cognitivo'],
@@ -595,7 +569,7 @@ class IAOpinion:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error en segunda opinión: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -679,7 +653,7 @@ class TechnicalAnalyst:
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(analysis),
                 confidence=0.82,
                 data_sources=['Análisis técnico', 'Patrones de precio'],
@@ -689,7 +663,7 @@ class TechnicalAnalyst:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error en análisis técnico: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -771,7 +745,7 @@ class MarketCorrelation:
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(analysis),
                 confidence=0.78,
                 data_sources=['Correlaciones de mercado', 'Factores macro'],
@@ -781,7 +755,7 @@ class MarketCorrelation:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error en análisis de correlaciones: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -874,7 +848,7 @@ class OnChainAnalyst:
             
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response="\n".join(analysis),
                 confidence=0.75,
                 data_sources=['Métricas on-chain', 'Actividad blockchain'],
@@ -884,7 +858,7 @@ class OnChainAnalyst:
         except Exception as e:
             return AIResponse(
                 ai_name=self.name,
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 response=f"Error en análisis on-chain: {str(e)}",
                 confidence=0.0,
                 data_sources=[],
@@ -908,9 +882,9 @@ class OnChainAnalyst:
 class CollaborativeAINetwork:
     """Red colaborativa de IAs para análisis cripto avanzado"""
     
-    def __init__(self, crypto_service):
+    def __init__(self, crypto_service, news_ingester=None):
         self.crypto_service = crypto_service
-        self.charly_news = CharlyNews()
+        self.charly_news = CharlyNews(news_ingester)
         self.price_tracer = PriceTracer()
         self.sentinella = Sentinella()
         self.charly_alert = CharlyAlert()
@@ -929,7 +903,7 @@ class CollaborativeAINetwork:
             
             analysis_log.append("🤖 RED COLABORATIVA EXPANDIDA DE IAs ACTIVADA")
             analysis_log.append("=" * 55)
-            analysis_log.append(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            analysis_log.append(f"Timestamp: {clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
             analysis_log.append("")
             
             # Paso 1: charly_news - Noticias actuales
@@ -1062,7 +1036,7 @@ class CollaborativeAINetwork:
         report.append("=" * 35)
         report.append(f"🎯 Confianza promedio: {avg_confidence:.2f}/1.0")
         report.append(f"🤖 IAs consultadas: {len(ai_responses)}")
-        report.append(f"🕒 Análisis completado: {datetime.now().strftime('%H:%M:%S')}")
+        report.append(f"🕒 Análisis completado: {clock.now().strftime('%H:%M:%S')}")
         
         # Análisis de consenso entre IAs
         technical_ias = [r for r in ai_responses if r.ai_name in ['technical_analyst', 'market_correlation', 'onchain_analyst']]
@@ -0,0 +1,384 @@
+import argparse
+import csv
+import glob
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import accumulate, compress, islice, repeat
+from operator import ge, le, sub, truediv
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import clock
+from alert_system import Alert, AlertSystem, AlertType
+from volume_baseline import VolumeBaseline
+
+
+@dataclass
+class PriceSeries:
+    """Serie histórica de una cripto en columnas (una muestra por vela/tick)"""
+    symbol: str
+    timestamps: array
+    prices: array
+    volumes_24h: array
+    market_caps: array
+    name: str = ''
+
+
+@dataclass
+class RuleReport:
+    rule: str
+    candidates: int = 0
+    fired: int = 0
+    suppressed: int = 0
+    by_severity: Counter = field(default_factory=Counter)
+    moves_total: int = 0
+    moves_preceded: int = 0
+    lead_minutes: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'rule': self.rule,
+            'candidates': self.candidates,
+            'fired': self.fired,
+            'suppressed_by_duplicate_filter': self.suppressed,
+            'by_severity': dict(self.by_severity),
+            'large_moves': self.moves_total,
+            'large_moves_preceded': self.moves_preceded,
+            'mean_lead_minutes': round(statistics.mean(self.lead_minutes), 1) if self.lead_minutes else None,
+            'median_lead_minutes': round(statistics.median(self.lead_minutes), 1) if self.lead_minutes else None
+        }
+
+
+def load_series_csv(path: str) -> PriceSeries:
+    """Carga un CSV con columnas timestamp, price, market_cap y volume_24h (o volume por vela)"""
+    symbol = os.path.splitext(os.path.basename(path))[0].lower()
+    timestamps, prices, volumes, market_caps = array('d'), array('d'), array('d'), array('d')
+
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        rolling = 'volume_24h' not in (reader.fieldnames or [])
+        volume_column = 'volume' if rolling else 'volume_24h'
+        for row in reader:
+            raw_ts = row['timestamp']
+            try:
+                timestamps.append(float(raw_ts))
+            except ValueError:
+                timestamps.append(datetime.fromisoformat(raw_ts).timestamp())
+            prices.append(float(row['price']))
+            volumes.append(float(row.get(volume_column) or 0))
+            market_caps.append(float(row.get('market_cap') or 0))
+
+    if rolling:
+        volumes = rolling_24h_sum(timestamps, volumes)
+
+    return PriceSeries(symbol, timestamps, prices, volumes, market_caps, name=symbol.upper())
+
+
+def load_series_dir(directory: str) -> Iterator[PriceSeries]:
+    """Carga las series <símbolo>.csv de un directorio de una en una (solo una en memoria)"""
+    for path in sorted(glob.glob(os.path.join(directory, '*.csv'))):
+        yield load_series_csv(path)
+
+
+def bars_per_day(timestamps: array) -> int:
+    """Número de velas en 24h según el paso de la serie"""
+    if len(timestamps) < 2:
+        return 1
+    step = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+    return max(1, round(86400 / step))
+
+
+def rolling_24h_sum(timestamps: array, volumes: array) -> array:
+    """Convierte volumen por vela en volumen móvil de 24h usando sumas acumuladas"""
+    lag = bars_per_day(timestamps)
+    cumulative = array('d', accumulate(volumes, initial=0.0))
+    head = cumulative[1:lag + 1]
+    tail = map(sub, islice(cumulative, lag + 1, None), islice(cumulative, 1, None))
+    return array('d', head) + array('d', tail)
+
+
+class AlertBacktester:
+    """Reproduce historial de precios a través de las reglas de AlertSystem con reloj simulado.
+
+    Las reglas de precio y mercado se evalúan por columnas (una pasada map/compress
+    por símbolo) en vez de un bucle Python por tick; solo los candidatos que superan
+    el umbral llegan a los check_* reales para construir la alerta con su severidad y
+    mensaje. VOLUME_SURGE depende de la línea base exponencial, que es secuencial:
+    cada instante de evaluación pasa por check_volume_alerts con el reloj simulado
+    en el tiempo de la serie, igual que el sondeo en vivo.
+    """
+
+    def __init__(self, alert_system: AlertSystem, eval_interval: int = 300,
+                 large_move_pct: float = 10.0, move_horizon_minutes: int = 240,
+                 lead_lookback_hours: int = 24, min_market_coins: int = 5):
+        self.alert_system = alert_system
+        self.eval_interval = eval_interval  # cadencia de evaluación de alertas (intervalo máximo del sondeo adaptativo)
+        self.min_market_coins = min_market_coins  # menos monedas en un instante no permiten juzgar al mercado
+        self.large_move_pct = large_move_pct
+        self.move_horizon_minutes = move_horizon_minutes
+        self.lead_lookback = lead_lookback_hours * 3600
+
+    def run(self, series_list: Iterable[PriceSeries]) -> Dict:
+        """Ejecuta el backtest y devuelve el reporte por regla.
+
+        Las series se procesan de una en una y solo se conservan sus agregados
+        (conteos de mercado, alertas disparadas e inicios de movimientos), así que
+        series_list puede ser un generador como load_series_dir.
+        """
+        started = time.perf_counter()
+        thresholds = self.alert_system.thresholds
+        window = self.alert_system.duplicate_window.total_seconds()
+
+        reports = {alert_type.value: RuleReport(alert_type.value) for alert_type in (
+            AlertType.PRICE_SPIKE, AlertType.PRICE_DROP, AlertType.VOLUME_SURGE, AlertType.MARKET_CRASH
+        )}
+        fired_times: Dict[str, Dict[str, List[float]]] = {rule: {} for rule in reports}
+        drop_counts = Counter()
+        present_counts = Counter()
+        move_onsets: Dict[str, List[float]] = {}
+        points = 0
+        series_count = 0
+
+        for series in series_list:
+            series_count += 1
+            n = len(series.prices)
+            points += n
+            lag = bars_per_day(series.timestamps)
+            if n <= lag:
+                continue
+            stride = max(1, round(self.eval_interval * lag / 86400))
+
+            # Cambio 24h en cada instante de evaluación (ratio precio[t] / precio[t-24h])
+            eval_ts = series.timestamps[lag::stride]
+            ratios = array('d', map(truediv, series.prices[lag::stride], series.prices[0:n - lag:stride]))
+            eval_idx = range(lag, n, stride)
+
+            high = thresholds['price_change_24h']['high']
+            spikes = list(compress(eval_idx, map(ge, ratios, repeat(1 + high / 100))))
+            drops = list(compress(eval_idx, map(le, ratios, repeat(1 - high / 100))))
+            self._fire(series, spikes, AlertType.PRICE_SPIKE, reports, fired_times, window)
+            self._fire(series, drops, AlertType.PRICE_DROP, reports, fired_times, window)
+
+            # La línea base de volumen se alimenta desde la primera vela, como el sondeo en vivo
+            surges = self._volume_surges(series, range(0, n, stride))
+            self._fire(series, sorted(surges), AlertType.VOLUME_SURGE, reports, fired_times, window,
+                       build=surges.get)
+
+            # Conteos por instante para la regla de crash de mercado, sobre una rejilla común de
+            # eval_interval para que series desalineadas coincidan; cada moneda cuenta una vez por
+            # instante (su última evaluación dentro de él)
+            crash_drop = 1 + thresholds['market_crash']['drop'] / 100
+            grid = dict(zip(
+                (ts - ts % self.eval_interval for ts in eval_ts),
+                map(le, ratios, repeat(crash_drop))
+            ))
+            present_counts.update(grid.keys())
+            drop_counts.update(ts for ts, dropping in grid.items() if dropping)
+
+            move_onsets[series.symbol] = self._large_move_onsets(series)
+
+        self._fire_market_crash(drop_counts, present_counts, reports, fired_times, window)
+        self._measure_lead_times(move_onsets, reports, fired_times)
+
+        return {
+            'series': series_count,
+            'points': points,
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+            'rules': [report.to_dict() for report in reports.values()]
+        }
+
+    def _volume_surges(self, series: PriceSeries, eval_idx: range) -> Dict[int, Alert]:
+        """Alertas de volumen por instante de evaluación, con la línea base y la regla de
+        respaldo (volumen/market cap mientras calienta) de check_volume_alerts"""
+        surges = {}
+        simulated = clock.SimulatedClock(series.timestamps[0])
+        previous = clock.set_clock(simulated)
+        try:
+            for i in eval_idx:
+                simulated.advance_to(series.timestamps[i])
+                for alert in self.alert_system.check_volume_alerts(self._snapshot(series, i)):
+                    surges[i] = alert
+        finally:
+            clock.set_clock(previous)
+        return surges
+
+    def _fire(self, series: PriceSeries, candidates: List[int], alert_type: AlertType,
+              reports: Dict[str, RuleReport], fired_times: Dict, window: float,
+              build: Optional[Callable[[int], Optional[Alert]]] = None):
+        """Aplica filter_duplicate_alerts a los candidatos y construye las alertas disparadas"""
+        build = build or (lambda i: self._build_alert(series, i, alert_type))
+        report = reports[alert_type.value]
+        report.candidates += len(candidates)
+        if not candidates:
+            return
+
+        times = [series.timestamps[i] for i in candidates]
+        fired = fired_times[alert_type.value].setdefault(series.symbol, [])
+        pos = 0
+        while pos < len(candidates):
+            i = candidates[pos]
+            alert = build(i)
+            if alert:
+                report.fired += 1
+                report.by_severity[alert.severity] += 1
+                fired.append(times[pos])
+            # Todo candidato dentro de la ventana de duplicados queda suprimido
+            next_pos = bisect_left(times, times[pos] + window, pos + 1)
+            report.suppressed += next_pos - pos - 1
+            pos = next_pos
+
+    @staticmethod
+    def _snapshot(series: PriceSeries, i: int) -> Dict:
+        """Datos de la serie en la vela i con el formato de CryptoService.get_all_prices"""
+        lag = bars_per_day(series.timestamps)
+        change = (series.prices[i] / series.prices[i - lag] - 1) * 100 if i >= lag else 0.0
+        return {series.symbol: {
+            'name': series.name or series.symbol.upper(),
+            'current_price': series.prices[i],
+            'price_change_24h': change,
+            'volume_24h': series.volumes_24h[i],
+            'market_cap': series.market_caps[i]
+        }}
+
+    def _build_alert(self, series: PriceSeries, i: int, alert_type: AlertType):
+        """Evalúa el snapshot simulado con la lógica check_* real"""
+        alerts = self.alert_system.check_price_alerts(self._snapshot(series, i))
+        for alert in alerts:
+            if alert.alert_type == alert_type:
+                alert.timestamp = datetime.fromtimestamp(series.timestamps[i])
+                return alert
+        return None
+
+    def _fire_market_crash(self, drop_counts: Counter,
+                           present_counts: Counter, reports: Dict[str, RuleReport],
+                           fired_times: Dict, window: float):
+        """Regla de mercado: porcentaje de criptos cayendo en cada instante"""
+        report = reports[AlertType.MARKET_CRASH.value]
+        share = self.alert_system.thresholds['market_crash']['share']
+        drop = self.alert_system.thresholds['market_crash']['drop']
+        crash_times = sorted(
+            ts for ts, count in drop_counts.items()
+            if present_counts[ts] >= self.min_market_coins and count / present_counts[ts] * 100 >= share
+        )
+        report.candidates = len(crash_times)
+
+        fired = fired_times[AlertType.MARKET_CRASH.value].setdefault('MARKET', [])
+        pos = 0
+        while pos < len(crash_times):
+            ts = crash_times[pos]
+            total = present_counts[ts]
+            dropping = drop_counts[ts]
+            snapshot = {f"c{k}": {'price_change_24h': drop if k < dropping else 0} for k in range(total)}
+            for alert in self.alert_system.check_market_alerts(snapshot):
+                report.fired += 1
+                report.by_severity[alert.severity] += 1
+                fired.append(ts)
+            next_pos = bisect_left(crash_times, ts + window, pos + 1)
+            report.suppressed += next_pos - pos - 1
+            pos = next_pos
+
+    def _large_move_onsets(self, series: PriceSeries) -> List[float]:
+        """Inicios de movimientos grandes: |precio[t+h]/precio[t] - 1| >= large_move_pct"""
+        n = len(series.prices)
+        horizon = max(1, round(self.move_horizon_minutes * 60 * bars_per_day(series.timestamps) / 86400))
+        if n <= horizon:
+            return []
+
+        forward = array('d', map(truediv, series.prices[horizon:], series.prices[:n - horizon]))
+        up = 1 + self.large_move_pct / 100
+        down = 1 - self.large_move_pct / 100
+        moving = sorted(
+            list(compress(range(n - horizon), map(ge, forward, repeat(up)))) +
+            list(compress(range(n - horizon), map(le, forward, repeat(down))))
+        )
+
+        # Un episodio nuevo empieza cuando hay un hueco mayor que el horizonte
+        onsets = []
+        last = None
+        for i in moving:
+            if last is None or i - last > horizon:
+                onsets.append(series.timestamps[i])
+            last = i
+        return onsets
+
+    def _measure_lead_times(self, move_onsets: Dict[str, List[float]],
+                            reports: Dict[str, RuleReport], fired_times: Dict):
+        """Anticipación de la última alerta de cada regla antes de cada movimiento grande"""
+        for rule, report in reports.items():
+            by_symbol = fired_times[rule]
+            for symbol, onsets in move_onsets.items():
+                fired = by_symbol.get('MARKET' if rule == AlertType.MARKET_CRASH.value else symbol, [])
+                report.moves_total += len(onsets)
+                for onset in onsets:
+                    pos = bisect_right(fired, onset)
+                    if pos and onset - fired[pos - 1] <= self.lead_lookback:
+                        report.moves_preceded += 1
+                        report.lead_minutes.append((onset - fired[pos - 1]) / 60)
+
+
+def generate_synthetic_series(coins: int, days: int, step_seconds: int = 60, seed: int = 7) -> List[PriceSeries]:
+    """Genera paseos aleatorios por minuto para medir el rendimiento del backtest"""
+    rng = random.Random(seed)
+    n = days * 86400 // step_seconds
+    start = datetime(2024, 1, 1).timestamp()
+    timestamps = array('d', range(0, n * step_seconds, step_seconds))
+    timestamps = array('d', map(float.__add__, timestamps, repeat(start)))
+
+    series_list = []
+    for c in range(coins):
+        volatility = rng.uniform(0.0005, 0.003)
+        shocks = [rng.gauss(1.0, volatility) for _ in range(n)]
+        prices = array('d', accumulate(shocks, float.__mul__, initial=rng.uniform(0.1, 50000.0)))[1:]
+        market_cap = rng.uniform(1e8, 1e11)
+        volumes = array('d', map(float.__mul__, repeat(market_cap * rng.uniform(0.02, 0.4) / 1440, n),
+                                 (rng.lognormvariate(0, 0.5) for _ in range(n))))
+        series_list.append(PriceSeries(
+            symbol=f"coin{c}",
+            timestamps=timestamps,
+            prices=prices,
+            volumes_24h=rolling_24h_sum(timestamps, volumes),
+            market_caps=array('d', repeat(market_cap, n)),
+            name=f"COIN{c}"
+        ))
+    return series_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de reglas de alertas sobre historial de precios")
+    parser.add_argument('data_dir', nargs='?', help="Directorio con archivos <símbolo>.csv")
+    parser.add_argument('--synthetic-coins', type=int, default=0, help="Usar N series sintéticas en vez de CSV")
+    parser.add_argument('--days', type=int, default=30, help="Días de datos sintéticos por minuto")
+    parser.add_argument('--eval-interval', type=int, default=300, help="Segundos entre evaluaciones de alertas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.synthetic_coins:
+        load_start = time.perf_counter()
+        data = generate_synthetic_series(args.synthetic_coins, args.days)
+        print(f"Datos sintéticos generados en {time.perf_counter() - load_start:.1f}s")
+    elif args.data_dir:
+        data = load_series_dir(args.data_dir)
+    else:
+        parser.error("Indicar data_dir o --synthetic-coins")
+
+    # Historial en un directorio temporal: el backtest no debe tocar alert_history.json
+    with tempfile.TemporaryDirectory(prefix='backtest_') as workdir:
+        # Línea base de volumen propia del backtest, sin guardados periódicos
+        baseline = VolumeBaseline(os.path.join(workdir, 'volume_baseline.json'), save_interval=float('inf'))
+        alert_system = AlertSystem(None, history_path=os.path.join(workdir, 'alert_history.json'),
+                                   volume_baseline=baseline)
+        backtester = AlertBacktester(alert_system, eval_interval=args.eval_interval)
+        result = backtester.run(data)
+
+    print(f"Backtest: {result['series']} series, {result['points']:,} puntos en {result['elapsed_seconds']}s")
+    for rule in result['rules']:
+        print(rule)
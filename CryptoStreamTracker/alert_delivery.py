@@ -0,0 +1,325 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class WebhookSink:
+    name: str
+    url: str
+    max_concurrency: int = 2
+    batch_size: int = 50
+    queue_size: int = 1000
+    timeout: float = 5.0
+    max_retries: int = 3
+
+
+class SinkWorker:
+    """Cola y pool de hilos dedicados a un destino webhook"""
+
+    def __init__(self, sink: WebhookSink, dead_letter, flush_interval: float, backoff_base: float):
+        self.sink = sink
+        self.dead_letter = dead_letter
+        self.flush_interval = flush_interval
+        self.backoff_base = backoff_base
+        self.queue = queue.Queue(maxsize=sink.queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.stats = {
+            'delivered': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed': 0,
+            'dropped': 0
+        }
+        self._stats_lock = threading.Lock()
+
+        # Una sesión con pool keep-alive del tamaño de la concurrencia del destino
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=sink.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'User-Agent': 'CharlyNet-Alert-Dispatcher/1.0'
+        })
+
+    def start(self):
+        """Arranca los hilos del destino (uno por nivel de concurrencia)"""
+        for i in range(self.sink.max_concurrency):
+            thread = threading.Thread(
+                target=self._run, name=f"webhook-{self.sink.name}-{i}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Detiene los hilos tras vaciar lo que quede en la cola"""
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.session.close()
+
+    def offer(self, payload: Dict) -> bool:
+        """Encola una alerta sin bloquear; si la cola está llena va al dead-letter"""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            self._count('dropped')
+            self.dead_letter.write(self.sink, [payload], 'queue_full')
+            return False
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _next_batch(self) -> List[Dict]:
+        """Espera la primera alerta y agrupa las siguientes hasta batch_size o flush_interval"""
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.sink.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+
+    def _deliver(self, batch: List[Dict]):
+        """Envía un lote con reintentos y backoff exponencial"""
+        last_error = None
+        for attempt in range(self.sink.max_retries + 1):
+            if attempt > 0:
+                self._count('retries')
+                time.sleep(self.backoff_base * (2 ** (attempt - 1)))
+            try:
+                response = self.session.post(
+                    self.sink.url, json={'alerts': batch}, timeout=self.sink.timeout
+                )
+                if response.status_code < 400:
+                    self._count('delivered', len(batch))
+                    self._count('batches')
+                    return
+                # Los errores 4xx (excepto 429) no se arreglan reintentando
+                last_error = f"HTTP {response.status_code}"
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            except requests.exceptions.RequestException as e:
+                last_error = str(e)
+
+        self._count('failed', len(batch))
+        logging.warning(f"Webhook {self.sink.name} failed after retries: {last_error}")
+        self.dead_letter.write(self.sink, batch, last_error)
+
+
+class DeadLetterFile:
+    """Archivo JSONL con las alertas que no pudieron entregarse"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, sink: Optional[WebhookSink], batch: List[Dict], reason: Optional[str]):
+        """Añade un registro; sink None es el desborde de la cola del dispatcher (antes de repartir)"""
+        name = sink.name if sink else 'dispatcher'
+        try:
+            record = {
+                'timestamp': datetime.now().isoformat(),
+                'sink': name,
+                'url': sink.url if sink else None,
+                'reason': reason,
+                'alerts': batch
+            }
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except Exception as e:
+            logging.error(f"Error writing dead letter for {name}: {str(e)}")
+
+
+class AlertDispatcher:
+    """Entrega asíncrona de alertas por lotes a destinos webhook"""
+
+    def __init__(self, sinks: List[WebhookSink], queue_size: int = 10000,
+                 flush_interval: float = 0.5, backoff_base: float = 1.0,
+                 dead_letter_path: str = 'alert_dead_letter.jsonl'):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dead_letter = DeadLetterFile(dead_letter_path)
+        self.workers = [
+            SinkWorker(sink, self.dead_letter, flush_interval, backoff_base)
+            for sink in sinks
+        ]
+        self.stop_event = threading.Event()
+        self.router = None
+        self.submitted = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'AlertDispatcher':
+        """Crea el dispatcher a partir de ALERT_WEBHOOK_URLS (separadas por comas)"""
+        urls = [u.strip() for u in os.environ.get('ALERT_WEBHOOK_URLS', '').split(',') if u.strip()]
+        concurrency = int(os.environ.get('ALERT_WEBHOOK_CONCURRENCY', 2))
+        sinks = [
+            WebhookSink(name=f"sink{i}", url=url, max_concurrency=concurrency)
+            for i, url in enumerate(urls)
+        ]
+        return cls(sinks)
+
+    def start(self):
+        """Arranca el router y los pools de cada destino"""
+        if not self.workers or self.router:
+            return
+        for worker in self.workers:
+            worker.start()
+        self.router = threading.Thread(target=self._route, name='alert-dispatcher', daemon=True)
+        self.router.start()
+        logging.info(f"Alert dispatcher started with {len(self.workers)} webhook sinks")
+
+    def stop(self, timeout: float = 5.0):
+        """Detiene el router y los destinos"""
+        self.stop_event.set()
+        if self.router:
+            self.router.join(timeout)
+        for worker in self.workers:
+            worker.stop(timeout)
+
+    def submit(self, alerts) -> int:
+        """Encola alertas para entrega; nunca bloquea al llamador"""
+        if not self.workers:
+            return 0
+
+        accepted = 0
+        overflow = []
+        for alert in alerts:
+            payload = alert.to_dict() if hasattr(alert, 'to_dict') else alert
+            try:
+                self.queue.put_nowait(payload)
+                accepted += 1
+            except queue.Full:
+                overflow.append(payload)
+
+        with self._lock:
+            self.submitted += accepted
+            self.dropped += len(overflow)
+        if overflow:
+            logging.warning(f"Alert dispatcher queue full, {len(overflow)} alerts sent to dead letter")
+            self.dead_letter.write(None, overflow, 'dispatcher_queue_full')
+        return accepted
+
+    def _route(self):
+        """Reparte cada alerta a la cola de todos los destinos"""
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                payload = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            for worker in self.workers:
+                worker.offer(payload)
+
+    def get_status(self) -> Dict:
+        """Estado del dispatcher y métricas por destino"""
+        return {
+            'running': self.router is not None and self.router.is_alive(),
+            'queue_depth': self.queue.qsize(),
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'sinks': [
+                {
+                    'name': worker.sink.name,
+                    'url': worker.sink.url,
+                    'queue_depth': worker.queue.qsize(),
+                    'max_concurrency': worker.sink.max_concurrency,
+                    **worker.stats
+                }
+                for worker in self.workers
+            ]
+        }
+
+
+def benchmark_delivery(total_alerts: int = 20000, sinks: int = 2, latency: float = 0.005) -> Dict:
+    """Mide alertas/seg entregadas contra un servidor HTTP local de prueba"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import tempfile
+
+    received = {'alerts': 0}
+    lock = threading.Lock()
+
+    class StubSink(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)  # Simula un receptor lento
+            with lock:
+                received['alerts'] += len(json.loads(body)['alerts'])
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSink)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+
+    dead_letter = os.path.join(tempfile.mkdtemp(), 'dead_letter.jsonl')
+    dispatcher = AlertDispatcher(
+        [WebhookSink(name=f"stub{i}", url=url, max_concurrency=4, queue_size=total_alerts) for i in range(sinks)],
+        queue_size=total_alerts, flush_interval=0.05, dead_letter_path=dead_letter
+    )
+    dispatcher.start()
+
+    alerts = [
+        {'id': f"bench_{i}", 'timestamp': datetime.now().isoformat(), 'crypto_symbol': 'btc',
+         'alert_type': 'price_spike', 'message': 'benchmark', 'severity': 'high',
+         'value': 16.0, 'threshold': 15, 'is_active': True}
+        for i in range(total_alerts)
+    ]
+
+    start = time.perf_counter()
+    dispatcher.submit(alerts)
+    submit_elapsed = time.perf_counter() - start
+
+    expected = total_alerts * sinks
+    while received['alerts'] < expected and time.perf_counter() - start < 120:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    dispatcher.stop()
+    server.shutdown()
+
+    return {
+        'alerts_delivered': received['alerts'],
+        'elapsed_seconds': round(elapsed, 3),
+        'alerts_per_second': round(received['alerts'] / elapsed, 1),
+        'submit_seconds': round(submit_elapsed, 4)
+    }
+
+
+if __name__ == "__main__":
+    print("Benchmark de entrega de alertas (servidor HTTP local):")
+    print(benchmark_delivery())
@@ -0,0 +1,268 @@
+import base64
+import json
+import logging
+import math
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class AlertStore:
+    """Diario persistente de alertas con índices secundarios en SQLite.
+
+    Un trigger mantiene conteos por hora, severidad y tipo (alert_rollups) en la
+    misma transacción que cada inserción, así los resúmenes leen buckets en vez de
+    recorrer alertas.
+    """
+
+    def __init__(self, db_path: str = 'alerts.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        """Crea la tabla del diario y sus índices si no existen"""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id TEXT PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    crypto_symbol TEXT NOT NULL,
+                    alert_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    record TEXT NOT NULL
+                )
+            """)
+            # Índices secundarios: cada filtro se resuelve con un rango sobre (campo, ts)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_symbol ON alerts (crypto_symbol, ts, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts (severity, ts, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts (alert_type, ts, id)")
+            self._create_rollup_schema()
+
+    def _create_rollup_schema(self):
+        """Tabla de conteos por hora y trigger que la actualiza; rellena desde el diario la primera vez"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alert_rollups'"
+        ).fetchone()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS alert_rollups (
+                hour INTEGER NOT NULL,
+                severity TEXT NOT NULL,
+                alert_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (hour, severity, alert_type)
+            ) WITHOUT ROWID
+        """)
+        # Los INSERT OR IGNORE de ids repetidos no disparan el trigger, así que no se cuentan dos veces
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS alerts_rollup AFTER INSERT ON alerts BEGIN
+                INSERT INTO alert_rollups (hour, severity, alert_type, count)
+                VALUES (CAST(NEW.ts / 3600 AS INTEGER) * 3600, NEW.severity, NEW.alert_type, 1)
+                ON CONFLICT (hour, severity, alert_type) DO UPDATE SET count = count + 1;
+            END
+        """)
+        if not exists:
+            self._conn.execute("""
+                INSERT INTO alert_rollups (hour, severity, alert_type, count)
+                SELECT CAST(ts / 3600 AS INTEGER) * 3600, severity, alert_type, COUNT(*)
+                FROM alerts GROUP BY 1, 2, 3
+            """)
+
+    def append(self, alerts: List[Dict]) -> int:
+        """Agrega alertas (en formato diccionario) al diario; ignora ids repetidos"""
+        if not alerts:
+            return 0
+
+        rows = [
+            (
+                a['id'],
+                datetime.fromisoformat(a['timestamp']).timestamp(),
+                a['crypto_symbol'],
+                a['alert_type'],
+                a['severity'],
+                json.dumps(a)
+            )
+            for a in alerts
+        ]
+
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO alerts (id, ts, crypto_symbol, alert_type, severity, record) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return cursor.rowcount
+
+    def query(self, symbol: Optional[str] = None, severity: Optional[str] = None,
+              alert_type: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, limit: int = 50,
+              cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Consulta alertas más recientes primero con paginación por cursor"""
+        clauses = []
+        params = []
+
+        if symbol:
+            clauses.append("crypto_symbol = ?")
+            params.append(symbol)
+        if severity:
+            clauses.append("severity = ?")
+            params.append(severity)
+        if alert_type:
+            clauses.append("alert_type = ?")
+            params.append(alert_type)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since.timestamp())
+        if until:
+            clauses.append("ts < ?")
+            params.append(until.timestamp())
+        if cursor:
+            cursor_ts, cursor_id = self.decode_cursor(cursor)
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params.extend([cursor_ts, cursor_ts, cursor_id])
+
+        sql = "SELECT id, ts, record FROM alerts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        # Pedimos una fila extra para saber si hay página siguiente
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(last['ts'], last['id'])
+
+        return [json.loads(row['record']) for row in rows], next_cursor
+
+    def rollups(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                group_by: Sequence[str] = ('severity', 'alert_type'),
+                bucket: Optional[str] = None) -> List[Dict]:
+        """Conteos de alertas agregados desde los buckets horarios.
+
+        group_by: cualquier combinación de 'severity' y 'alert_type'.
+        bucket: None (todo el rango), 'hour', 'day' o 'week' (en hora local).
+        Las horas completas del rango salen de los rollups; las horas parciales de
+        los extremos se cuentan en el diario con el índice por ts, así que el
+        resultado respeta since/until exactos.
+        """
+        for key in group_by:
+            if key not in ('severity', 'alert_type'):
+                raise ValueError(f"Unknown group_by field: {key}")
+        if bucket not in (None, 'hour', 'day', 'week'):
+            raise ValueError(f"Unknown bucket: {bucket}")
+
+        start = since.timestamp() if since else None
+        end = until.timestamp() if until else None
+        # Horas completas: [full_start, full_end)
+        full_start = math.ceil(start / 3600) * 3600 if start is not None else None
+        full_end = math.floor(end / 3600) * 3600 if end is not None else None
+
+        # Los campos vienen de la lista blanca de arriba
+        columns = (['hour'] if bucket else []) + list(group_by)
+        group = f" GROUP BY {', '.join(columns)}" if columns else ''
+        queries = []
+        if full_start is not None and full_end is not None and full_start >= full_end:
+            # El rango no contiene ninguna hora completa
+            queries.append(self._journal_counts(columns, group, start, end))
+        else:
+            clauses = []
+            params = []
+            if full_start is not None:
+                clauses.append("hour >= ?")
+                params.append(full_start)
+            if full_end is not None:
+                clauses.append("hour < ?")
+                params.append(full_end)
+            sql = f"SELECT {', '.join(columns + ['SUM(count) AS count'])} FROM alert_rollups"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            queries.append((sql + group, params))
+            if start is not None and start < full_start:
+                queries.append(self._journal_counts(columns, group, start, full_start))
+            if end is not None and full_end < end:
+                queries.append(self._journal_counts(columns, group, full_end, end))
+
+        with self._lock:
+            rows = [row for sql, params in queries for row in self._conn.execute(sql, params).fetchall()]
+
+        totals = defaultdict(int)
+        for row in rows:
+            if not row['count']:
+                continue
+            key = tuple(row[field] for field in group_by)
+            if bucket:
+                key = (self._bucket_start(row['hour'], bucket),) + key
+            totals[key] += row['count']
+
+        fields = (('bucket',) if bucket else ()) + tuple(group_by)
+        return [dict(zip(fields, key), count=count) for key, count in sorted(totals.items())]
+
+    @staticmethod
+    def _journal_counts(columns: List[str], group: str, start: float, end: float) -> Tuple[str, List]:
+        """Consulta de conteos sobre el diario para un tramo [start, end) menor que una hora"""
+        selected = [
+            'CAST(ts / 3600 AS INTEGER) * 3600 AS hour' if column == 'hour' else column
+            for column in columns
+        ]
+        sql = f"SELECT {', '.join(selected + ['COUNT(*) AS count'])} FROM alerts WHERE ts >= ? AND ts < ?"
+        return sql + group, [start, end]
+
+    @staticmethod
+    def _bucket_start(hour: int, bucket: str) -> str:
+        start = datetime.fromtimestamp(hour)
+        if bucket in ('day', 'week'):
+            start = start.replace(hour=0)
+        if bucket == 'week':
+            start = datetime.fromordinal(start.toordinal() - start.weekday())
+        return start.isoformat()
+
+    def summarize(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict:
+        """Total y conteos por severidad y por tipo en un rango"""
+        by_severity, by_type = Counter(), Counter()
+        for row in self.rollups(since, until, group_by=('severity', 'alert_type')):
+            by_severity[row['severity']] += row['count']
+            by_type[row['alert_type']] += row['count']
+        return {
+            'total': sum(by_severity.values()),
+            'by_severity': dict(by_severity),
+            'by_type': dict(by_type)
+        }
+
+    def count(self) -> int:
+        """Número total de alertas en el diario"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    @staticmethod
+    def encode_cursor(ts: float, alert_id: str) -> str:
+        """Codifica la posición (ts, id) como cursor opaco"""
+        raw = json.dumps([ts, alert_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        """Decodifica un cursor; lanza ValueError si es inválido"""
+        try:
+            ts, alert_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return float(ts), str(alert_id)
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def close(self):
+        """Cierra la conexión con la base de datos"""
+        try:
+            with self._lock:
+                self._conn.close()
+        except Exception as e:
+            logging.error(f"Error closing alert store: {str(e)}")
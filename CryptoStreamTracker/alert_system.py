@@ -1,10 +1,14 @@
 import logging
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import json
 import os
+import clock
+from alert_store import AlertStore
+from volume_baseline import VolumeBaseline
 
 class AlertType(Enum):
     PRICE_SPIKE = "price_spike"
@@ -25,18 +29,58 @@ class Alert:
     threshold: float
     is_active: bool = True
 
+    def to_dict(self) -> Dict:
+        """Convierte la alerta a un diccionario serializable en JSON"""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp.isoformat(),
+            'crypto_symbol': self.crypto_symbol,
+            'alert_type': self.alert_type.value,
+            'message': self.message,
+            'severity': self.severity,
+            'value': self.value,
+            'threshold': self.threshold,
+            'is_active': self.is_active
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Alert':
+        """Reconstruye una alerta desde su diccionario JSON"""
+        return cls(
+            id=data['id'],
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            crypto_symbol=data['crypto_symbol'],
+            alert_type=AlertType(data['alert_type']),
+            message=data['message'],
+            severity=data['severity'],
+            value=data['value'],
+            threshold=data['threshold'],
+            is_active=data['is_active']
+        )
+
 class AlertSystem:
     """Sistema de alertas automáticas para criptomonedas"""
     
-    def __init__(self, crypto_service):
+    def __init__(self, crypto_service, alert_store: Optional[AlertStore] = None, dispatcher=None,
+                 volume_baseline: Optional[VolumeBaseline] = None,
+                 history_path: str = 'alert_history.json'):
         self.crypto_service = crypto_service
+        self.history_path = history_path
+        self.alert_store = alert_store
+        self.dispatcher = dispatcher
+        self.volume_baseline = volume_baseline
+        # En un seguidor las alertas las genera el líder: las activas se leen del diario
+        self.read_only = False
         self.alerts = []
         self.alert_history = []
         self.thresholds = {
             'price_change_24h': {'high': 15, 'medium': 10, 'low': 5},
             'volume_change': {'high': 100, 'medium': 50, 'low': 25},
-            'market_cap_change': {'high': 20, 'medium': 15, 'low': 10}
+            'volume_zscore': {'high': 4.5, 'medium': 3.0},
+            'market_cap_change': {'high': 20, 'medium': 15, 'low': 10},
+            'market_crash': {'drop': -10, 'share': 70}
         }
+        self.duplicate_window = timedelta(hours=4)
         self.load_alert_history()
     
     def check_price_alerts(self, current_data: Dict) -> List[Alert]:
@@ -55,8 +99,8 @@ class AlertSystem:
                 
                 direction = "subido" if price_change > 0 else "bajado"
                 alert = Alert(
-                    id=f"{symbol}_{alert_type.value}_{datetime.now().isoformat()}",
-                    timestamp=datetime.now(),
+                    id=f"{symbol}_{alert_type.value}_{clock.now().isoformat()}",
+                    timestamp=clock.now(),
                     crypto_symbol=symbol,
                     alert_type=alert_type,
                     message=f"🚨 {crypto_name} ({symbol.upper()}) ha {direction} {abs(price_change):.2f}% en 24h. Precio actual: ${current_price:,.2f}",
@@ -69,7 +113,60 @@ class AlertSystem:
         return new_alerts
     
     def check_volume_alerts(self, current_data: Dict) -> List[Alert]:
-        """Verifica alertas de volumen"""
+        """Verifica alertas de volumen contra la línea base de cada cripto"""
+        if not self.volume_baseline:
+            return self.check_volume_ratio_alerts(current_data)
+        
+        new_alerts = []
+        warming_up = {}
+        
+        for symbol, data in current_data.items():
+            volume_24h = data.get('volume_24h', 0)
+            current_price = data.get('current_price', 0)
+            crypto_name = data.get('name', symbol.upper())
+            
+            warm = self.volume_baseline.is_warm(symbol)
+            baseline = self.volume_baseline.get_baseline(symbol)
+            scores = self.volume_baseline.update(symbol, volume_24h, current_price)
+            
+            # Sin historial suficiente se usa la regla volumen/market cap
+            if not warm:
+                warming_up[symbol] = data
+                continue
+            if scores is None:
+                continue
+            
+            volume_z, return_z = scores
+            if volume_z >= self.thresholds['volume_zscore']['medium']:
+                # Volumen anómalo acompañado de un movimiento de precio anómalo es más grave
+                if volume_z >= self.thresholds['volume_zscore']['high'] or abs(return_z) >= self.thresholds['volume_zscore']['medium']:
+                    severity = "high"
+                else:
+                    severity = "medium"
+                
+                multiple = volume_24h / baseline['typical_volume'] if baseline['typical_volume'] > 0 else 0
+                
+                alert = Alert(
+                    id=f"{symbol}_volume_surge_{clock.now().isoformat()}",
+                    timestamp=clock.now(),
+                    crypto_symbol=symbol,
+                    alert_type=AlertType.VOLUME_SURGE,
+                    message=f"📊 {crypto_name} ({symbol.upper()}) muestra volumen anómalo: {multiple:.1f}x su volumen habitual (z={volume_z:.1f})",
+                    severity=severity,
+                    value=volume_z,
+                    threshold=self.thresholds['volume_zscore']['medium']
+                )
+                new_alerts.append(alert)
+        
+        self.volume_baseline.save()
+        
+        if warming_up:
+            new_alerts.extend(self.check_volume_ratio_alerts(warming_up))
+        
+        return new_alerts
+    
+    def check_volume_ratio_alerts(self, current_data: Dict) -> List[Alert]:
+        """Verifica alertas de volumen por ratio volumen/market cap"""
         new_alerts = []
         
         for symbol, data in current_data.items():
@@ -85,8 +182,8 @@ class AlertSystem:
                     severity = "high" if volume_ratio >= self.thresholds['volume_change']['high'] else "medium"
                     
                     alert = Alert(
-                        id=f"{symbol}_volume_surge_{datetime.now().isoformat()}",
-                        timestamp=datetime.now(),
+                        id=f"{symbol}_volume_surge_{clock.now().isoformat()}",
+                        timestamp=clock.now(),
                         crypto_symbol=symbol,
                         alert_type=AlertType.VOLUME_SURGE,
                         message=f"📊 {crypto_name} ({symbol.upper()}) muestra volumen anómalo: {volume_ratio:.2f}% del market cap en 24h",
@@ -108,31 +205,32 @@ class AlertSystem:
         
         for symbol, data in current_data.items():
             price_change = data.get('price_change_24h', 0)
-            if price_change <= -10:
+            if price_change <= self.thresholds['market_crash']['drop']:
                 major_drops += 1
         
         # Si más del 70% del mercado está cayendo fuertemente
         crash_percentage = (major_drops / total_cryptos) * 100
-        if crash_percentage >= 70:
+        if crash_percentage >= self.thresholds['market_crash']['share']:
             alert = Alert(
-                id=f"market_crash_{datetime.now().isoformat()}",
-                timestamp=datetime.now(),
+                id=f"market_crash_{clock.now().isoformat()}",
+                timestamp=clock.now(),
                 crypto_symbol="MARKET",
                 alert_type=AlertType.MARKET_CRASH,
                 message=f"🔴 ALERTA DE MERCADO: {crash_percentage:.0f}% de las criptomonedas están cayendo más del 10%. Posible crash del mercado detectado.",
                 severity="critical",
                 value=crash_percentage,
-                threshold=70
+                threshold=self.thresholds['market_crash']['share']
             )
             new_alerts.append(alert)
         
         return new_alerts
     
-    def process_alerts(self) -> List[Alert]:
-        """Procesa todas las alertas automáticamente"""
+    def process_alerts(self, current_data: Optional[Dict] = None) -> List[Alert]:
+        """Procesa todas las alertas automáticamente (sobre current_data si se indica)"""
         try:
             # Obtener datos actuales
-            current_data = self.crypto_service.get_all_prices()
+            if current_data is None:
+                current_data = self.crypto_service.get_all_prices()
             if not current_data:
                 return []
             
@@ -152,6 +250,11 @@ class AlertSystem:
             
             # Guardar historial
             self.save_alert_history()
+            self.journal_alerts(filtered_alerts)
+            
+            # Entrega asíncrona a webhooks (no bloquea si los receptores son lentos)
+            if self.dispatcher and filtered_alerts:
+                self.dispatcher.submit(filtered_alerts)
             
             return filtered_alerts
             
@@ -161,7 +264,7 @@ class AlertSystem:
     
     def filter_duplicate_alerts(self, new_alerts: List[Alert]) -> List[Alert]:
         """Filtra alertas duplicadas de las últimas 4 horas"""
-        cutoff_time = datetime.now() - timedelta(hours=4)
+        cutoff_time = clock.now() - self.duplicate_window
         
         filtered = []
         for alert in new_alerts:
@@ -181,9 +284,26 @@ class AlertSystem:
     
     def get_active_alerts(self) -> List[Alert]:
         """Obtiene alertas activas de las últimas 24 horas"""
-        cutoff_time = datetime.now() - timedelta(hours=24)
+        cutoff_time = clock.now() - timedelta(hours=24)
+        if self.read_only and self.alert_store:
+            return self._journal_alerts_since(cutoff_time)
         return [alert for alert in self.alerts if alert.timestamp > cutoff_time and alert.is_active]
     
+    def _journal_alerts_since(self, since: datetime, page_size: int = 500) -> List[Alert]:
+        """Alertas activas del diario desde since, de la más antigua a la más reciente"""
+        try:
+            alerts, cursor = [], None
+            while True:
+                page, cursor = self.query_alerts(since=since, limit=page_size, cursor=cursor)
+                alerts.extend(alert for alert in page if alert.timestamp > since and alert.is_active)
+                if not cursor:
+                    break
+            alerts.reverse()
+            return alerts
+        except Exception as e:
+            logging.error(f"Error leyendo alertas activas del diario: {str(e)}")
+            return []
+    
     def get_critical_alerts(self) -> List[Alert]:
         """Obtiene solo alertas críticas activas"""
         active_alerts = self.get_active_alerts()
@@ -223,21 +343,9 @@ class AlertSystem:
                 self.alert_history = self.alert_history[-1000:]
             
             # Convertir alertas a diccionarios para JSON
-            alert_data = []
-            for alert in self.alert_history[-100:]:  # Guardar solo las últimas 100
-                alert_data.append({
-                    'id': alert.id,
-                    'timestamp': alert.timestamp.isoformat(),
-                    'crypto_symbol': alert.crypto_symbol,
-                    'alert_type': alert.alert_type.value,
-                    'message': alert.message,
-                    'severity': alert.severity,
-                    'value': alert.value,
-                    'threshold': alert.threshold,
-                    'is_active': alert.is_active
-                })
+            alert_data = [alert.to_dict() for alert in self.alert_history[-100:]]  # Guardar solo las últimas 100
             
-            with open('alert_history.json', 'w') as f:
+            with open(self.history_path, 'w') as f:
                 json.dump(alert_data, f, indent=2)
                 
         except Exception as e:
@@ -246,23 +354,59 @@ class AlertSystem:
     def load_alert_history(self):
         """Carga el historial de alertas"""
         try:
-            if os.path.exists('alert_history.json'):
-                with open('alert_history.json', 'r') as f:
+            if os.path.exists(self.history_path):
+                with open(self.history_path, 'r') as f:
                     alert_data = json.load(f)
                 
                 for data in alert_data:
-                    alert = Alert(
-                        id=data['id'],
-                        timestamp=datetime.fromisoformat(data['timestamp']),
-                        crypto_symbol=data['crypto_symbol'],
-                        alert_type=AlertType(data['alert_type']),
-                        message=data['message'],
-                        severity=data['severity'],
-                        value=data['value'],
-                        threshold=data['threshold'],
-                        is_active=data['is_active']
-                    )
-                    self.alert_history.append(alert)
+                    self.alert_history.append(Alert.from_dict(data))
+                
+                # Indexar el historial existente (los ids repetidos se ignoran)
+                self.journal_alerts(self.alert_history)
                     
         except Exception as e:
-            logging.error(f"Error cargando historial de alertas: {str(e)}")
\ No newline at end of file
+            logging.error(f"Error cargando historial de alertas: {str(e)}")
+    
+    def journal_alerts(self, alerts: List[Alert]):
+        """Registra alertas en el diario indexado"""
+        if not self.alert_store or not alerts:
+            return
+        
+        try:
+            self.alert_store.append([alert.to_dict() for alert in alerts])
+        except Exception as e:
+            logging.error(f"Error registrando alertas en el diario: {str(e)}")
+    
+    def query_alerts(self, symbol: Optional[str] = None, severity: Optional[str] = None,
+                     alert_type: Optional[str] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, limit: int = 50,
+                     cursor: Optional[str] = None) -> Tuple[List[Alert], Optional[str]]:
+        """Consulta el diario de alertas usando los índices secundarios"""
+        if not self.alert_store:
+            return [], None
+        
+        records, next_cursor = self.alert_store.query(
+            symbol=symbol, severity=severity, alert_type=alert_type,
+            since=since, until=until, limit=limit, cursor=cursor
+        )
+        return [Alert.from_dict(record) for record in records], next_cursor
+    
+    def count_alerts(self, since: datetime, until: Optional[datetime] = None) -> Dict:
+        """Total y conteos por severidad/tipo en [since, until): horas completas desde los
+        rollups del diario y los extremos parciales desde las alertas indexadas por ts.
+        
+        Sin diario (backtest) se cuentan las alertas en memoria.
+        """
+        if self.alert_store:
+            try:
+                return self.alert_store.summarize(since, until)
+            except Exception as e:
+                logging.error(f"Error leyendo rollups de alertas: {str(e)}")
+        
+        until = until or clock.now()
+        recent = [a for a in self.alert_history if since <= a.timestamp < until]
+        return {
+            'total': len(recent),
+            'by_severity': dict(Counter(a.severity for a in recent)),
+            'by_type': dict(Counter(a.alert_type.value for a in recent))
+        }
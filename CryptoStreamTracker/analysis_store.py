@@ -0,0 +1,97 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class AnalysisStore:
+    """Historial de análisis del AutoScheduler en SQLite como buffer circular.
+
+    Cada análisis ocupa el slot seq % capacity, así que el archivo nunca pasa de
+    `capacity` filas: al llenarse, cada nuevo análisis sobrescribe el más antiguo.
+    Las consultas por rango de tiempo usan el índice sobre ts.
+    """
+
+    def __init__(self, db_path: str = 'analysis_history.db', capacity: int = 720):
+        self.db_path = db_path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+        row = self._conn.execute("SELECT MAX(seq) FROM analyses").fetchone()
+        self._next_seq = (row[0] + 1) if row[0] is not None else 0
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    slot INTEGER PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    ts REAL NOT NULL,
+                    record TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_ts ON analyses (ts)")
+
+    def append(self, analysis: Dict):
+        """Guarda un análisis sobrescribiendo el slot más antiguo si el buffer está lleno"""
+        ts = datetime.fromisoformat(analysis['timestamp']).timestamp()
+        record = json.dumps(analysis, separators=(',', ':'), ensure_ascii=False, default=str)
+        try:
+            with self._lock, self._conn:
+                seq = self._next_seq
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analyses (slot, seq, ts, record) VALUES (?, ?, ?, ?)",
+                    (seq % self.capacity, seq, ts, record)
+                )
+                self._next_seq = seq + 1
+        except sqlite3.Error as e:
+            logging.error(f"Error persisting analysis: {str(e)}")
+
+    def latest(self) -> Optional[Dict]:
+        """Último análisis guardado"""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM analyses ORDER BY seq DESC LIMIT 1").fetchone()
+        return json.loads(row['record']) if row else None
+
+    def recent(self, limit: int = 24, since: Optional[datetime] = None,
+               until: Optional[datetime] = None) -> List[Dict]:
+        """Análisis más recientes primero, opcionalmente acotados por rango de tiempo"""
+        clauses = []
+        params = []
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since.timestamp())
+        if until:
+            clauses.append("ts < ?")
+            params.append(until.timestamp())
+
+        sql = "SELECT record FROM analyses"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, seq DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row['record']) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_status(self) -> Dict:
+        return {
+            'db_path': self.db_path,
+            'capacity': self.capacity,
+            'stored': self.count(),
+            'total_appended': self._next_seq
+        }
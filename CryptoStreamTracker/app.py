@@ -1,16 +1,25 @@
 import os
 import logging
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from flask_cors import CORS
-from apscheduler.schedulers.background import BackgroundScheduler
 from crypto_service import CryptoService
 from crypto_assistant import CryptoAssistant, llamar_asistente
-from alert_system import AlertSystem
+from alert_system import AlertSystem, AlertType
+from alert_store import AlertStore
+from analysis_store import AnalysisStore
+from alert_delivery import AlertDispatcher
+from volume_baseline import VolumeBaseline
+from leader_election import LeaderElection
+from job_runtime import SchedulerRuntime
 from voice_system import VoiceSystem
 from external_sources import ExternalSources
 from auto_scheduler import AutoScheduler
 from ai_network import CollaborativeAINetwork
+from shared_state import SharedSnapshot
+from apscheduler.triggers.interval import IntervalTrigger
 import atexit
+import clock
+from datetime import datetime, timedelta
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -22,31 +31,189 @@ app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 # Enable CORS for API endpoints
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-# Initialize all systems
-crypto_service = CryptoService()
-crypto_assistant = CryptoAssistant(crypto_service)
-alert_system = AlertSystem(crypto_service)
-voice_system = VoiceSystem()
-external_sources = ExternalSources()
-ai_network = CollaborativeAINetwork(crypto_service)
-auto_scheduler = AutoScheduler(crypto_service, alert_system, voice_system, external_sources)
-
-# Initialize scheduler for periodic updates
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=crypto_service.update_prices,
-    trigger="interval",
-    seconds=60,  # Update every minute
-    id='update_crypto_prices'
-)
-scheduler.start()
-
-# Start auto-scheduler (60min loop)
-auto_scheduler.start()
-
-# Shut down the schedulers when exiting the app
-atexit.register(lambda: scheduler.shutdown())
-atexit.register(lambda: auto_scheduler.stop())
+# Systems are created by init_runtime(), never at import: the process pool workers (forkserver)
+# re-run the entry script in each child and must not start threads or elect a leader
+crypto_service = None
+crypto_assistant = None
+alert_store = None
+alert_dispatcher = None
+alert_system = None
+job_runtime = None
+voice_system = None
+external_sources = None
+ai_network = None
+analysis_store = None
+auto_scheduler = None
+leader_election = None
+# State the leader publishes for followers, and analyses requested by followers
+leader_state = None
+force_requests = None
+_force_handled = 0.0
+_runtime_started = False
+
+def start_scheduled_jobs():
+    """Start periodic jobs; only runs in the process elected as scheduler leader"""
+    global _force_handled
+    crypto_service.read_only = False
+    alert_system.read_only = False
+    external_sources.news_ingester.read_only = False
+    # Requests made before this election were for the previous leader
+    _force_handled = clock.timestamp()
+
+    # Publish in-memory leader state for followers every 15s (first run right away)
+    auto_scheduler.scheduler.add_job(
+        func=publish_leader_state,
+        trigger=IntervalTrigger(seconds=15),
+        id='publish_leader_state',
+        name='Publish leader state for followers',
+        next_run_time=clock.now(),
+        max_instances=1,
+        coalesce=True,
+        executor='io'
+    )
+
+    # Start auto-scheduler (60min loop plus adaptive price/alert polling)
+    auto_scheduler.start()
+
+    # Start shared news ingestion (each feed fetched once per cycle)
+    external_sources.news_ingester.start()
+
+    # Start Reddit streaming ingestion (only when credentials or a replay file are configured)
+    if external_sources.reddit_ingester:
+        external_sources.reddit_ingester.start()
+
+def market_sentiment_payload():
+    """External market sentiment as served by /api/external-sources"""
+    result = external_sources.get_market_sentiment()
+    return {
+        'sentiment_analysis': result['summary'],
+        'mood': result['mood'],
+        'sources': {
+            name: {'status': source['status'], 'updated': source['updated']}
+            for name, source in result['sources'].items()
+        },
+        'coins': result['coins'],
+        'generated_at': result['timestamp'],
+        'cache': external_sources.market_sentiment_cache.get_status()
+    }
+
+def publish_leader_state():
+    """Publish leader-only in-memory state for followers and run the analyses they requested"""
+    global _force_handled
+    requested = force_requests.read()
+    if requested and requested['published_at'] > _force_handled:
+        _force_handled = requested['published_at']
+        logging.info(f"Running analysis requested by follower {requested['pid']}")
+        job_runtime.submit('io', auto_scheduler.force_analysis)
+
+    sections = {
+        'market_sentiment': market_sentiment_payload,
+        'sentiment': external_sources.sentiment.snapshot,
+        'scheduler_status': auto_scheduler.get_scheduler_status,
+        'metrics': lambda: auto_scheduler.telemetry.render_metrics() + job_runtime.render_metrics()
+    }
+    state = {}
+    for name, build in sections.items():
+        try:
+            state[name] = build()
+        except Exception as e:
+            logging.error(f"Error building leader state section {name}: {str(e)}")
+    try:
+        leader_state.publish(state)
+    except OSError as e:
+        logging.error(f"Error publishing leader state: {str(e)}")
+
+def init_runtime():
+    """Create all systems, elect the scheduler leader and start background workers (once per process)"""
+    global crypto_service, crypto_assistant, alert_store, alert_dispatcher, alert_system, job_runtime
+    global voice_system, external_sources, ai_network, analysis_store, auto_scheduler, leader_election
+    global leader_state, force_requests, _runtime_started
+    if _runtime_started:
+        return app
+
+    # Initialize all systems
+    crypto_service = CryptoService(snapshot=SharedSnapshot('prices_snapshot.json'))
+    crypto_assistant = CryptoAssistant(crypto_service)
+    alert_store = AlertStore()
+    alert_dispatcher = AlertDispatcher.from_env()
+    alert_system = AlertSystem(crypto_service, alert_store=alert_store, dispatcher=alert_dispatcher,
+                               volume_baseline=VolumeBaseline())
+    # One scheduler runtime with io, cpu and voice job executors; speech has its own single worker
+    job_runtime = SchedulerRuntime()
+    voice_system = VoiceSystem(backend=os.environ.get('VOICE_BACKEND'))
+    external_sources = ExternalSources()
+    ai_network = CollaborativeAINetwork(crypto_service, news_ingester=external_sources.news_ingester)
+    analysis_store = AnalysisStore()
+    auto_scheduler = AutoScheduler(crypto_service, alert_system, voice_system, external_sources,
+                                   analysis_store=analysis_store, runtime=job_runtime)
+
+    leader_state = SharedSnapshot('leader_state.json')
+    force_requests = SharedSnapshot('force_analysis_request.json')
+
+    # Followers read what the leader shares: price snapshot, alert journal, news store and
+    # leader state; start_scheduled_jobs() lifts this when the process is elected
+    crypto_service.read_only = True
+    alert_system.read_only = True
+    external_sources.news_ingester.read_only = True
+
+    # One leader per host runs the scheduled jobs; followers take over when it dies
+    leader_election = LeaderElection()
+    leader_election.start(on_elected=start_scheduled_jobs)
+
+    # Start webhook delivery workers (no-op without ALERT_WEBHOOK_URLS)
+    alert_dispatcher.start()
+
+    # Start full-text extraction pool for newly ingested articles
+    external_sources.article_extractor.start()
+
+    _runtime_started = True
+    # Shut down the scheduler when exiting the app
+    atexit.register(shutdown_runtime)
+    return app
+
+def shutdown_runtime():
+    """Stop background workers and release the leader lock (atexit; also used by tests)"""
+    global _runtime_started
+    if not _runtime_started:
+        return
+    _runtime_started = False
+
+    hooks = [
+        auto_scheduler.stop,
+        job_runtime.shutdown,
+        voice_system.stop,
+        alert_dispatcher.stop,
+        alert_store.close,
+        lambda: alert_system.volume_baseline.save(force=True),
+        analysis_store.close,
+        external_sources.news_ingester.stop,
+        external_sources.article_extractor.stop,
+    ]
+    if external_sources.reddit_ingester:
+        hooks.append(external_sources.reddit_ingester.stop)
+    # Leadership is released last so a follower never takes over while our jobs still run
+    hooks.append(leader_election.release)
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logging.error(f"Error during shutdown: {str(e)}")
+
+def leader_state_section(name):
+    """Section of the state last published by the leader, or None before its first publish"""
+    payload = leader_state.read()
+    if not payload:
+        return None
+    return payload['data'].get(name)
+
+def leader_state_unavailable():
+    """Answer for a follower that has not yet seen the leader's state (right after startup)"""
+    return jsonify({
+        'error': 'Leader state not available',
+        'message': 'This process is a follower and the scheduler leader has not published its state yet',
+        'leader': False,
+        'leadership': leader_election.get_status()
+    }), 503
 
 @app.route('/')
 def index():
@@ -208,16 +375,139 @@ def get_alerts():
             'message': str(e)
         }), 500
 
-@app.route('/api/external-sources')
-def get_external_sources():
-    """Get external market sentiment"""
+@app.route('/api/alerts/query')
+def query_alerts():
+    """Query the alert journal with filters and cursor pagination"""
     try:
-        sentiment_summary = external_sources.get_market_sentiment_summary()
+        symbol = request.args.get('symbol')
+        severity = request.args.get('severity')
+        alert_type = request.args.get('alert_type')
+        cursor = request.args.get('cursor')
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        
+        if symbol and symbol.upper() != 'MARKET':
+            symbol = symbol.lower()
+        elif symbol:
+            symbol = 'MARKET'
+        
+        if severity and severity not in ('low', 'medium', 'high', 'critical'):
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': f'Unknown severity: {severity}'
+            }), 400
+        
+        if alert_type:
+            try:
+                alert_type = AlertType(alert_type).value
+            except ValueError:
+                return jsonify({
+                    'error': 'Invalid parameter',
+                    'message': f'Unknown alert_type: {alert_type}'
+                }), 400
+        
+        try:
+            since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': 'since/until must be ISO 8601 timestamps'
+            }), 400
+        
+        try:
+            alerts, next_cursor = alert_system.query_alerts(
+                symbol=symbol, severity=severity, alert_type=alert_type,
+                since=since, until=until, limit=limit, cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': str(e)
+            }), 400
+        
         return jsonify({
             'success': True,
-            'sentiment_analysis': sentiment_summary,
+            'data': [alert.to_dict() for alert in alerts],
+            'count': len(alerts),
+            'next_cursor': next_cursor,
             'timestamp': crypto_service.get_last_update_time()
         })
+    except Exception as e:
+        logging.error(f"Error querying alerts: {str(e)}")
+        return jsonify({
+            'error': 'Failed to query alerts',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/alerts/rollups')
+def get_alert_rollups():
+    """Alert counts from hourly rollups, bucketed by hour/day/week"""
+    try:
+        bucket = request.args.get('bucket', 'day')
+        group_by = [field for field in request.args.get('group_by', 'severity').split(',') if field]
+        days = min(max(request.args.get('days', 7, type=int), 1), 366)
+        
+        try:
+            since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else clock.now() - timedelta(days=days)
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': 'since/until must be ISO 8601 timestamps'
+            }), 400
+        
+        try:
+            buckets = alert_store.rollups(since=since, until=until, group_by=group_by,
+                                          bucket=None if bucket == 'none' else bucket)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': buckets,
+            'summary': alert_store.summarize(since=since, until=until),
+            'since': since.isoformat(),
+            'until': until.isoformat() if until else None
+        })
+    except Exception as e:
+        logging.error(f"Error getting alert rollups: {str(e)}")
+        return jsonify({
+            'error': 'Failed to get alert rollups',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/alerts/delivery')
+def get_alert_delivery_status():
+    """Get webhook delivery queue and per-sink metrics"""
+    try:
+        return jsonify({
+            'success': True,
+            'delivery': alert_dispatcher.get_status()
+        })
+    except Exception as e:
+        logging.error(f"Error fetching delivery status: {str(e)}")
+        return jsonify({
+            'error': 'Failed to fetch delivery status',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/external-sources')
+def get_external_sources():
+    """Get external market sentiment (served from cache, refreshed in the background when stale)"""
+    try:
+        if leader_election.is_leader:
+            payload = market_sentiment_payload()
+        else:
+            payload = leader_state_section('market_sentiment')
+            if payload is None:
+                return leader_state_unavailable()
+            payload = dict(payload, leader_state=leader_state.get_status())
+        
+        return jsonify(dict(payload, success=True, leader=leader_election.is_leader,
+                            timestamp=crypto_service.get_last_update_time()))
     except Exception as e:
         logging.error(f"Error fetching external sources: {str(e)}")
         return jsonify({
@@ -225,6 +515,90 @@ def get_external_sources():
             'message': str(e)
         }), 500
 
+@app.route('/api/news/search')
+def search_news():
+    """Full-text search (BM25) over the local article archive with symbol and time filters"""
+    try:
+        query = request.args.get('q', '').strip()
+        symbol = request.args.get('symbol')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        
+        try:
+            since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': 'since/until must be ISO 8601 timestamps'
+            }), 400
+        
+        hours = request.args.get('hours', type=float)
+        if hours is not None:
+            if hours <= 0:
+                return jsonify({
+                    'error': 'Invalid parameter',
+                    'message': 'hours must be positive'
+                }), 400
+            since = clock.now() - timedelta(hours=hours)
+        
+        if not query and not symbol and not since:
+            return jsonify({
+                'error': 'Missing parameter',
+                'message': 'Provide at least one of q, symbol, hours or since'
+            }), 400
+        
+        articles = external_sources.news_store.search(
+            query=query or None, symbol=symbol, since=since, until=until, limit=limit
+        )
+        return jsonify({
+            'success': True,
+            'data': [dict(article, published=article['published'].isoformat()) for article in articles],
+            'count': len(articles)
+        })
+    except Exception as e:
+        logging.error(f"Error searching news: {str(e)}")
+        return jsonify({
+            'error': 'Failed to search news',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/sentiment')
+def get_sentiment():
+    """Get time-decayed sentiment aggregates (1h/6h/24h) for a coin or the whole market"""
+    try:
+        symbol = request.args.get('symbol')
+        if leader_election.is_leader:
+            snapshot = external_sources.sentiment.snapshot() if not symbol else None
+            aggregate = external_sources.sentiment.get(symbol) if symbol else None
+        else:
+            snapshot = leader_state_section('sentiment')
+            if snapshot is None:
+                return leader_state_unavailable()
+            aggregate = snapshot['coins'].get(symbol.upper()) if symbol else None
+
+        if not symbol:
+            return jsonify({
+                'success': True,
+                'sentiment': snapshot
+            })
+
+        if aggregate is None:
+            return jsonify({
+                'error': 'No sentiment data',
+                'message': f'No articles or posts mention {symbol.upper()} yet'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'sentiment': aggregate
+        })
+    except Exception as e:
+        logging.error(f"Error fetching sentiment aggregates: {str(e)}")
+        return jsonify({
+            'error': 'Failed to fetch sentiment',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/voice/speak', methods=['POST'])
 def speak_text():
     """Convert text to speech"""
@@ -247,6 +621,39 @@ def speak_text():
             'message': str(e)
         }), 500
 
+@app.route('/api/voice/stream')
+def stream_speech():
+    """Stream synthesized speech as WAV for playback in the browser"""
+    try:
+        text = request.args.get('text', '')
+        
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+        if len(text) > 5000:
+            return jsonify({'error': 'Text too long', 'message': 'Maximum 5000 characters'}), 400
+        
+        chunks = voice_system.stream_speech(text)
+        # The first sentence is synthesized before answering so failures get a proper status code
+        first = next(chunks, None)
+        if first is None:
+            return jsonify({
+                'error': 'Speech synthesis unavailable',
+                'message': 'No speech backend could render the text'
+            }), 503
+        
+        def generate():
+            yield first
+            yield from chunks
+        
+        return Response(stream_with_context(generate()), mimetype='audio/wav',
+                        headers={'Cache-Control': 'no-store'})
+    except Exception as e:
+        logging.error(f"Error streaming speech: {str(e)}")
+        return jsonify({
+            'error': 'Speech streaming failed',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/voice/toggle', methods=['POST'])
 def toggle_voice():
     """Toggle voice system on/off"""
@@ -268,10 +675,17 @@ def toggle_voice():
 def get_scheduler_status():
     """Get scheduler status"""
     try:
-        status = auto_scheduler.get_scheduler_status()
+        if leader_election.is_leader:
+            status = auto_scheduler.get_scheduler_status()
+        else:
+            status = leader_state_section('scheduler_status')
+            if status is None:
+                return leader_state_unavailable()
         return jsonify({
             'success': True,
             'scheduler_status': status,
+            'leadership': leader_election.get_status(),
+            'leader_state': leader_state.get_status(),
             'voice_status': voice_system.get_voice_status()
         })
     except Exception as e:
@@ -281,6 +695,52 @@ def get_scheduler_status():
             'message': str(e)
         }), 500
 
+@app.route('/api/scheduler/history')
+def get_scheduler_history():
+    """Get persisted auto-scheduler analyses, newest first"""
+    try:
+        limit = min(max(request.args.get('limit', 24, type=int), 1), 500)
+        try:
+            since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid parameter',
+                'message': 'since/until must be ISO 8601 timestamps'
+            }), 400
+        
+        history = analysis_store.recent(limit=limit, since=since, until=until)
+        return jsonify({
+            'success': True,
+            'data': history,
+            'count': len(history),
+            'store': analysis_store.get_status()
+        })
+    except Exception as e:
+        logging.error(f"Error getting scheduler history: {str(e)}")
+        return jsonify({
+            'error': 'Failed to get scheduler history',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/scheduler/metrics')
+def get_scheduler_metrics():
+    """Per-job scheduler telemetry in Prometheus text format"""
+    try:
+        if leader_election.is_leader:
+            metrics = auto_scheduler.telemetry.render_metrics() + job_runtime.render_metrics()
+        else:
+            metrics = leader_state_section('metrics')
+            if metrics is None:
+                return leader_state_unavailable()
+        return Response(metrics, mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logging.error(f"Error rendering scheduler metrics: {str(e)}")
+        return jsonify({
+            'error': 'Failed to get scheduler metrics',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/ai-network/collaborative-analysis', methods=['POST'])
 def collaborative_analysis():
     """Execute collaborative AI network analysis"""
@@ -302,6 +762,15 @@ def collaborative_analysis():
 def force_analysis():
     """Force immediate analysis"""
     try:
+        if not leader_election.is_leader:
+            # The leader picks the request up on its next state publish
+            force_requests.publish({'requested_at': clock.now().isoformat()})
+            return jsonify({
+                'success': True,
+                'queued': True,
+                'message': 'Analysis requested from the scheduler leader',
+                'leadership': leader_election.get_status()
+            }), 202
         success = auto_scheduler.force_analysis()
         return jsonify({
             'success': success,
@@ -323,6 +792,7 @@ def api_status():
         'last_update': crypto_service.get_last_update_time(),
         'supported_coins': len(crypto_service.get_supported_cryptocurrencies()),
         'auto_scheduler_running': auto_scheduler.is_running,
+        'leader': leader_election.is_leader,
         'voice_enabled': voice_system.voice_enabled
     })
 
@@ -341,6 +811,7 @@ def internal_error(error):
     }), 500
 
 if __name__ == '__main__':
+    init_runtime()
     # Initial price update
     crypto_service.update_prices()
     import os
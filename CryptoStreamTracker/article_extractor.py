@@ -0,0 +1,304 @@
+import gzip
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+import trafilatura
+from requests.adapters import HTTPAdapter
+
+from job_runtime import JobClassPool, process_context
+
+
+def extract_text(html: str, url: Optional[str] = None) -> Optional[str]:
+    """Extrae el texto principal de un HTML (se ejecuta en un proceso del pool)"""
+    return trafilatura.extract(html, url=url, include_comments=False, include_tables=False)
+
+
+class ContentCache:
+    """Texto extraído comprimido en disco, por hash de URL, con LRU por presupuesto de bytes"""
+
+    def __init__(self, directory: str = 'article_cache', max_bytes: int = 100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()  # url_hash -> tamaño comprimido
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, url_hash: str) -> str:
+        return os.path.join(self.directory, f"{url_hash}.txt.gz")
+
+    def _load_index(self):
+        """Reconstruye el orden LRU a partir del mtime de los archivos"""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.txt.gz'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            files.append((stat.st_mtime, name[:-len('.txt.gz')], stat.st_size))
+        for _, url_hash, size in sorted(files):
+            self.entries[url_hash] = size
+            self.total_bytes += size
+
+    def __contains__(self, url_hash: str) -> bool:
+        with self._lock:
+            return url_hash in self.entries
+
+    def get(self, url_hash: str) -> Optional[str]:
+        with self._lock:
+            if url_hash not in self.entries:
+                return None
+            self.entries.move_to_end(url_hash)
+        try:
+            path = self._path(url_hash)
+            os.utime(path)  # persistir el uso para el orden LRU tras reiniciar
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return f.read()
+        except OSError as e:
+            logging.warning(f"Error reading cached article {url_hash}: {str(e)}")
+            with self._lock:
+                self.total_bytes -= self.entries.pop(url_hash, 0)
+            return None
+
+    def put(self, url_hash: str, text: str):
+        data = gzip.compress(text.encode('utf-8'), compresslevel=6)
+        path = self._path(url_hash)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.total_bytes += len(data) - self.entries.pop(url_hash, 0)
+            self.entries[url_hash] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                evicted, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self._path(evicted))
+                except OSError:
+                    pass
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {'articles': len(self.entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes}
+
+
+class ArticleExtractor:
+    """Etapa de extracción de texto completo para artículos recién ingeridos.
+
+    Hilos de descarga toman artículos de una cola acotada y delegan la extracción
+    (CPU intensiva) a un pool de procesos, de modo que no compite por el GIL con
+    los hilos que atienden peticiones. Con el texto completo se vuelven a calcular
+    sentimiento y menciones en el NewsStore y en los agregados.
+    """
+
+    def __init__(self, store, analyzer, cache: Optional[ContentCache] = None, aggregator=None,
+                 session: Optional[requests.Session] = None, max_workers: int = 2,
+                 download_workers: int = 4, queue_size: int = 500, timeout: float = 10.0):
+        self.store = store
+        self.analyzer = analyzer  # provee score_texts
+        self.cache = cache or ContentCache()
+        self.aggregator = aggregator
+        self.max_workers = max_workers
+        self.download_workers = download_workers
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=download_workers, pool_maxsize=download_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.pool = None
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.stats = {'extracted': 0, 'cached': 0, 'failed': 0, 'dropped': 0, 'rescored': 0,
+                      'extract_seconds': 0.0, 'started': None}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def submit(self, articles: List[Dict]):
+        """Encola artículos nuevos sin bloquear; si la cola está llena se descartan"""
+        for article in articles:
+            try:
+                self.queue.put_nowait(article)
+            except queue.Full:
+                self._count('dropped')
+
+    def start(self):
+        """Inicia el pool de procesos y los hilos de descarga"""
+        if self.pool:
+            return
+        # JobClassPool reemplaza el pool si un worker muere (BrokenProcessPool)
+        context = process_context(__name__)
+        self.pool = JobClassPool(
+            'extract', 'process', self.max_workers,
+            lambda: ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        )
+        self.stats['started'] = time.time()
+        for i in range(self.download_workers):
+            thread = threading.Thread(target=self._run, name=f'article-extract-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.pool:
+            self.pool.shutdown(wait=False)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                article = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.process(article)
+            except Exception as e:
+                self._count('failed')
+                logging.warning(f"Error extracting article {article.get('url')}: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def process(self, article: Dict):
+        """Descarga, extrae, guarda comprimido y vuelve a puntuar un artículo"""
+        url_hash = article['url_hash']
+        if url_hash in self.cache:
+            self._count('cached')
+            return
+
+        response = self.session.get(article['url'], timeout=self.timeout)
+        response.raise_for_status()
+
+        started = time.perf_counter()
+        text = self.pool.submit(extract_text, response.text, article['url']).result(timeout=self.timeout * 3)
+        self._count('extract_seconds', time.perf_counter() - started)
+        if not text:
+            self._count('failed')
+            return
+
+        self.cache.put(url_hash, text)
+        self._count('extracted')
+        self.rescore(article, text)
+
+    def rescore(self, article: Dict, text: str):
+        """Sustituye el sentimiento de título/resumen por el del texto completo"""
+        score = self.analyzer.score_texts([article['title'] + ' ' + text])[0]
+        self.store.update_analysis(article['url_hash'], score['sentiment'], score['mentions'], body=text)
+
+        if self.aggregator:
+            published = article.get('published')
+            timestamp = published.timestamp() if isinstance(published, datetime) else None
+            self.aggregator.replace(
+                article.get('sentiment', 'neutral'), article.get('mentions', []),
+                score['sentiment'], score['mentions'], timestamp
+            )
+        self._count('rescored')
+
+    def get_status(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        elapsed = time.time() - stats['started'] if stats['started'] else 0
+        stats['articles_per_minute'] = round(stats['extracted'] / elapsed * 60, 1) if elapsed else 0.0
+        stats['queue_depth'] = self.queue.qsize()
+        stats['cache'] = self.cache.get_status()
+        stats['pool'] = self.pool.get_status() if self.pool else None
+        return stats
+
+
+def _fixture_html(i: int, paragraphs: int = 12) -> str:
+    """Artículo sintético con navegación, barra lateral y pie como una página real"""
+    body = ''.join(
+        f"<p>Bitcoin and Ethereum traders watched paragraph {j} of story {i} as markets "
+        f"moved after the latest rally, with analysts citing adoption, regulation and "
+        f"liquidity as the main drivers for the week ahead in crypto markets.</p>"
+        for j in range(paragraphs)
+    )
+    nav = ''.join(f"<li><a href='/section/{k}'>Section {k}</a></li>" for k in range(30))
+    return (
+        f"<html><head><title>Story {i}</title></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        f"<main><article><h1>Story {i}: markets rally</h1>{body}</article></main>"
+        f"<aside><ul>{nav}</ul></aside><footer>© CharlyNet fixtures</footer></body></html>"
+    )
+
+
+def benchmark_extraction(articles: int = 300, max_workers: int = 4) -> Dict:
+    """Mide artículos/minuto extraídos contra un servidor HTTP local con HTML de prueba"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import tempfile
+
+    pages = {f"/article/{i}": _fixture_html(i).encode('utf-8') for i in range(articles)}
+
+    class FixtureServer(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = pages.get(self.path, b'')
+            self.send_response(200 if body else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class NullStore:
+        def update_analysis(self, url_hash, sentiment, mentions, body=None):
+            pass
+
+    from text_matcher import get_matcher
+
+    class Analyzer:
+        def score_texts(self, texts):
+            matcher = get_matcher()
+            return [{'sentiment': matcher.sentiment(r.counts), 'mentions': r.mentions}
+                    for r in matcher.score_batch(texts)]
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    extractor = ArticleExtractor(
+        NullStore(), Analyzer(), cache=ContentCache(tempfile.mkdtemp()),
+        max_workers=max_workers, download_workers=max_workers * 2, queue_size=articles
+    )
+    extractor.start()
+
+    started = time.perf_counter()
+    extractor.submit([
+        {'url_hash': f"{i:040x}", 'url': f"{base}/article/{i}", 'title': f"Story {i}"}
+        for i in range(articles)
+    ])
+    extractor.queue.join()
+    elapsed = time.perf_counter() - started
+
+    status = extractor.get_status()
+    extractor.stop()
+    server.shutdown()
+
+    return {
+        'articles': status['extracted'],
+        'failed': status['failed'],
+        'elapsed_seconds': round(elapsed, 3),
+        'articles_per_minute': round(status['extracted'] / elapsed * 60, 1),
+        'cache_bytes': status['cache']['bytes']
+    }
+
+
+if __name__ == "__main__":
+    print("Benchmark de extracción de artículos:")
+    print(benchmark_extraction())
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+import wave
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+def stitch_wav(paths: List[str], out_path: str, gap_ms: int = 60) -> bool:
+    """Concatena WAV con el mismo formato insertando un silencio corto entre fragmentos"""
+    try:
+        params = None
+        frames = []
+        for path in paths:
+            with wave.open(path, 'rb') as wav:
+                current = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+                if params is None:
+                    params = current
+                elif current != params:
+                    logging.warning(f"Cannot stitch {path}: format {current} differs from {params}")
+                    return False
+                frames.append(wav.readframes(wav.getnframes()))
+        if params is None:
+            return False
+
+        channels, sampwidth, rate = params
+        silence = b'\x00' * (int(rate * gap_ms / 1000) * channels * sampwidth)
+        # Temporal por hilo: dos hilos que arman el mismo mensaje no escriben el mismo archivo
+        tmp_path = f"{out_path}.{threading.get_ident()}.tmp.wav"
+        try:
+            with wave.open(tmp_path, 'wb') as out:
+                out.setnchannels(channels)
+                out.setsampwidth(sampwidth)
+                out.setframerate(rate)
+                out.writeframes(silence.join(frames))
+            os.replace(tmp_path, out_path)
+        except (OSError, wave.Error):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return True
+    except (OSError, wave.Error, EOFError) as e:
+        logging.error(f"Error stitching audio fragments: {str(e)}")
+        return False
+
+
+def wav_stream_header(channels: int, sampwidth: int, rate: int) -> bytes:
+    """Cabecera WAV para un stream de longitud desconocida (tamaños al máximo, como los streams PCM)"""
+    return (
+        b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, rate, rate * channels * sampwidth,
+                                channels * sampwidth, sampwidth * 8)
+        + b'data' + struct.pack('<I', 0xFFFFFFFF)
+    )
+
+
+class AudioCache:
+    """Audio sintetizado (WAV) en disco, por texto normalizado y voz, con LRU por presupuesto de bytes.
+
+    La clave combina texto, voz, velocidad e idioma: cambiar cualquiera de ellos
+    produce otra entrada. Los mensajes con plantilla se arman con stitch() a partir
+    de fragmentos cacheados, así que solo se sintetiza la parte que no se ha dicho antes.
+    """
+
+    def __init__(self, directory: str = 'voice_cache', max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()  # clave -> tamaño del WAV
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'renders': 0, 'render_errors': 0, 'stitched': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(text: str, voice: str = '', rate: int = 0, language: str = '') -> str:
+        normalized = ' '.join(text.split())
+        return hashlib.sha1(f"{voice}|{rate}|{language}|{normalized}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _load_index(self):
+        """Reconstruye el orden LRU a partir del mtime de los archivos"""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.wav'):
+                continue
+            if name.endswith('.tmp.wav'):
+                # Restos de una escritura interrumpida
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            files.append((stat.st_mtime, name[:-len('.wav')], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def get(self, key: str) -> Optional[str]:
+        """Ruta del WAV cacheado o None"""
+        with self._lock:
+            if key not in self.entries:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+        path = self._path(key)
+        try:
+            os.utime(path)  # persistir el uso para el orden LRU tras reiniciar
+            return path
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+
+    def _add(self, key: str, path: str):
+        size = os.path.getsize(path)
+        with self._lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                evicted, evicted_size = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats['evictions'] += 1
+                try:
+                    os.remove(self._path(evicted))
+                except OSError:
+                    pass
+
+    def get_or_render(self, key: str, render: Callable[[str], bool]) -> Optional[str]:
+        """WAV cacheado o, si no existe, el que render(ruta) escriba en disco"""
+        path = self.get(key)
+        if path:
+            return path
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp.wav"
+        try:
+            if not render(tmp_path) or not os.path.getsize(tmp_path):
+                raise OSError("renderer produced no audio")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"Error rendering speech to file: {str(e)}")
+            with self._lock:
+                self.stats['render_errors'] += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        self._add(key, path)
+        with self._lock:
+            self.stats['renders'] += 1
+        return path
+
+    def stitch(self, key: str, fragment_paths: List[str]) -> Optional[str]:
+        """Une fragmentos cacheados en un WAV cacheado bajo key (sin sintetizar de nuevo)"""
+        path = self._path(key)
+        if not stitch_wav(fragment_paths, path):
+            return None
+        self._add(key, path)
+        with self._lock:
+            self.stats['stitched'] += 1
+        return path
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, files=len(self.entries), bytes=self.total_bytes, max_bytes=self.max_bytes)
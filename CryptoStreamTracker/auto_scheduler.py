@@ -1,26 +1,68 @@
 import logging
-import time
+import os
+from collections import Counter
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional
 import threading
+import clock
+from adaptive_polling import AdaptiveCadence
+from analysis_pipeline import AnalysisPipeline, Stage
+from analysis_store import AnalysisStore
+from crypto_assistant import CryptoAssistant, reporte_movimientos
+from job_runtime import SchedulerRuntime
+from scheduler_telemetry import JobTelemetry
 
 class AutoScheduler:
     """Programador automático para el asistente cripto con loop cada 60 min"""
     
-    def __init__(self, crypto_service, alert_system, voice_system, external_sources):
+    def __init__(self, crypto_service, alert_system, voice_system, external_sources,
+                 analysis_store: Optional[AnalysisStore] = None, warm_start_max_age: int = 3600,
+                 runtime: Optional[SchedulerRuntime] = None):
         self.crypto_service = crypto_service
         self.alert_system = alert_system
         self.voice_system = voice_system
         self.external_sources = external_sources
         
-        self.scheduler = BackgroundScheduler()
+        # Executors por clase de trabajo: io (red), cpu (procesos) y voice (un hilo)
+        self.runtime = runtime or SchedulerRuntime()
+        self.scheduler = self.runtime.scheduler
+        # Duraciones, fallos, solapamientos y ejecuciones fusionadas de cada trabajo
+        self.telemetry = JobTelemetry()
+        self.telemetry.attach(self.scheduler)
         self.is_running = False
         self.last_analysis = None
+        self.last_external_analysis = None
         self.analysis_history = []
         
+        # Historial persistente: al reiniciar se recupera el último estado y, si el
+        # último análisis tiene menos de warm_start_max_age segundos, no se repite
+        self.analysis_store = analysis_store
+        self.warm_start_max_age = warm_start_max_age
+        self.warm_started = False
+        self.restore_history()
+        
+        # Cadencia de sondeo de precios/alertas según volatilidad, alertas y presupuesto de API
+        self.cadence = AdaptiveCadence(
+            budget_per_hour=int(os.environ.get('COINGECKO_CALLS_PER_HOUR', '300'))
+        )
+        
+        # Precios más recientes que esto se reutilizan en lugar de volver a descargarlos
+        self.price_max_age = self.cadence.min_interval / 2
+        self.assistant = CryptoAssistant(crypto_service)
+        
+        # Pipeline: precios → alertas → movimientos → sentimiento → reporte
+        self.pipeline = AnalysisPipeline([
+            Stage('prices', self._stage_prices, fingerprint=lambda out: out['last_update']),
+            Stage('alerts', self._stage_alerts, inputs=['prices'],
+                  fingerprint=lambda alerts: tuple(alert.id for alert in alerts)),
+            Stage('movements', self._stage_movements, inputs=['prices']),
+            Stage('sentiment', self._stage_sentiment, fingerprint=lambda out: out['timestamp']),
+            Stage('report', self._stage_report, inputs=['prices', 'alerts', 'movements', 'sentiment'],
+                  fingerprint=lambda out: out['timestamp'])
+        ])
+        
         # Configurar trabajos programados
         self.setup_scheduled_jobs()
     
@@ -34,57 +76,52 @@ class AutoScheduler:
             id='comprehensive_analysis_60min',
             name='Análisis Completo cada 60 minutos',
             max_instances=1,
-            coalesce=True
-        )
-        
-        # 2. Verificación de alertas cada 5 minutos
-        self.scheduler.add_job(
-            func=self.check_alerts,
-            trigger=IntervalTrigger(minutes=5),
-            id='alert_check_5min',
-            name='Verificación de Alertas cada 5 minutos',
-            max_instances=1,
-            coalesce=True
+            coalesce=True,
+            executor='io'
         )
         
-        # 3. Actualización de precios cada 2 minutos (ya existe en app.py pero lo reforzamos)
+        # 2. Sondeo adaptativo de precios + alertas (15s en mercados volátiles, 5 min en calma)
         self.scheduler.add_job(
-            func=self.update_prices,
-            trigger=IntervalTrigger(minutes=2),
-            id='price_update_2min',
-            name='Actualización de Precios cada 2 minutos',
+            func=self.poll_market,
+            trigger=IntervalTrigger(seconds=self.cadence.interval),
+            id='adaptive_poll',
+            name='Sondeo adaptativo de precios y alertas',
             max_instances=1,
-            coalesce=True
+            coalesce=True,
+            executor='io'
         )
         
-        # 4. Análisis de fuentes externas cada 30 minutos
+        # 3. Análisis de fuentes externas cada 30 minutos
         self.scheduler.add_job(
             func=self.analyze_external_sources,
             trigger=IntervalTrigger(minutes=30),
             id='external_sources_30min',
             name='Análisis de Fuentes Externas cada 30 minutos',
             max_instances=1,
-            coalesce=True
+            coalesce=True,
+            executor='io'
         )
         
-        # 5. Limpieza de datos cada 6 horas
+        # 4. Limpieza de datos cada 6 horas
         self.scheduler.add_job(
             func=self.cleanup_data,
             trigger=IntervalTrigger(hours=6),
             id='cleanup_6h',
             name='Limpieza de Datos cada 6 horas',
             max_instances=1,
-            coalesce=True
+            coalesce=True,
+            executor='io'
         )
         
-        # 6. Resumen diario a las 9:00 AM
+        # 5. Resumen diario a las 9:00 AM
         self.scheduler.add_job(
             func=self.daily_summary,
             trigger=CronTrigger(hour=9, minute=0),
             id='daily_summary_9am',
             name='Resumen Diario a las 9:00 AM',
             max_instances=1,
-            coalesce=True
+            coalesce=True,
+            executor='voice'
         )
         
         logging.info("Scheduled jobs configured successfully")
@@ -96,8 +133,15 @@ class AutoScheduler:
                 self.scheduler.start()
                 self.is_running = True
                 
-                # Ejecutar análisis inicial
-                threading.Timer(5.0, self.initial_analysis).start()
+                # Ejecutar análisis inicial, salvo que el guardado sea reciente
+                age = self._last_analysis_age()
+                if age is not None and age < self.warm_start_max_age:
+                    self.warm_started = True
+                    self._resume_schedule(age)
+                    threading.Timer(5.0, self.poll_market).start()
+                    logging.info(f"♻️ Arranque en caliente: último análisis de hace {age / 60:.0f} min")
+                else:
+                    threading.Timer(5.0, self.initial_analysis).start()
                 
                 logging.info("🔄 Auto-scheduler started - Loop automático cada 60 min activado")
                 return True
@@ -109,7 +153,7 @@ class AutoScheduler:
         """Detiene el programador automático"""
         try:
             if self.is_running:
-                self.scheduler.shutdown()
+                self.runtime.shutdown()
                 self.is_running = False
                 logging.info("Auto-scheduler stopped")
                 return True
@@ -122,13 +166,12 @@ class AutoScheduler:
         try:
             logging.info("🚀 Ejecutando análisis inicial del sistema...")
             
-            # Actualizar precios primero
-            self.update_prices()
-            time.sleep(2)
-            
-            # Ejecutar análisis completo
+            # Ejecutar análisis completo (la etapa de precios descarga si hace falta)
             result = self.comprehensive_analysis()
             
+            # Primer ajuste de la cadencia con el snapshot inicial
+            self.poll_market()
+            
             if result:
                 # Anuncio por voz de inicio
                 if self.voice_system and self.voice_system.voice_enabled:
@@ -142,107 +185,156 @@ class AutoScheduler:
         except Exception as e:
             logging.error(f"Error in initial analysis: {str(e)}")
     
-    def comprehensive_analysis(self):
-        """Análisis completo del mercado cada 60 minutos"""
+    def restore_history(self):
+        """Recupera el historial reciente y el último análisis desde el almacén"""
+        if not self.analysis_store:
+            return
         try:
-            timestamp = datetime.now()
-            logging.info(f"🔍 Ejecutando análisis completo - {timestamp.strftime('%H:%M:%S')}")
-            
-            # 1. Actualizar datos de precios
-            price_update = self.crypto_service.update_prices()
-            
-            # 2. Procesar alertas
-            new_alerts = self.alert_system.process_alerts()
-            
-            # 3. Obtener análisis de movimientos
-            from crypto_assistant import CryptoAssistant
-            assistant = CryptoAssistant(self.crypto_service)
-            movement_analysis = assistant.analizar_movimientos_extraños()
-            
-            # 4. Analizar fuentes externas (cada 2 ciclos = cada 2 horas)
-            external_analysis = ""
-            if len(self.analysis_history) % 2 == 0:
-                external_analysis = self.external_sources.get_market_sentiment_summary()
-            
-            # 5. Compilar resultado
-            analysis_result = {
-                'timestamp': timestamp.isoformat(),
-                'price_update_success': price_update,
-                'new_alerts_count': len(new_alerts),
-                'movement_analysis': movement_analysis,
-                'external_analysis': external_analysis,
-                'critical_alerts': len(self.alert_system.get_critical_alerts()),
-                'market_status': self.determine_market_status(new_alerts)
-            }
-            
-            # 6. Guardar en historial
-            self.analysis_history.append(analysis_result)
-            self.last_analysis = analysis_result
-            
-            # 7. Procesar alertas críticas con voz
-            if new_alerts:
-                critical_alerts = [a for a in new_alerts if a.severity == "critical"]
-                if critical_alerts and self.voice_system:
-                    alert_summary = f"Se detectaron {len(critical_alerts)} alertas críticas en el mercado cripto"
-                    self.voice_system.speak_alert(alert_summary)
-            
-            # 8. Log de resumen
-            logging.info(f"📊 Análisis completado: {len(new_alerts)} alertas, Status: {analysis_result['market_status']}")
+            self.analysis_history = list(reversed(self.analysis_store.recent(limit=24)))
+            self.last_analysis = self.analysis_history[-1] if self.analysis_history else None
+            if self.last_analysis:
+                logging.info(f"Restored {len(self.analysis_history)} analyses (last: {self.last_analysis['timestamp']})")
+        except Exception as e:
+            logging.error(f"Error restoring analysis history: {str(e)}")
+    
+    def _last_analysis_age(self) -> Optional[float]:
+        if not self.last_analysis:
+            return None
+        return (clock.now() - datetime.fromisoformat(self.last_analysis['timestamp'])).total_seconds()
+    
+    def _resume_schedule(self, age: float):
+        """El próximo análisis completo toca una hora después del último guardado"""
+        job = self.scheduler.get_job('comprehensive_analysis_60min')
+        if job:
+            remaining = max(60.0, job.trigger.interval.total_seconds() - age)
+            job.modify(next_run_time=clock.now(job.next_run_time.tzinfo) + timedelta(seconds=remaining))
+    
+    def _prices_are_fresh(self) -> bool:
+        last_update = self.crypto_service.last_update
+        if not last_update:
+            return False
+        age = (clock.now() - datetime.fromisoformat(last_update)).total_seconds()
+        return age < self.price_max_age
+    
+    def _stage_prices(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Etapa de ingesta: descarga precios solo si el snapshot actual está vencido"""
+        success = True
+        if not self._prices_are_fresh():
+            success = self.crypto_service.update_prices()
+        return {
+            'last_update': self.crypto_service.last_update,
+            'success': success,
+            'prices': dict(self.crypto_service.get_all_prices())
+        }
+    
+    def _stage_alerts(self, inputs: Dict[str, Any]):
+        """Etapa de alertas: se evalúa una vez por snapshot de precios"""
+        new_alerts = self.alert_system.process_alerts(inputs['prices']['prices'])
+        
+        high_priority = [a for a in new_alerts if a.severity in ["critical", "high"]]
+        if high_priority:
+            logging.info(f"⚠️ {len(high_priority)} alertas de alta prioridad detectadas")
             
-            return analysis_result
+            # Anuncio por voz para alertas críticas
+            critical = [a for a in high_priority if a.severity == "critical"]
+            if critical and self.voice_system:
+                for alert in critical[:2]:  # Solo las 2 primeras
+                    self.voice_system.speak_alert(alert.message, severity=alert.severity)
+        
+        return new_alerts
+    
+    def _stage_movements(self, inputs: Dict[str, Any]) -> str:
+        """Etapa de movimientos sobre el mismo snapshot (sin volver a descargar precios)"""
+        prices = inputs['prices']['prices']
+        if not prices:
+            return self.assistant.analizar_movimientos_extraños(precios=prices)
+        try:
+            # Construcción del reporte en el pool de procesos para no retener el GIL
+            return self.runtime.run('cpu', reporte_movimientos, prices, clock.now(), timeout=30)
+        except Exception as e:
+            logging.warning(f"CPU executor unavailable, building movements report inline: {str(e)}")
+            return self.assistant.analizar_movimientos_extraños(precios=prices)
+    
+    def _stage_sentiment(self, inputs: Dict[str, Any]) -> Dict:
+        """Etapa de sentimiento desde la caché de fuentes externas"""
+        return self.external_sources.get_market_sentiment()
+    
+    def _stage_report(self, inputs: Dict[str, Any]) -> Dict:
+        """Etapa final: compila el análisis a partir de las salidas compartidas"""
+        new_alerts = inputs['alerts']
+        analysis_result = {
+            'timestamp': clock.now().isoformat(),
+            'price_update_success': inputs['prices']['success'],
+            'new_alerts_count': len(new_alerts),
+            'movement_analysis': inputs['movements'],
+            'external_analysis': inputs['sentiment']['summary'],
+            'critical_alerts': len(self.alert_system.get_critical_alerts()),
+            'market_status': self.determine_market_status(new_alerts),
+            'versions': {name: state.version for name, state in self.pipeline.state.items() if name != 'report'}
+        }
+        
+        # Guardar en historial
+        self.analysis_history.append(analysis_result)
+        self.last_analysis = analysis_result
+        if self.analysis_store:
+            self.analysis_store.append(analysis_result)
+        
+        logging.info(f"📊 Análisis completado: {len(new_alerts)} alertas, Status: {analysis_result['market_status']}")
+        return analysis_result
+    
+    def comprehensive_analysis(self, force: bool = False):
+        """Análisis completo del mercado cada 60 minutos (solo recalcula las etapas con entradas nuevas)"""
+        try:
+            logging.info(f"🔍 Ejecutando análisis completo - {clock.now().strftime('%H:%M:%S')}")
+            executed = self.pipeline.tick(force=force)
+            if not executed.get('report'):
+                logging.info("📊 Sin datos nuevos desde el último análisis; se reutiliza el anterior")
+            return self.last_analysis
             
         except Exception as e:
             logging.error(f"Error in comprehensive analysis: {str(e)}")
             return None
     
-    def check_alerts(self):
-        """Verificación rápida de alertas cada 5 minutos"""
+    def poll_market(self):
+        """Ingesta de precios y evaluación de alertas; ajusta el intervalo del siguiente sondeo"""
         try:
-            new_alerts = self.alert_system.process_alerts()
-            
-            if new_alerts:
-                high_priority = [a for a in new_alerts if a.severity in ["critical", "high"]]
-                
-                if high_priority:
-                    logging.info(f"⚠️ {len(high_priority)} alertas de alta prioridad detectadas")
-                    
-                    # Anuncio por voz para alertas críticas
-                    critical = [a for a in high_priority if a.severity == "critical"]
-                    if critical and self.voice_system:
-                        for alert in critical[:2]:  # Solo las 2 primeras
-                            self.voice_system.speak_alert(alert.message)
-            
-            return len(new_alerts)
-            
+            executed = self.pipeline.tick('alerts')
+            new_alerts = self.pipeline.output('alerts') if executed.get('alerts') else []
+            prices = self.pipeline.output('prices')
+            if prices:
+                self.cadence.observe(prices['prices'], new_alerts or [])
+            self._reschedule_poll()
+            return len(new_alerts or [])
         except Exception as e:
-            logging.error(f"Error checking alerts: {str(e)}")
+            logging.error(f"Error in adaptive poll: {str(e)}")
             return 0
     
-    def update_prices(self):
-        """Actualiza precios de criptomonedas"""
-        try:
-            result = self.crypto_service.update_prices()
-            if result:
-                logging.debug("💰 Precios actualizados correctamente")
-            return result
-        except Exception as e:
-            logging.error(f"Error updating prices: {str(e)}")
-            return False
+    def _reschedule_poll(self):
+        """Reprograma el sondeo cuando el controlador cambia el intervalo"""
+        previous = self.cadence.interval
+        interval = self.cadence.next_interval(self.crypto_service.get_api_calls())
+        if interval == previous:
+            return
+        if self.is_running:
+            self.scheduler.reschedule_job('adaptive_poll', trigger=IntervalTrigger(seconds=interval))
+        logging.info(f"⏱️ Sondeo de precios cada {interval:.0f}s ({self.cadence.get_status()['reason']})")
     
     def analyze_external_sources(self):
-        """Analiza fuentes externas cada 30 minutos"""
+        """Analiza fuentes externas cada 30 minutos y renueva la caché compartida con la API"""
         try:
             logging.info("🌐 Analizando fuentes externas...")
-            sentiment_summary = self.external_sources.get_market_sentiment_summary()
+            result = self.external_sources.refresh_market_sentiment()
             
             # Guardar resultado para uso posterior
             self.last_external_analysis = {
-                'timestamp': datetime.now().isoformat(),
-                'summary': sentiment_summary
+                'timestamp': result['timestamp'],
+                'summary': result['summary'],
+                'mood': result['mood'],
+                'sources': {name: source['status'] for name, source in result['sources'].items()}
             }
             
             logging.info("📰 Análisis de fuentes externas completado")
-            return sentiment_summary
+            return result['summary']
             
         except Exception as e:
             logging.error(f"Error analyzing external sources: {str(e)}")
@@ -256,7 +348,7 @@ class AutoScheduler:
                 self.analysis_history = self.analysis_history[-24:]
             
             # Limpiar alertas antiguas
-            cutoff_time = datetime.now() - timedelta(hours=48)
+            cutoff_time = clock.now() - timedelta(hours=48)
             original_count = len(self.alert_system.alert_history)
             
             self.alert_system.alert_history = [
@@ -278,26 +370,27 @@ class AutoScheduler:
         try:
             logging.info("📊 Generando resumen diario...")
             
-            # Contar alertas de las últimas 24 horas
-            yesterday = datetime.now() - timedelta(hours=24)
-            recent_alerts = [
-                alert for alert in self.alert_system.alert_history 
-                if alert.timestamp > yesterday
-            ]
-            
-            critical_count = len([a for a in recent_alerts if a.severity == "critical"])
-            high_count = len([a for a in recent_alerts if a.severity == "high"])
+            # Conteos de las últimas 24 horas desde los rollups horarios
+            counts = self.alert_system.count_alerts(clock.now() - timedelta(hours=24))
+            critical_count = counts['by_severity'].get('critical', 0)
+            high_count = counts['by_severity'].get('high', 0)
             
             # Crear resumen
             summary = f"""Resumen diario de criptomonedas. 
-            En las últimas 24 horas se detectaron {len(recent_alerts)} alertas,
+            En las últimas 24 horas se detectaron {counts['total']} alertas,
             incluyendo {critical_count} críticas y {high_count} de alta prioridad."""
             
             # Anunciar por voz
             if self.voice_system:
-                self.voice_system.speak_text(summary, async_mode=True)
+                # Con la menor prioridad: una alerta crítica pendiente se dice antes.
+                # Plantilla por fragmentos: solo se sintetizan las cifras que no estén cacheadas
+                self.voice_system.speak_template([
+                    "Resumen diario de criptomonedas. En las últimas 24 horas se detectaron",
+                    str(counts['total']), "alertas, incluyendo", str(critical_count),
+                    "críticas y", str(high_count), "de alta prioridad."
+                ], priority='summary')
             
-            logging.info(f"📈 Resumen diario: {len(recent_alerts)} alertas totales")
+            logging.info(f"📈 Resumen diario: {counts['total']} alertas totales")
             return summary
             
         except Exception as e:
@@ -309,8 +402,9 @@ class AutoScheduler:
         if not alerts:
             return "STABLE"
         
-        critical_count = len([a for a in alerts if a.severity == "critical"])
-        high_count = len([a for a in alerts if a.severity == "high"])
+        severities = Counter(a.severity for a in alerts)
+        critical_count = severities['critical']
+        high_count = severities['high']
         
         if critical_count >= 3:
             return "CRITICAL"
@@ -328,7 +422,13 @@ class AutoScheduler:
             'jobs_count': len(self.scheduler.get_jobs()) if self.is_running else 0,
             'last_analysis_time': self.last_analysis['timestamp'] if self.last_analysis else None,
             'analysis_count_24h': len(self.analysis_history),
-            'next_analysis': self.get_next_analysis_time()
+            'next_analysis': self.get_next_analysis_time(),
+            'pipeline': self.pipeline.get_status(),
+            'polling': self.cadence.get_status(),
+            'warm_started': self.warm_started,
+            'history_store': self.analysis_store.get_status() if self.analysis_store else None,
+            'jobs': self.telemetry.get_status(),
+            'executors': self.runtime.get_status()
         }
     
     def get_next_analysis_time(self):
@@ -346,7 +446,7 @@ class AutoScheduler:
         """Fuerza un análisis inmediato"""
         try:
             logging.info("🔄 Forzando análisis inmediato...")
-            result = self.comprehensive_analysis()
+            result = self.comprehensive_analysis(force=True)
             return result is not None
         except Exception as e:
             logging.error(f"Error forcing analysis: {str(e)}")
@@ -0,0 +1,69 @@
+import threading
+import time as _time
+from datetime import datetime, timedelta, tzinfo
+from typing import Optional, Union
+
+
+class Clock:
+    """Reloj del sistema; los módulos del pipeline consultan la hora a través de él"""
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.now(tz)
+
+    def time(self) -> float:
+        return _time.time()
+
+    def sleep(self, seconds: float):
+        _time.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """Reloj virtual que solo avanza cuando se le indica (modo replay)"""
+
+    def __init__(self, start: Union[datetime, float]):
+        self._now = start.timestamp() if isinstance(start, datetime) else float(start)
+        self._lock = threading.Lock()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.fromtimestamp(self._now, tz)
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: Union[float, timedelta]):
+        if isinstance(seconds, timedelta):
+            seconds = seconds.total_seconds()
+        with self._lock:
+            self._now += max(0.0, seconds)
+
+    def advance_to(self, moment: Union[datetime, float]):
+        target = moment.timestamp() if isinstance(moment, datetime) else float(moment)
+        with self._lock:
+            self._now = max(self._now, target)
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Sustituye el reloj global y devuelve el anterior para poder restaurarlo"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def now(tz: Optional[tzinfo] = None) -> datetime:
+    """Equivalente a datetime.now() según el reloj activo"""
+    return _clock.now(tz)
+
+
+def timestamp() -> float:
+    """Equivalente a time.time() según el reloj activo"""
+    return _clock.time()
@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+import clock
 from crypto_service import CryptoService
 
 class CryptoAssistant:
@@ -9,62 +10,32 @@ class CryptoAssistant:
     def __init__(self, crypto_service: CryptoService):
         self.crypto_service = crypto_service
         
-    def analizar_movimientos_extraños(self) -> str:
-        """Analiza las criptomonedas y detecta movimientos extraños"""
+    def analizar_movimientos_extraños(self, actualizar_precios: bool = True, precios: Optional[Dict] = None) -> str:
+        """Analiza las criptomonedas y detecta movimientos extraños.
+        
+        Con actualizar_precios=False (o pasando precios) se reutiliza el snapshot
+        ya descargado en lugar de volver a consultar la API.
+        """
         try:
-            # Asegurar que tenemos datos actualizados
-            self.crypto_service.update_prices()
-            
-            # Obtener datos actuales de precios
-            precios = self.crypto_service.get_all_prices()
+            if precios is None:
+                # Asegurar que tenemos datos actualizados
+                if actualizar_precios:
+                    self.crypto_service.update_prices()
+                
+                # Obtener datos actuales de precios
+                precios = self.crypto_service.get_all_prices()
             
             if not precios:
                 return "No se pudieron obtener los datos de precios actuales."
             
-            movimientos_extraños = []
-            movimientos_normales = []
-            
-            # Analizar cada criptomoneda
-            for simbolo, datos in precios.items():
-                cambio_24h = datos.get('price_change_24h', 0)
-                precio_actual = datos.get('current_price', 0)
-                nombre = datos.get('name', simbolo.upper())
-                
-                # Detectar movimientos extraños (más de ±10%)
-                if abs(cambio_24h) > 10:
-                    tipo_movimiento = "📈 ALZA EXTREMA" if cambio_24h > 0 else "📉 CAÍDA EXTREMA"
-                    movimientos_extraños.append({
-                        'nombre': nombre,
-                        'simbolo': simbolo.upper(),
-                        'precio': precio_actual,
-                        'cambio': cambio_24h,
-                        'tipo': tipo_movimiento
-                    })
-                elif abs(cambio_24h) > 5:
-                    tipo_movimiento = "📊 MOVIMIENTO NOTABLE" if cambio_24h > 0 else "📊 CAÍDA NOTABLE"
-                    movimientos_extraños.append({
-                        'nombre': nombre,
-                        'simbolo': simbolo.upper(),
-                        'precio': precio_actual,
-                        'cambio': cambio_24h,
-                        'tipo': tipo_movimiento
-                    })
-                else:
-                    movimientos_normales.append({
-                        'nombre': nombre,
-                        'simbolo': simbolo.upper(),
-                        'cambio': cambio_24h
-                    })
-            
-            # Generar respuesta
-            respuesta = self._generar_reporte_movimientos(movimientos_extraños, movimientos_normales)
-            return respuesta
+            return reporte_movimientos(precios)
             
         except Exception as e:
             logging.error(f"Error analizando movimientos: {str(e)}")
             return f"Error al analizar movimientos de criptomonedas: {str(e)}"
     
-    def _generar_reporte_movimientos(self, extraños: List[Dict], normales: List[Dict]) -> str:
+    @staticmethod
+    def _generar_reporte_movimientos(extraños: List[Dict], normales: List[Dict], momento: Optional[datetime] = None) -> str:
         """Genera un reporte legible de los movimientos"""
         
         # Ordenar movimientos extraños por magnitud del cambio
@@ -73,7 +44,7 @@ class CryptoAssistant:
         reporte = []
         
         # Título del reporte
-        fecha_actual = datetime.now().strftime("%d de %B, %Y a las %H:%M")
+        fecha_actual = (momento or clock.now()).strftime("%d de %B, %Y a las %H:%M")
         reporte.append(f"🔍 ANÁLISIS DE MOVIMIENTOS CRIPTO - {fecha_actual}")
         reporte.append("=" * 60)
         
@@ -139,6 +110,48 @@ class CryptoAssistant:
         
         return "\n".join(reporte)
 
+def reporte_movimientos(precios: Dict, momento: Optional[datetime] = None) -> str:
+    """Clasifica los movimientos de 24h y construye el reporte (función pura, apta para un pool de procesos).
+
+    momento fija la fecha del reporte: un proceso del pool no ve el reloj simulado del padre.
+    """
+    movimientos_extraños = []
+    movimientos_normales = []
+    
+    # Analizar cada criptomoneda
+    for simbolo, datos in precios.items():
+        cambio_24h = datos.get('price_change_24h', 0)
+        precio_actual = datos.get('current_price', 0)
+        nombre = datos.get('name', simbolo.upper())
+        
+        # Detectar movimientos extraños (más de ±10%)
+        if abs(cambio_24h) > 10:
+            tipo_movimiento = "📈 ALZA EXTREMA" if cambio_24h > 0 else "📉 CAÍDA EXTREMA"
+            movimientos_extraños.append({
+                'nombre': nombre,
+                'simbolo': simbolo.upper(),
+                'precio': precio_actual,
+                'cambio': cambio_24h,
+                'tipo': tipo_movimiento
+            })
+        elif abs(cambio_24h) > 5:
+            tipo_movimiento = "📊 MOVIMIENTO NOTABLE" if cambio_24h > 0 else "📊 CAÍDA NOTABLE"
+            movimientos_extraños.append({
+                'nombre': nombre,
+                'simbolo': simbolo.upper(),
+                'precio': precio_actual,
+                'cambio': cambio_24h,
+                'tipo': tipo_movimiento
+            })
+        else:
+            movimientos_normales.append({
+                'nombre': nombre,
+                'simbolo': simbolo.upper(),
+                'cambio': cambio_24h
+            })
+    
+    return CryptoAssistant._generar_reporte_movimientos(movimientos_extraños, movimientos_normales, momento)
+
 def llamar_asistente(consulta: str) -> str:
     """Función principal para llamar al asistente cripto"""
     
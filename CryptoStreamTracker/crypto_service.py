@@ -1,26 +1,39 @@
 import requests
 import logging
 import time
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+import clock
+from shared_state import SharedSnapshot
+
+# Registro de criptomonedas soportadas (compartido con el matcher de menciones)
+SUPPORTED_COINS = [
+    {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'},
+    {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ethereum'},
+    {'id': 'binancecoin', 'symbol': 'bnb', 'name': 'BNB'},
+    {'id': 'cardano', 'symbol': 'ada', 'name': 'Cardano'},
+    {'id': 'solana', 'symbol': 'sol', 'name': 'Solana'},
+    {'id': 'ripple', 'symbol': 'xrp', 'name': 'XRP'},
+    {'id': 'polkadot', 'symbol': 'dot', 'name': 'Polkadot'},
+    {'id': 'dogecoin', 'symbol': 'doge', 'name': 'Dogecoin'},
+    {'id': 'avalanche-2', 'symbol': 'avax', 'name': 'Avalanche'},
+    {'id': 'chainlink', 'symbol': 'link', 'name': 'Chainlink'}
+]
+
 class CryptoService:
-    def __init__(self):
+    def __init__(self, snapshot: Optional[SharedSnapshot] = None):
         self.base_url = "https://api.coingecko.com/api/v3"
         self.prices_cache = {}
         self.last_update = None
-        self.supported_coins = [
-            {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'},
-            {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ethereum'},
-            {'id': 'binancecoin', 'symbol': 'bnb', 'name': 'BNB'},
-            {'id': 'cardano', 'symbol': 'ada', 'name': 'Cardano'},
-            {'id': 'solana', 'symbol': 'sol', 'name': 'Solana'},
-            {'id': 'ripple', 'symbol': 'xrp', 'name': 'XRP'},
-            {'id': 'polkadot', 'symbol': 'dot', 'name': 'Polkadot'},
-            {'id': 'dogecoin', 'symbol': 'doge', 'name': 'Dogecoin'},
-            {'id': 'avalanche-2', 'symbol': 'avax', 'name': 'Avalanche'},
-            {'id': 'chainlink', 'symbol': 'link', 'name': 'Chainlink'}
-        ]
+        self.supported_coins = SUPPORTED_COINS
+        # Marcas de tiempo de las llamadas a CoinGecko (presupuesto de la cadencia adaptativa)
+        self.api_calls = deque(maxlen=10000)
+        self.rate_limited = 0
+        # El líder publica cada actualización; los seguidores (read_only) sirven esa instantánea
+        self.snapshot = snapshot
+        self.read_only = False
         self.session = requests.Session()
         self.session.headers.update({
             'Accept': 'application/json',
@@ -31,9 +44,11 @@ class CryptoService:
         """Make HTTP request to CoinGecko API with error handling"""
         try:
             url = f"{self.base_url}/{endpoint}"
+            self.api_calls.append(clock.timestamp())
             response = self.session.get(url, params=params, timeout=10)
             
             if response.status_code == 429:  # Rate limit
+                self.rate_limited += 1
                 logging.warning("Rate limit hit, waiting 60 seconds...")
                 time.sleep(60)
                 return None
@@ -48,6 +63,11 @@ class CryptoService:
             logging.error(f"Invalid JSON response: {str(e)}")
             return None
 
+    def get_api_calls(self, window: int = 3600) -> int:
+        """Number of upstream API calls made in the last `window` seconds"""
+        cutoff = clock.timestamp() - window
+        return sum(1 for called in list(self.api_calls) if called >= cutoff)
+
     def update_prices(self):
         """Fetch and update current prices for all supported cryptocurrencies"""
         try:
@@ -80,20 +100,41 @@ class CryptoService:
                         'volume_24h': coin_data.get('usd_24h_vol', 0)
                     }
             
-            self.last_update = datetime.now().isoformat()
+            self.last_update = clock.now().isoformat()
             logging.info(f"Updated prices for {len(self.prices_cache)} cryptocurrencies")
+            self.publish_snapshot()
             return True
             
         except Exception as e:
             logging.error(f"Error updating prices: {str(e)}")
             return False
 
+    def publish_snapshot(self):
+        """Publish the current prices for follower processes (leader only)"""
+        if not self.snapshot or self.read_only:
+            return
+        try:
+            self.snapshot.publish({'prices': self.prices_cache, 'last_update': self.last_update})
+        except OSError as e:
+            logging.error(f"Error publishing price snapshot: {str(e)}")
+
+    def sync_from_snapshot(self):
+        """Load the leader's latest prices when this process is a follower"""
+        if not self.snapshot or not self.read_only:
+            return
+        payload = self.snapshot.read()
+        if payload:
+            self.prices_cache = payload['data']['prices']
+            self.last_update = payload['data']['last_update']
+
     def get_all_prices(self) -> Dict:
         """Get current prices for all cryptocurrencies"""
+        self.sync_from_snapshot()
         return self.prices_cache
 
     def get_price_by_symbol(self, symbol: str) -> Optional[Dict]:
         """Get current price for a specific cryptocurrency by symbol"""
+        self.sync_from_snapshot()
         return self.prices_cache.get(symbol.lower())
 
     def get_price_history(self, symbol: str, days: int = 7) -> Optional[List[Dict]]:
@@ -143,4 +184,5 @@ class CryptoService:
 
     def get_last_update_time(self) -> Optional[str]:
         """Get timestamp of last price update"""
+        self.sync_from_snapshot()
         return self.last_update
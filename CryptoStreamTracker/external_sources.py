@@ -1,275 +1,332 @@
+import os
 import requests
-import feedparser
 import praw
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import re
 import time
+import clock
+from feed_fetcher import FeedFetcher
+from news_store import NewsStore, NewsIngester
+from text_matcher import get_matcher
+from sentiment_aggregates import SentimentAggregator
+from article_extractor import ArticleExtractor
+from swr_cache import StaleWhileRevalidate
+from reddit_stream import (DEFAULT_SUBREDDITS, PrawSubmissionSource, ReplaySubmissionSource,
+                           RedditStreamIngester)
 
 class ExternalSources:
     """Integración con fuentes externas de noticias cripto"""
     
-    def __init__(self):
+    def __init__(self, news_store: Optional[NewsStore] = None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'CharlyNet-Crypto-Bot/1.0'
         })
+        self.feed_fetcher = FeedFetcher(self.session)
+        self.matcher = get_matcher()
+        self.news_store = news_store or NewsStore()
+        self.sentiment = SentimentAggregator()
+        # Reconstruir los agregados con las últimas 24h del almacén (más antiguas primero)
+        self.sentiment.record_articles(reversed(self.news_store.recent(hours=24)))
+        # Texto completo en segundo plano: la puntuación por título/resumen se corrige después
+        self.article_extractor = ArticleExtractor(self.news_store, self, aggregator=self.sentiment)
+        self.news_ingester = NewsIngester(self.news_store, self.feed_fetcher, self,
+                                          aggregator=self.sentiment, extractor=self.article_extractor)
         self.reddit = None
+        self.reddit_ingester = None
+        # Resumen de sentimiento: se sirve desde caché y se recalcula en segundo plano al vencer
+        self.market_sentiment_cache = StaleWhileRevalidate(
+            self.collect_market_sentiment, ttl=600, name='market-sentiment'
+        )
         self.initialize_reddit()
     
     def initialize_reddit(self):
-        """Inicializa conexión con Reddit"""
+        """Inicializa el stream de Reddit (credenciales o archivo de replay por entorno)"""
         try:
-            # Reddit requiere credenciales - se configurará después
-            self.reddit = None
-            logging.info("Reddit initialization pending credentials")
+            replay_path = os.environ.get('REDDIT_REPLAY_PATH')
+            client_id = os.environ.get('REDDIT_CLIENT_ID')
+            client_secret = os.environ.get('REDDIT_CLIENT_SECRET')
+            
+            if replay_path:
+                source = ReplaySubmissionSource(replay_path)
+                logging.info(f"Reddit replay source: {replay_path}")
+            elif client_id and client_secret:
+                self.reddit = praw.Reddit(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    user_agent=os.environ.get('REDDIT_USER_AGENT', 'CharlyNet-Crypto-Bot/1.0')
+                )
+                self.reddit.read_only = True
+                source = PrawSubmissionSource(self.reddit)
+                logging.info("Reddit streaming client initialized")
+            else:
+                logging.info("Reddit initialization pending credentials")
+                return
+            
+            subreddits = [s.strip() for s in os.environ.get('REDDIT_SUBREDDITS', '').split(',') if s.strip()]
+            self.reddit_ingester = RedditStreamIngester(source, self, aggregator=self.sentiment,
+                                                        subreddits=subreddits or DEFAULT_SUBREDDITS)
         except Exception as e:
             logging.warning(f"Reddit initialization failed: {str(e)}")
     
     def get_cryptopanic_news(self, limit: int = 10) -> List[Dict]:
         """Obtiene noticias de CryptoPanic"""
         try:
-            # CryptoPanic API pública (limitada)
-            url = "https://cryptopanic.com/api/v1/posts/"
-            params = {
-                'auth_token': 'free',  # Token público limitado
-                'currencies': 'BTC,ETH,BNB,ADA,SOL,XRP,DOT,DOGE,AVAX,LINK',
-                'filter': 'hot',
-                'public': 'true'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                news_items = []
-                
-                for post in data.get('results', [])[:limit]:
-                    news_items.append({
-                        'title': post.get('title', ''),
-                        'url': post.get('url', ''),
-                        'published': post.get('published_at', ''),
-                        'source': post.get('source', {}).get('title', 'CryptoPanic'),
-                        'currencies': [c.get('code') for c in post.get('currencies', [])],
-                        'votes': post.get('votes', {}).get('positive', 0) - post.get('votes', {}).get('negative', 0),
-                        'sentiment': self.analyze_sentiment(post.get('title', ''))
-                    })
-                
-                return news_items
-                
+            return self._fetch_cryptopanic_news(limit)
         except Exception as e:
             logging.error(f"Error fetching CryptoPanic news: {str(e)}")
         
         return []
     
-    def get_reddit_sentiment(self, subreddits: List[str] = None) -> Dict:
-        """Obtiene sentimiento de Reddit"""
-        if not subreddits:
-            subreddits = ['cryptocurrency', 'bitcoin', 'ethereum', 'cryptomarkets']
-        
-        sentiment_data = {
-            'positive': 0,
-            'negative': 0,
-            'neutral': 0,
-            'total_posts': 0,
-            'trending_topics': [],
-            'summary': ''
+    def _fetch_cryptopanic_news(self, limit: int = 10) -> List[Dict]:
+        """Consulta CryptoPanic; lanza excepción si la API falla"""
+        # CryptoPanic API pública (limitada)
+        url = "https://cryptopanic.com/api/v1/posts/"
+        params = {
+            'auth_token': 'free',  # Token público limitado
+            'currencies': 'BTC,ETH,BNB,ADA,SOL,XRP,DOT,DOGE,AVAX,LINK',
+            'filter': 'hot',
+            'public': 'true'
         }
         
+        response = self.session.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        news_items = []
+        
+        for post in data.get('results', [])[:limit]:
+            news_items.append({
+                'title': post.get('title', ''),
+                'url': post.get('url', ''),
+                'published': post.get('published_at', ''),
+                'source': post.get('source', {}).get('title', 'CryptoPanic'),
+                'currencies': [c.get('code') for c in post.get('currencies', [])],
+                'votes': post.get('votes', {}).get('positive', 0) - post.get('votes', {}).get('negative', 0),
+                'sentiment': self.analyze_sentiment(post.get('title', ''))
+            })
+        
+        return news_items
+    
+    def get_reddit_sentiment(self) -> Dict:
+        """Obtiene sentimiento de Reddit desde el stream en segundo plano (sin llamadas a la API)"""
         try:
-            if self.reddit:
-                for subreddit_name in subreddits:
-                    subreddit = self.reddit.subreddit(subreddit_name)
-                    
-                    # Obtener posts populares
-                    for post in subreddit.hot(limit=20):
-                        sentiment = self.analyze_sentiment(post.title + ' ' + post.selftext)
-                        sentiment_data[sentiment] += 1
-                        sentiment_data['total_posts'] += 1
-                        
-                        # Extraer menciones de cryptos
-                        crypto_mentions = self.extract_crypto_mentions(post.title)
-                        sentiment_data['trending_topics'].extend(crypto_mentions)
-            
-            # Generar resumen
-            if sentiment_data['total_posts'] > 0:
-                pos_pct = (sentiment_data['positive'] / sentiment_data['total_posts']) * 100
-                neg_pct = (sentiment_data['negative'] / sentiment_data['total_posts']) * 100
-                
-                if pos_pct > 60:
-                    mood = "optimista"
-                elif neg_pct > 60:
-                    mood = "pesimista"
-                else:
-                    mood = "neutral"
-                
-                sentiment_data['summary'] = f"Sentimiento Reddit: {mood} ({pos_pct:.1f}% positivo, {neg_pct:.1f}% negativo)"
-            else:
-                sentiment_data['summary'] = "Datos de Reddit no disponibles"
-                
+            return self._fetch_reddit_sentiment()
         except Exception as e:
             logging.error(f"Error getting Reddit sentiment: {str(e)}")
-            sentiment_data['summary'] = "Error accediendo a Reddit"
+            return {
+                'positive': 0,
+                'negative': 0,
+                'neutral': 0,
+                'total_posts': 0,
+                'trending_topics': [],
+                'summary': "Datos de Reddit no disponibles" if not self.reddit_ingester else "Error accediendo a Reddit"
+            }
+    
+    def _fetch_reddit_sentiment(self) -> Dict:
+        """Resumen de la ventana del stream; lanza excepción si no hay stream o está fallando"""
+        if not self.reddit_ingester:
+            raise RuntimeError("Reddit stream not configured")
+        status = self.reddit_ingester.get_status()
+        if status['last_error']:
+            raise RuntimeError(f"Reddit stream failing: {status['last_error']}")
+        
+        sentiment_data = self.reddit_ingester.get_summary()
+        
+        # Generar resumen
+        if sentiment_data['total_posts'] > 0:
+            pos_pct = (sentiment_data['positive'] / sentiment_data['total_posts']) * 100
+            neg_pct = (sentiment_data['negative'] / sentiment_data['total_posts']) * 100
+            
+            if pos_pct > 60:
+                mood = "optimista"
+            elif neg_pct > 60:
+                mood = "pesimista"
+            else:
+                mood = "neutral"
+            
+            sentiment_data['summary'] = f"Sentimiento Reddit: {mood} ({pos_pct:.1f}% positivo, {neg_pct:.1f}% negativo)"
+        else:
+            sentiment_data['summary'] = "Datos de Reddit no disponibles"
         
         return sentiment_data
     
     def get_crypto_feeds(self) -> List[Dict]:
-        """Obtiene feeds RSS de sitios cripto"""
-        feeds = [
-            'https://cointelegraph.com/rss',
-            'https://coindesk.com/arc/outboundfeeds/rss/',
-            'https://decrypt.co/feed'
-        ]
-        
-        all_news = []
+        """Obtiene feeds RSS de sitios cripto desde el almacén de noticias compartido"""
+        try:
+            return self._fetch_crypto_feeds()
+        except Exception as e:
+            logging.error(f"Error reading news store: {str(e)}")
+            return []
+    
+    def _fetch_crypto_feeds(self) -> List[Dict]:
+        """Noticias recientes del almacén; lanza excepción si ningún feed respondió en el último ciclo"""
+        # Un único ciclo de descarga por intervalo, compartido con CharlyNews
+        self.news_ingester.ensure_fresh()
+        if self.news_ingester.last_cycle_failed >= len(self.news_ingester.feeds):
+            raise RuntimeError("all RSS feeds failed in the last ingest cycle")
         
-        for feed_url in feeds:
-            try:
-                feed = feedparser.parse(feed_url)
-                
-                for entry in feed.entries[:5]:  # 5 por feed
-                    published = entry.get('published_parsed')
-                    if published:
-                        pub_date = datetime(*published[:6])
-                    else:
-                        pub_date = datetime.now()
-                    
-                    # Solo noticias de las últimas 24 horas
-                    if pub_date > datetime.now() - timedelta(hours=24):
-                        all_news.append({
-                            'title': entry.get('title', ''),
-                            'url': entry.get('link', ''),
-                            'published': pub_date.isoformat(),
-                            'source': feed.feed.get('title', 'RSS Feed'),
-                            'summary': entry.get('summary', ''),
-                            'sentiment': self.analyze_sentiment(entry.get('title', '') + ' ' + entry.get('summary', ''))
-                        })
-                        
-            except Exception as e:
-                logging.error(f"Error parsing feed {feed_url}: {str(e)}")
+        # Solo noticias de las últimas 24 horas, 5 por feed, las 15 más recientes
+        articles = self.news_store.recent(hours=24, per_source_limit=5, limit=15)
         
-        # Ordenar por fecha
-        all_news.sort(key=lambda x: x['published'], reverse=True)
-        return all_news[:15]  # Retornar las 15 más recientes
+        return [{
+            'title': article['title'],
+            'url': article['url'],
+            'published': article['published'].isoformat(),
+            'source': article['source'],
+            'summary': article['summary'],
+            'sentiment': article['sentiment']
+        } for article in articles]
     
     def analyze_sentiment(self, text: str) -> str:
         """Análisis básico de sentimiento"""
         if not text:
             return 'neutral'
         
-        text_lower = text.lower()
-        
-        # Palabras positivas
-        positive_words = [
-            'bullish', 'moon', 'pump', 'rally', 'surge', 'breakthrough', 'adoption',
-            'partnership', 'upgrade', 'launch', 'success', 'milestone', 'growth',
-            'positive', 'gain', 'rise', 'increase', 'buy', 'bull', 'rocket'
-        ]
+        counts = self.matcher.match(text).counts
+        return self.matcher.sentiment(counts)
+    
+    def extract_crypto_mentions(self, text: str) -> List[str]:
+        """Extrae menciones de criptomonedas del texto (nombres y tickers se normalizan al símbolo)"""
+        return self.matcher.match(text).mentions
+    
+    def score_texts(self, texts: List[str]) -> List[Dict]:
+        """Sentimiento y menciones de un lote de textos con una pasada del matcher por texto"""
+        return [{
+            'sentiment': self.matcher.sentiment(result.counts),
+            'mentions': result.mentions
+        } for result in self.matcher.score_batch(texts)]
+    
+    def get_market_sentiment_summary(self) -> str:
+        """Genera resumen completo del sentimiento del mercado (desde la caché, sin esperar a las fuentes)"""
+        try:
+            return self.get_market_sentiment()['summary']
+        except Exception as e:
+            logging.error(f"Error generating market sentiment: {str(e)}")
+            return f"❌ Error obteniendo datos de fuentes externas: {str(e)}"
+    
+    def get_market_sentiment(self) -> Dict:
+        """Resultado estructurado del sentimiento; si está vencido se sirve y se recalcula en segundo plano"""
+        return self.market_sentiment_cache.get()
+    
+    def refresh_market_sentiment(self) -> Dict:
+        """Recalcula el sentimiento de forma síncrona y actualiza la caché"""
+        return self.market_sentiment_cache.refresh()
+    
+    def collect_market_sentiment(self, previous: Optional[Dict] = None) -> Dict:
+        """Consulta todas las fuentes en paralelo; una fuente que falla conserva su último resultado"""
+        now = clock.now()
+        # Obtener datos de múltiples fuentes en paralelo
+        fetched = FeedFetcher.run_all({
+            'cryptopanic': lambda: self._fetch_cryptopanic_news(5),
+            'reddit': self._fetch_reddit_sentiment,
+            'rss': self._fetch_crypto_feeds
+        }, deadline=self.feed_fetcher.deadline)
         
-        # Palabras negativas
-        negative_words = [
-            'bearish', 'crash', 'dump', 'drop', 'fall', 'decline', 'hack', 'scam',
-            'regulation', 'ban', 'fear', 'uncertainty', 'sell', 'bear', 'panic',
-            'negative', 'loss', 'decrease', 'risk', 'warning', 'concern'
-        ]
+        sources = {}
+        for name, data in fetched.items():
+            if data is not None:
+                sources[name] = {'status': 'ok', 'updated': now.isoformat(), 'data': data}
+            elif previous and previous['sources'][name]['data'] is not None:
+                sources[name] = dict(previous['sources'][name], status='stale')
+            else:
+                sources[name] = {'status': 'unavailable', 'updated': None, 'data': None}
         
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        # Agregados incrementales por moneda (lectura O(1), sin descargas)
+        coins = [self.sentiment.get(symbol) for symbol in self.sentiment.symbols()]
+        coins = [c for c in coins if c and c['windows']['6h']['total'] >= 1]
+        coins.sort(key=lambda c: c['windows']['6h']['total'], reverse=True)
         
-        if positive_count > negative_count:
-            return 'positive'
-        elif negative_count > positive_count:
-            return 'negative'
-        else:
-            return 'neutral'
+        result = {
+            'timestamp': now.isoformat(),
+            'sources': sources,
+            'coins': coins[:5]
+        }
+        result.update(self._conclude(sources))
+        result['summary'] = self.format_market_sentiment(result)
+        return result
     
-    def extract_crypto_mentions(self, text: str) -> List[str]:
-        """Extrae menciones de criptomonedas del texto"""
-        crypto_symbols = ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'DOGE', 'AVAX', 'LINK']
-        crypto_names = ['bitcoin', 'ethereum', 'cardano', 'solana', 'ripple', 'polkadot', 'dogecoin', 'avalanche', 'chainlink']
+    @staticmethod
+    def _conclude(sources: Dict) -> Dict:
+        cryptopanic_news = sources['cryptopanic']['data'] or []
+        rss_news = sources['rss']['data'] or []
+        reddit_sentiment = sources['reddit']['data'] or {'positive': 0, 'negative': 0}
         
-        mentions = []
-        text_upper = text.upper()
-        text_lower = text.lower()
+        total_positive = sum([
+            len([n for n in cryptopanic_news if n['sentiment'] == 'positive']),
+            reddit_sentiment['positive'],
+            len([n for n in rss_news if n['sentiment'] == 'positive'])
+        ])
         
-        for symbol in crypto_symbols:
-            if symbol in text_upper:
-                mentions.append(symbol)
+        total_negative = sum([
+            len([n for n in cryptopanic_news if n['sentiment'] == 'negative']),
+            reddit_sentiment['negative'],
+            len([n for n in rss_news if n['sentiment'] == 'negative'])
+        ])
         
-        for name in crypto_names:
-            if name in text_lower:
-                mentions.append(name.upper())
+        if total_positive > total_negative * 1.5:
+            mood = "OPTIMISTA - Sentimiento mayoritariamente positivo"
+        elif total_negative > total_positive * 1.5:
+            mood = "PESIMISTA - Sentimiento mayoritariamente negativo"
+        else:
+            mood = "NEUTRAL - Sentimiento mixto en el mercado"
         
-        return list(set(mentions))  # Eliminar duplicados
+        return {'total_positive': total_positive, 'total_negative': total_negative, 'mood': mood}
     
-    def get_market_sentiment_summary(self) -> str:
-        """Genera resumen completo del sentimiento del mercado"""
-        try:
-            # Obtener datos de múltiples fuentes
-            cryptopanic_news = self.get_cryptopanic_news(5)
-            reddit_sentiment = self.get_reddit_sentiment()
-            rss_news = self.get_crypto_feeds()
-            
-            summary = []
-            summary.append("🌐 ANÁLISIS DE FUENTES EXTERNAS")
-            summary.append("=" * 45)
-            
-            # Análisis de noticias
-            if cryptopanic_news:
-                positive_news = sum(1 for n in cryptopanic_news if n['sentiment'] == 'positive')
-                negative_news = sum(1 for n in cryptopanic_news if n['sentiment'] == 'negative')
-                
-                summary.append(f"\n📰 NOTICIAS CRYPTOPANIC ({len(cryptopanic_news)} artículos):")
-                summary.append(f"   Positivas: {positive_news} | Negativas: {negative_news}")
-                
-                # Mostrar noticia más relevante
-                if cryptopanic_news:
-                    top_news = max(cryptopanic_news, key=lambda x: x['votes'])
-                    summary.append(f"   🔥 Trending: {top_news['title'][:60]}...")
-            
-            # Sentimiento de Reddit
-            summary.append(f"\n🔴 REDDIT SENTIMENT:")
-            summary.append(f"   {reddit_sentiment['summary']}")
-            
-            # Análisis de feeds RSS
-            if rss_news:
-                recent_positive = sum(1 for n in rss_news if n['sentiment'] == 'positive')
-                recent_negative = sum(1 for n in rss_news if n['sentiment'] == 'negative')
-                
-                summary.append(f"\n📡 MEDIOS ESPECIALIZADOS ({len(rss_news)} artículos 24h):")
-                summary.append(f"   Tono positivo: {recent_positive} | Tono negativo: {recent_negative}")
-                
-                if rss_news:
-                    latest = rss_news[0]
-                    summary.append(f"   📌 Último: {latest['title'][:50]}...")
-            
-            # Resumen general
-            summary.append(f"\n💡 CONCLUSIÓN:")
-            
-            total_positive = sum([
-                len([n for n in cryptopanic_news if n['sentiment'] == 'positive']),
-                reddit_sentiment['positive'],
-                len([n for n in rss_news if n['sentiment'] == 'positive'])
-            ])
-            
-            total_negative = sum([
-                len([n for n in cryptopanic_news if n['sentiment'] == 'negative']),
-                reddit_sentiment['negative'],
-                len([n for n in rss_news if n['sentiment'] == 'negative'])
-            ])
+    @staticmethod
+    def format_market_sentiment(result: Dict) -> str:
+        """Texto del resumen a partir del resultado estructurado"""
+        sources = result['sources']
+        cryptopanic_news = sources['cryptopanic']['data'] or []
+        rss_news = sources['rss']['data'] or []
+        reddit_sentiment = sources['reddit']['data'] or {'summary': "Datos de Reddit no disponibles"}
+        
+        summary = []
+        summary.append("🌐 ANÁLISIS DE FUENTES EXTERNAS")
+        summary.append("=" * 45)
+        
+        # Análisis de noticias
+        if cryptopanic_news:
+            positive_news = sum(1 for n in cryptopanic_news if n['sentiment'] == 'positive')
+            negative_news = sum(1 for n in cryptopanic_news if n['sentiment'] == 'negative')
             
-            if total_positive > total_negative * 1.5:
-                mood = "OPTIMISTA - Sentimiento mayoritariamente positivo"
-            elif total_negative > total_positive * 1.5:
-                mood = "PESIMISTA - Sentimiento mayoritariamente negativo"
-            else:
-                mood = "NEUTRAL - Sentimiento mixto en el mercado"
+            summary.append(f"\n📰 NOTICIAS CRYPTOPANIC ({len(cryptopanic_news)} artículos):")
+            summary.append(f"   Positivas: {positive_news} | Negativas: {negative_news}")
             
-            summary.append(f"   {mood}")
-            summary.append(f"\n🔄 Actualizado: {datetime.now().strftime('%H:%M:%S')}")
+            # Mostrar noticia más relevante
+            top_news = max(cryptopanic_news, key=lambda x: x['votes'])
+            summary.append(f"   🔥 Trending: {top_news['title'][:60]}...")
+        
+        # Sentimiento de Reddit
+        summary.append(f"\n🔴 REDDIT SENTIMENT:")
+        summary.append(f"   {reddit_sentiment['summary']}")
+        
+        # Análisis de feeds RSS
+        if rss_news:
+            recent_positive = sum(1 for n in rss_news if n['sentiment'] == 'positive')
+            recent_negative = sum(1 for n in rss_news if n['sentiment'] == 'negative')
             
-            return "\n".join(summary)
+            summary.append(f"\n📡 MEDIOS ESPECIALIZADOS ({len(rss_news)} artículos 24h):")
+            summary.append(f"   Tono positivo: {recent_positive} | Tono negativo: {recent_negative}")
             
-        except Exception as e:
-            logging.error(f"Error generating market sentiment: {str(e)}")
-            return f"❌ Error obteniendo datos de fuentes externas: {str(e)}"
\ No newline at end of file
+            latest = rss_news[0]
+            summary.append(f"   📌 Último: {latest['title'][:50]}...")
+        
+        if result['coins']:
+            summary.append(f"\n🪙 SENTIMIENTO POR MONEDA (6h):")
+            for coin in result['coins']:
+                window = coin['windows']['6h']
+                summary.append(f"   {coin['symbol']}: {window['mood']} (score {window['score']:+.2f}, {window['total']:.1f} menciones)")
+        
+        # Fuentes que fallaron en la última consulta
+        stale = [name for name, source in sources.items() if source['status'] != 'ok']
+        if stale:
+            summary.append(f"\n⚠️ Fuentes sin actualizar: {', '.join(stale)}")
+        
+        # Resumen general
+        summary.append(f"\n💡 CONCLUSIÓN:")
+        summary.append(f"   {result['mood']}")
+        summary.append(f"\n🔄 Actualizado: {datetime.fromisoformat(result['timestamp']).strftime('%H:%M:%S')}")
+        
+        return "\n".join(summary)
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class FeedCache:
+    """Validadores HTTP y feeds parseados por URL"""
+
+    def __init__(self):
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self.parsed: Dict[str, feedparser.FeedParserDict] = {}
+        self.stats = {'not_modified': 0, 'modified': 0}
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Cabeceras If-None-Match / If-Modified-Since para la URL"""
+        with self._lock:
+            validators = self.validators.get(url)
+            if not validators or url not in self.parsed:
+                return {}
+            headers = {}
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+            return headers
+
+    def store(self, url: str, response: requests.Response, feed: feedparser.FeedParserDict):
+        """Guarda los validadores de la respuesta y el feed parseado"""
+        with self._lock:
+            self.validators[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+            self.parsed[url] = feed
+            self.stats['modified'] += 1
+
+    def reuse(self, url: str) -> Optional[feedparser.FeedParserDict]:
+        """Devuelve el feed parseado anterior tras un 304"""
+        with self._lock:
+            self.stats['not_modified'] += 1
+            return self.parsed.get(url)
+
+
+class FeedFetcher:
+    """Descarga concurrente de feeds RSS a través de una sesión con pool keep-alive"""
+
+    def __init__(self, session: Optional[requests.Session] = None, max_workers: int = 8,
+                 timeout: float = 10.0, deadline: float = 20.0):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cache = FeedCache()
+
+        # Un pool de conexiones por host del tamaño del pool de hilos
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feed-fetch')
+
+    def _download(self, url: str, timeout: float) -> requests.Response:
+        # GET condicional: si el feed no cambió el servidor responde 304 sin cuerpo
+        response = self.session.get(url, timeout=timeout, headers=self.cache.conditional_headers(url))
+        response.raise_for_status()
+        return response
+
+    def fetch_all(self, urls: List[str], timeout: Optional[float] = None,
+                  deadline: Optional[float] = None) -> Dict[str, Optional[requests.Response]]:
+        """Descarga todas las URLs a la vez; el tiempo total es el del feed más lento.
+
+        Cada descarga tiene su propio timeout y el conjunto un plazo global; las que
+        no terminen a tiempo o fallen devuelven None.
+        """
+        timeout = timeout or self.timeout
+        deadline = deadline or self.deadline
+
+        futures = {self.executor.submit(self._download, url, timeout): url for url in urls}
+        done, pending = wait(futures, timeout=deadline)
+
+        results = {url: None for url in urls}
+        for future in done:
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                logging.error(f"Error fetching feed {url}: {str(e)}")
+
+        for future in pending:
+            future.cancel()
+            logging.warning(f"Feed {futures[future]} exceeded global deadline of {deadline}s")
+
+        return results
+
+    def fetch_feeds(self, urls: List[str], timeout: Optional[float] = None,
+                    deadline: Optional[float] = None) -> Dict[str, Optional[feedparser.FeedParserDict]]:
+        """Descarga los feeds en paralelo y parsea solo los que cambiaron"""
+        responses = self.fetch_all(urls, timeout, deadline)
+
+        feeds = {}
+        for url, response in responses.items():
+            if response is None:
+                feeds[url] = None
+                continue
+            if response.status_code == 304:
+                feeds[url] = self.cache.reuse(url)
+                continue
+            try:
+                feed = feedparser.parse(
+                    response.content,
+                    response_headers={
+                        'content-type': response.headers.get('Content-Type', ''),
+                        'content-location': response.url
+                    }
+                )
+                self.cache.store(url, response, feed)
+                feeds[url] = feed
+            except Exception as e:
+                logging.error(f"Error parsing feed {url}: {str(e)}")
+                feeds[url] = None
+        return feeds
+
+    @staticmethod
+    def run_all(tasks: Dict[str, Callable], deadline: float = 20.0) -> Dict[str, Optional[object]]:
+        """Ejecuta varias fuentes independientes en paralelo con un plazo global"""
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)), thread_name_prefix='source')
+        try:
+            futures = {executor.submit(task): name for name, task in tasks.items()}
+            done, pending = wait(futures, timeout=deadline)
+
+            results = {name: None for name in tasks}
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logging.error(f"Error in source {name}: {str(e)}")
+
+            for future in pending:
+                logging.warning(f"Source {futures[future]} exceeded global deadline of {deadline}s")
+
+            logging.debug(f"Fetched {len(done)}/{len(tasks)} sources in {time.monotonic() - started:.2f}s")
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Libera el pool de hilos y las conexiones"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
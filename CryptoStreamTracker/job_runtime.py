@@ -0,0 +1,169 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from apscheduler.executors.pool import BasePoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+
+# Módulos que el servidor forkserver importa una vez; los workers nacen con ellos cargados
+_preload = set()
+
+
+def process_context(*preload: str) -> multiprocessing.context.BaseContext:
+    """Contexto para pools de procesos: forkserver donde exista, si no spawn.
+
+    fork copiaría un proceso con hilos vivos (scheduler, cola de voz, descargas) y el
+    hijo podría heredar locks tomados por otro hilo. forkserver crea los workers desde
+    un servidor de un solo hilo, así que lo enviado al pool debe ser una función de
+    nivel de módulo. El servidor es único por proceso y arranca con el primer pool que
+    crea un worker: los preload se acumulan entre llamadas.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    _preload.update(preload)
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(sorted(_preload))
+    return context
+
+
+class JobClassPool:
+    """Pool de una clase de trabajo con límite de concurrencia y métricas de cola.
+
+    pending cuenta lo enviado y no terminado; lo que excede max_workers está
+    esperando en la cola del pool (queued).
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, factory: Callable[[], Any]):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.factory = factory
+        self.pool = factory()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'pending': 0, 'peak_queued': 0}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self.stats['submitted'] += 1
+            self.stats['pending'] += 1
+            queued = self.stats['pending'] - self.max_workers
+            self.stats['peak_queued'] = max(self.stats['peak_queued'], queued)
+        try:
+            pool = self.pool
+            try:
+                future = pool.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # Un worker murió: se reemplaza el pool y se reintenta una vez
+                future = self._replace(pool).submit(fn, *args, **kwargs)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _replace(self, broken):
+        """Sustituye el pool roto una sola vez aunque varios hilos lo detecten a la vez"""
+        with self._lock:
+            if self.pool is broken:
+                logging.warning(f"Executor {self.name} is broken; replacing pool")
+                self.pool = self.factory()
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self.pool
+
+    def _done(self, future: Optional[Future]):
+        with self._lock:
+            self.stats['pending'] -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self.stats['completed'] += 1
+            else:
+                self.stats['failed'] += 1
+
+    def shutdown(self, wait: bool = True):
+        self.pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            pending = self.stats['pending']
+            return dict(
+                self.stats,
+                kind=self.kind,
+                max_workers=self.max_workers,
+                running=min(pending, self.max_workers),
+                queued=max(0, pending - self.max_workers)
+            )
+
+
+class SharedPoolExecutor(BasePoolExecutor):
+    """Executor de APScheduler sobre un JobClassPool compartido con submit() directo"""
+
+    def __init__(self, pool: JobClassPool):
+        super().__init__(pool)
+
+
+class SchedulerRuntime:
+    """Un único scheduler con executors separados por clase de trabajo.
+
+    - io: hilos para trabajos que esperan red (precios, feeds, orquestación del análisis)
+    - cpu: procesos para funciones puras de cálculo (construcción de reportes), fuera del GIL
+    - voice: un solo hilo para los trabajos de anuncios (la síntesis va a la cola de VoiceSystem)
+
+    Los trabajos programados son métodos ligados (no serializables), así que solo
+    usan las clases de hilos; el trabajo CPU se delega a 'cpu' con run()/submit()
+    y debe ser una función de nivel de módulo (los workers salen de forkserver).
+    """
+
+    def __init__(self, io_workers: int = 4, cpu_workers: int = 2):
+        # Las funciones de cálculo que se envían a 'cpu' viven en crypto_assistant
+        context = process_context('crypto_assistant')
+        self.pools = {
+            'io': JobClassPool('io', 'thread', io_workers,
+                               lambda: ThreadPoolExecutor(io_workers, thread_name_prefix='job-io')),
+            'cpu': JobClassPool('cpu', 'process', cpu_workers,
+                                lambda: ProcessPoolExecutor(cpu_workers, mp_context=context)),
+            'voice': JobClassPool('voice', 'thread', 1,
+                                  lambda: ThreadPoolExecutor(1, thread_name_prefix='job-voice'))
+        }
+        self.scheduler = BackgroundScheduler(
+            executors={
+                'default': SharedPoolExecutor(self.pools['io']),
+                'io': SharedPoolExecutor(self.pools['io']),
+                'voice': SharedPoolExecutor(self.pools['voice'])
+            }
+        )
+
+    def submit(self, job_class: str, fn: Callable, *args, **kwargs) -> Future:
+        return self.pools[job_class].submit(fn, *args, **kwargs)
+
+    def run(self, job_class: str, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Ejecuta fn en el pool de la clase y espera el resultado"""
+        return self.submit(job_class, fn, *args, **kwargs).result(timeout=timeout)
+
+    def shutdown(self, wait: bool = False):
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=wait)
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+    def get_status(self) -> Dict:
+        return {name: pool.get_status() for name, pool in self.pools.items()}
+
+    def render_metrics(self) -> str:
+        """Métricas por clase de trabajo en formato de texto de Prometheus"""
+        status = self.get_status()
+        lines = []
+        for metric, kind, key, help_text in (
+            ('scheduler_executor_queued', 'gauge', 'queued', 'Tasks waiting for a worker'),
+            ('scheduler_executor_running', 'gauge', 'running', 'Tasks currently running'),
+            ('scheduler_executor_max_workers', 'gauge', 'max_workers', 'Concurrency limit of the job class'),
+            ('scheduler_executor_peak_queued', 'gauge', 'peak_queued', 'Highest observed queue depth'),
+            ('scheduler_executor_submitted_total', 'counter', 'submitted', 'Tasks submitted'),
+            ('scheduler_executor_failed_total', 'counter', 'failed', 'Tasks that raised or were cancelled')
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, pool in sorted(status.items()):
+                lines.append(f'{metric}{{job_class="{name}"}} {float(pool[key])}')
+        return '\n'.join(lines) + '\n'
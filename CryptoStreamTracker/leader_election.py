@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, cada proceso se considera líder
+    fcntl = None
+
+
+class LeaderElection:
+    """Elección de líder entre procesos de la misma máquina con un flock sobre un archivo.
+
+    Solo el proceso que obtiene el lock exclusivo ejecuta los trabajos programados.
+    El sistema operativo libera el lock cuando el líder muere, así que un seguidor
+    lo obtiene en su siguiente intento (cada retry_interval segundos).
+    """
+
+    def __init__(self, path: str = 'scheduler.lock', retry_interval: float = 2.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self.leader_since = None
+        self.on_elected: Optional[Callable[[], None]] = None
+        self._fd = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def try_acquire(self) -> bool:
+        """Intenta obtener el lock sin bloquear; devuelve True si este proceso es el líder"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self._become_leader()
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        # Identidad del líder para que los seguidores puedan informarla
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, json.dumps({
+            'pid': os.getpid(),
+            'host': socket.gethostname(),
+            'since': datetime.now().isoformat()
+        }).encode('utf-8'), 0)
+        self._become_leader()
+        return True
+
+    def _become_leader(self):
+        self.is_leader = True
+        self.leader_since = datetime.now().isoformat()
+        logging.info(f"👑 Process {os.getpid()} elected scheduler leader")
+        if self.on_elected:
+            try:
+                self.on_elected()
+            except Exception as e:
+                logging.error(f"Error starting leader jobs: {str(e)}")
+
+    def start(self, on_elected: Callable[[], None]):
+        """Intenta ser líder ahora y, si no, sigue intentándolo en segundo plano"""
+        self.on_elected = on_elected
+        if self.try_acquire():
+            return
+        logging.info(f"Process {os.getpid()} is a scheduler follower (leader: {self.read_leader()})")
+        self._thread = threading.Thread(target=self._run, name='leader-election', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.retry_interval):
+            try:
+                if self.try_acquire():
+                    return
+            except Exception as e:
+                logging.error(f"Error in leader election: {str(e)}")
+
+    def release(self):
+        """Libera el liderazgo (al cerrar el proceso)"""
+        self._stop_event.set()
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+            except OSError as e:
+                logging.error(f"Error releasing leader lock: {str(e)}")
+            self._fd = None
+        self.is_leader = False
+
+    def read_leader(self) -> Optional[Dict]:
+        """Identidad del líder actual según el archivo de lock"""
+        try:
+            with open(self.path, 'r') as f:
+                content = f.read()
+            return json.loads(content) if content else None
+        except (OSError, ValueError):
+            return None
+
+    def get_status(self) -> Dict:
+        return {
+            'is_leader': self.is_leader,
+            'pid': os.getpid(),
+            'leader': self.read_leader(),
+            'leader_since': self.leader_since,
+            'lock_path': self.path,
+            'retry_interval_seconds': self.retry_interval
+        }
@@ -1,4 +1,11 @@
-from app import app
+from app import app, init_runtime
+
+
+def create_app():
+    """Application factory for gunicorn: gunicorn --bind 0.0.0.0:$PORT 'main:create_app()'"""
+    return init_runtime()
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    init_runtime()
+    app.run(host='0.0.0.0', port=5000, debug=True)
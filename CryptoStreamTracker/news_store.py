@@ -0,0 +1,481 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import clock
+
+# Feeds especializados que comparten ExternalSources y CharlyNews
+NEWS_FEEDS = [
+    'https://cointelegraph.com/rss',
+    'https://coindesk.com/arc/outboundfeeds/rss/',
+    'https://decrypt.co/feed',
+    'https://bitcoinmagazine.com/.rss/full/'
+]
+
+# Parámetros de seguimiento: prefijo solo para utm_*, el resto por nombre exacto ('referrer' o 'ref_id' se conservan)
+TRACKING_PREFIX = 'utm_'
+TRACKING_PARAMS = frozenset({'ref', 'fbclid', 'gclid', 'mc_cid', 'mc_eid'})
+
+# Términos de búsqueda: palabras con '*' final opcional para prefijos
+SEARCH_TOKEN = re.compile(r'\w+\*?')
+
+
+def canonical_url(url: str) -> str:
+    """Normaliza una URL de artículo para deduplicar entre feeds"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not (key.lower().startswith(TRACKING_PREFIX) or key.lower() in TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def url_hash(url: str) -> str:
+    """Hash de la URL canónica, clave primaria del almacén"""
+    return hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()
+
+
+class NewsStore:
+    """Almacén local de artículos deduplicados por hash de URL canónica"""
+
+    def __init__(self, db_path: str = 'news.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url_hash TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT,
+                    source TEXT NOT NULL,
+                    feed_url TEXT,
+                    published REAL NOT NULL,
+                    ingested REAL NOT NULL,
+                    sentiment TEXT,
+                    mentions TEXT,
+                    extracted REAL
+                )
+            """)
+            # Migración de bases creadas antes de la extracción de texto completo
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(articles)")}
+            if 'extracted' not in columns:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN extracted REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, published)")
+            self._create_search_schema()
+
+    def _create_search_schema(self):
+        """Índice invertido FTS5 (BM25) y tabla de menciones por símbolo, mantenidos por triggers"""
+        has_index = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'"
+        ).fetchone()
+
+        # Sin contenido: el texto ya vive en articles y en la caché de texto completo
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+            USING fts5(title, summary, body, content='', tokenize='porter unicode61')
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS article_mentions (
+                symbol TEXT NOT NULL,
+                published REAL NOT NULL,
+                article_id INTEGER NOT NULL,
+                PRIMARY KEY (symbol, published, article_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS articles_search_insert AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, summary, body)
+                VALUES (new.rowid, new.title, coalesce(new.summary, ''), '');
+                INSERT OR IGNORE INTO article_mentions (symbol, published, article_id)
+                SELECT value, new.published, new.rowid FROM json_each(coalesce(new.mentions, '[]'));
+            END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS articles_mentions_update AFTER UPDATE OF mentions ON articles BEGIN
+                DELETE FROM article_mentions
+                WHERE symbol IN (SELECT value FROM json_each(coalesce(old.mentions, '[]')))
+                  AND published = old.published AND article_id = old.rowid;
+                INSERT OR IGNORE INTO article_mentions (symbol, published, article_id)
+                SELECT value, new.published, new.rowid FROM json_each(coalesce(new.mentions, '[]'));
+            END
+        """)
+
+        if not has_index:
+            # Bases anteriores al índice: indexar los artículos existentes una vez
+            self._conn.execute("""
+                INSERT INTO articles_fts (rowid, title, summary, body)
+                SELECT rowid, title, coalesce(summary, ''), '' FROM articles
+            """)
+            self._conn.execute("""
+                INSERT OR IGNORE INTO article_mentions (symbol, published, article_id)
+                SELECT m.value, a.published, a.rowid FROM articles a, json_each(coalesce(a.mentions, '[]')) m
+            """)
+
+    def known_hashes(self, hashes: List[str]) -> set:
+        """Devuelve cuáles de los hashes ya están almacenados"""
+        if not hashes:
+            return set()
+        placeholders = ','.join('?' * len(hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url_hash FROM articles WHERE url_hash IN ({placeholders})", hashes
+            ).fetchall()
+        return {row['url_hash'] for row in rows}
+
+    def add_articles(self, articles: List[Dict]) -> int:
+        """Inserta artículos nuevos; los ya conocidos se ignoran"""
+        if not articles:
+            return 0
+        rows = [
+            (
+                a['url_hash'], a['url'], a['title'], a.get('summary', ''), a['source'],
+                a.get('feed_url'), a['published'].timestamp(), clock.timestamp(),
+                a.get('sentiment'), json.dumps(a.get('mentions', []))
+            )
+            for a in articles
+        ]
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO articles "
+                "(url_hash, url, title, summary, source, feed_url, published, ingested, sentiment, mentions) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return cursor.rowcount
+
+    def update_analysis(self, url_hash: str, sentiment: str, mentions: List[str], body: Optional[str] = None):
+        """Actualiza sentimiento y menciones tras analizar el texto completo, e indexa el texto"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT rowid, title, summary, extracted FROM articles WHERE url_hash = ?", (url_hash,)
+            ).fetchone()
+            if row is None:
+                return
+            self._conn.execute(
+                "UPDATE articles SET sentiment = ?, mentions = ?, extracted = ? WHERE url_hash = ?",
+                (sentiment, json.dumps(mentions), clock.timestamp(), url_hash)
+            )
+            if body and row['extracted'] is None:
+                # FTS5 sin contenido: se borra con los valores indexados originales y se reinserta
+                summary = row['summary'] or ''
+                self._conn.execute(
+                    "INSERT INTO articles_fts (articles_fts, rowid, title, summary, body) VALUES ('delete', ?, ?, ?, '')",
+                    (row['rowid'], row['title'], summary)
+                )
+                self._conn.execute(
+                    "INSERT INTO articles_fts (rowid, title, summary, body) VALUES (?, ?, ?, ?)",
+                    (row['rowid'], row['title'], summary, body)
+                )
+
+    @staticmethod
+    def build_match_query(text: str) -> str:
+        """Convierte texto libre en una consulta FTS5 segura: términos entre comillas, 'term*' como prefijo"""
+        terms = []
+        for token in SEARCH_TOKEN.findall(text):
+            prefix = token.endswith('*')
+            token = token.rstrip('*')
+            if token:
+                terms.append(f'"{token}"*' if prefix else f'"{token}"')
+        return ' '.join(terms)
+
+    def search(self, query: Optional[str] = None, symbol: Optional[str] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None,
+               limit: int = 20) -> List[Dict]:
+        """Busca artículos por texto (ranking BM25), símbolo mencionado y rango de fechas.
+
+        Sin texto devuelve los artículos filtrados del más reciente al más antiguo.
+        """
+        match = self.build_match_query(query) if query else ''
+        where = []
+        params: List = []
+
+        if match:
+            # Pesos BM25 por columna: título > resumen > texto completo
+            sql = ("SELECT a.*, bm25(articles_fts, 10.0, 4.0, 1.0) AS rank "
+                   "FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid")
+            where.append("articles_fts MATCH ?")
+            params.append(match)
+        elif symbol:
+            sql = ("SELECT a.*, NULL AS rank FROM article_mentions m "
+                   "JOIN articles a ON a.rowid = m.article_id")
+        else:
+            sql = "SELECT a.*, NULL AS rank FROM articles a"
+
+        if symbol:
+            published_column = 'm.published' if not match else 'a.published'
+            if match:
+                # El rango de fechas se aplica una sola vez, en la consulta exterior
+                where.append("a.rowid IN (SELECT article_id FROM article_mentions WHERE symbol = ?)")
+                params.append(symbol.upper())
+            else:
+                where.append("m.symbol = ?")
+                params.append(symbol.upper())
+        else:
+            published_column = 'a.published'
+
+        if since:
+            where.append(f"{published_column} >= ?")
+            params.append(since.timestamp())
+        if until:
+            where.append(f"{published_column} < ?")
+            params.append(until.timestamp())
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rank" if match else f" ORDER BY {published_column} DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []
+        for row in rows:
+            article = self._row_to_article(row)
+            article['score'] = round(-row['rank'], 4) if row['rank'] is not None else None
+            results.append(article)
+        return results
+
+    def recent(self, hours: float = 24, per_source_limit: Optional[int] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """Artículos de la ventana indicada, más recientes primero, con tope opcional por fuente"""
+        since = (clock.now() - timedelta(hours=hours)).timestamp()
+        sql = """
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY source ORDER BY published DESC) AS source_rank
+                FROM articles WHERE published > ?
+            )
+        """
+        params: List = [since]
+        if per_source_limit:
+            sql += " WHERE source_rank <= ?"
+            params.append(per_source_limit)
+        sql += " ORDER BY published DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_article(row) for row in rows]
+
+    @staticmethod
+    def _row_to_article(row: sqlite3.Row) -> Dict:
+        return {
+            'url_hash': row['url_hash'],
+            'title': row['title'],
+            'url': row['url'],
+            'summary': row['summary'] or '',
+            'source': row['source'],
+            'published': datetime.fromtimestamp(row['published']),
+            'sentiment': row['sentiment'] or 'neutral',
+            'mentions': json.loads(row['mentions'] or '[]')
+        }
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        try:
+            with self._lock:
+                self._conn.close()
+        except Exception as e:
+            logging.error(f"Error closing news store: {str(e)}")
+
+
+class NewsIngester:
+    """Ingesta única de feeds por ciclo hacia el NewsStore compartido"""
+
+    def __init__(self, store: NewsStore, feed_fetcher, analyzer, feeds: List[str] = None,
+                 interval_seconds: int = 300, aggregator=None, extractor=None):
+        self.store = store
+        self.feed_fetcher = feed_fetcher
+        self.analyzer = analyzer  # provee score_texts (sentimiento y menciones por lote)
+        self.feeds = feeds or NEWS_FEEDS
+        self.interval_seconds = interval_seconds
+        self.aggregator = aggregator  # SentimentAggregator opcional, se actualiza con cada artículo nuevo
+        self.extractor = extractor  # ArticleExtractor opcional para el texto completo
+        self.last_cycle = None
+        self.last_cycle_new = 0
+        self.last_cycle_failed = 0  # feeds sin respuesta en el último ciclo
+        # Seguidor: el líder ingesta en el almacén compartido, aquí solo se lee
+        self.read_only = False
+        self._cycle_lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def ingest(self) -> int:
+        """Descarga cada feed una vez y guarda los artículos nuevos"""
+        with self._cycle_lock:
+            parsed_feeds = self.feed_fetcher.fetch_feeds(self.feeds)
+
+            candidates = {}
+            for feed_url in self.feeds:
+                feed = parsed_feeds.get(feed_url)
+                if feed is None:
+                    continue
+                source = feed.feed.get('title', 'RSS Feed')
+                for entry in feed.entries:
+                    link = entry.get('link')
+                    if not link:
+                        continue
+                    published = entry.get('published_parsed')
+                    candidates.setdefault(url_hash(link), (entry, source, feed_url,
+                                          datetime(*published[:6]) if published else clock.now()))
+
+            # Solo se puntúan los artículos que no estaban en el almacén
+            known = self.store.known_hashes(list(candidates))
+            articles = []
+            for hashed, (entry, source, feed_url, published) in candidates.items():
+                if hashed in known:
+                    continue
+                articles.append({
+                    'url_hash': hashed,
+                    'url': entry.get('link'),
+                    'title': entry.get('title', ''),
+                    'summary': entry.get('summary', ''),
+                    'source': source,
+                    'feed_url': feed_url,
+                    'published': published
+                })
+
+            scores = self.analyzer.score_texts([a['title'] + ' ' + a['summary'] for a in articles])
+            for article, score in zip(articles, scores):
+                article.update(score)
+
+            inserted = self.store.add_articles(articles)
+            if self.aggregator:
+                self.aggregator.record_articles(sorted(articles, key=lambda a: a['published']))
+            if self.extractor:
+                self.extractor.submit(articles)
+            self.last_cycle = time.monotonic()
+            self.last_cycle_new = inserted
+            self.last_cycle_failed = sum(1 for feed_url in self.feeds if parsed_feeds.get(feed_url) is None)
+            logging.info(f"📰 News ingest: {inserted} new articles from {len(self.feeds)} feeds")
+            return inserted
+
+    def ensure_fresh(self, max_age: Optional[float] = None):
+        """Ejecuta un ciclo si el último es más viejo que max_age; consumidores concurrentes esperan al mismo"""
+        max_age = max_age if max_age is not None else self.interval_seconds
+        if self.read_only or self._is_fresh(max_age):
+            return
+        with self._cycle_lock:
+            if self._is_fresh(max_age):
+                return
+            self.ingest()
+
+    def _is_fresh(self, max_age: float) -> bool:
+        return self.last_cycle is not None and time.monotonic() - self.last_cycle < max_age
+
+    def start(self):
+        """Inicia la ingesta periódica en segundo plano"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='news-ingester', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.ensure_fresh()
+            except Exception as e:
+                logging.error(f"Error in news ingest: {str(e)}")
+            self._stop_event.wait(self.interval_seconds)
+
+
+def benchmark_search(articles: int = 200000, queries: int = 200, seed: int = 7) -> Dict:
+    """Mide la latencia de búsqueda sobre un archivo sintético de artículos"""
+    import itertools
+    import random
+    import statistics
+    import tempfile
+
+    rng = random.Random(seed)
+    symbols = ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'DOGE', 'AVAX', 'LINK']
+    # Vocabulario con distribución de Zipf, como el texto real: pocos términos muy frecuentes
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9)))
+                  for _ in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    def words(count):
+        return rng.choices(vocabulary, cum_weights=cum_weights, k=count)
+
+    # Consultas con términos de frecuencia media (ni stopwords ni hapax)
+    query_terms = vocabulary[50:2000]
+    store = NewsStore(os.path.join(tempfile.mkdtemp(), 'news_bench.db'))
+    now = clock.now()
+
+    started = time.perf_counter()
+    for offset in range(0, articles, 10000):
+        batch = []
+        for i in range(offset, min(offset + 10000, articles)):
+            mentioned = rng.sample(symbols, rng.randint(0, 2))
+            batch.append({
+                'url_hash': f"{i:040x}",
+                'url': f"https://example.com/article/{i}",
+                'title': ' '.join(words(8)) + ' ' + ' '.join(mentioned),
+                'summary': ' '.join(words(30)),
+                'source': f"source{i % 8}",
+                'published': now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+                'sentiment': rng.choice(['positive', 'negative', 'neutral']),
+                'mentions': mentioned
+            })
+        store.add_articles(batch)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(queries):
+        since = now - timedelta(hours=48)
+        query = rng.choice(query_terms)
+        started = time.perf_counter()
+        store.search(query=query, symbol=rng.choice(symbols), since=since, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    symbol_latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        store.search(symbol=rng.choice(symbols), since=now - timedelta(hours=48), limit=20)
+        symbol_latencies.append((time.perf_counter() - started) * 1000)
+    text_latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        store.search(query=rng.choice(query_terms), limit=20)
+        text_latencies.append((time.perf_counter() - started) * 1000)
+    store.close()
+
+    return {
+        'articles': articles,
+        'load_seconds': round(load_seconds, 2),
+        'text_symbol_48h_median_ms': round(statistics.median(latencies), 2),
+        'symbol_48h_median_ms': round(statistics.median(symbol_latencies), 2),
+        'text_only_median_ms': round(statistics.median(text_latencies), 2),
+        'text_only_p95_ms': round(sorted(text_latencies)[int(queries * 0.95)], 2)
+    }
+
+
+if __name__ == "__main__":
+    print("Benchmark de búsqueda de noticias:")
+    print(benchmark_search())
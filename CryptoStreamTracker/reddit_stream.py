@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional
+
+import clock
+
+# Subreddits seguidos por defecto (un único stream multireddit)
+DEFAULT_SUBREDDITS = ['cryptocurrency', 'bitcoin', 'ethereum', 'cryptomarkets']
+
+
+class SubmissionSource(ABC):
+    """Interfaz de una fuente de posts de Reddit.
+
+    stream() produce dicts con id, subreddit, title, selftext y created_utc a medida
+    que llegan, y None cuando no hay posts nuevos (momento para vaciar el lote y
+    comprobar si hay que detenerse).
+    """
+
+    @abstractmethod
+    def stream(self, subreddits: List[str]) -> Iterator[Optional[Dict]]:
+        ...
+
+
+class PrawSubmissionSource(SubmissionSource):
+    """Fuente real sobre un cliente praw (solo lectura)"""
+
+    def __init__(self, reddit):
+        self.reddit = reddit
+
+    def stream(self, subreddits: List[str]) -> Iterator[Optional[Dict]]:
+        subreddit = self.reddit.subreddit('+'.join(subreddits))
+        # pause_after=0 devuelve None en cuanto una consulta no trae posts nuevos
+        for submission in subreddit.stream.submissions(pause_after=0):
+            if submission is None:
+                yield None
+                continue
+            yield {
+                'id': submission.id,
+                'subreddit': str(submission.subreddit).lower(),
+                'title': submission.title or '',
+                'selftext': submission.selftext or '',
+                'created_utc': float(submission.created_utc)
+            }
+
+
+class ReplaySubmissionSource(SubmissionSource):
+    """Fuente local que reproduce posts desde un archivo JSONL (desarrollo y pruebas)"""
+
+    def __init__(self, path: str, delay: float = 0.0, batch_size: int = 100):
+        self.path = path
+        self.delay = delay
+        self.batch_size = batch_size
+
+    def stream(self, subreddits: List[str]) -> Iterator[Optional[Dict]]:
+        wanted = {name.lower() for name in subreddits}
+        with open(self.path, 'r') as f:
+            for i, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                post = json.loads(line)
+                if post.get('subreddit', '').lower() not in wanted:
+                    continue
+                yield post
+                if i % self.batch_size == 0:
+                    yield None
+                if self.delay:
+                    time.sleep(self.delay)
+        yield None
+
+
+class RedditCheckpoint:
+    """Último post visto, persistido para reanudar el stream sin reprocesar"""
+
+    def __init__(self, path: str = 'reddit_checkpoint.json', remember: int = 1000):
+        self.path = path
+        self.last_id = None
+        self.last_created = 0.0
+        self.recent_ids = deque(maxlen=remember)
+        self._recent_set = set()
+        self.load()
+
+    def is_new(self, post: Dict) -> bool:
+        """Los streams devuelven los últimos posts al arrancar; se descartan los ya vistos"""
+        if post['id'] in self._recent_set:
+            return False
+        return post['created_utc'] >= self.last_created - 60 or self.last_id is None
+
+    def mark(self, post: Dict):
+        if len(self.recent_ids) == self.recent_ids.maxlen:
+            self._recent_set.discard(self.recent_ids[0])
+        self.recent_ids.append(post['id'])
+        self._recent_set.add(post['id'])
+        if post['created_utc'] >= self.last_created:
+            self.last_created = post['created_utc']
+            self.last_id = post['id']
+
+    def save(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'last_id': self.last_id,
+                    'last_created': self.last_created,
+                    'recent_ids': list(self.recent_ids)
+                }, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Error guardando checkpoint de Reddit: {str(e)}")
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                self.last_id = data.get('last_id')
+                self.last_created = data.get('last_created', 0.0)
+                self.recent_ids.extend(data.get('recent_ids', []))
+                self._recent_set = set(self.recent_ids)
+        except Exception as e:
+            logging.error(f"Error cargando checkpoint de Reddit: {str(e)}")
+
+
+class RedditStreamIngester:
+    """Consume posts nuevos en segundo plano y actualiza el sentimiento de forma incremental"""
+
+    def __init__(self, source: SubmissionSource, analyzer, aggregator=None,
+                 checkpoint: Optional[RedditCheckpoint] = None, subreddits: List[str] = None,
+                 batch_size: int = 50, window_hours: float = 24, retry_seconds: float = 30):
+        self.source = source
+        self.analyzer = analyzer  # provee score_texts
+        self.aggregator = aggregator
+        self.checkpoint = checkpoint or RedditCheckpoint()
+        self.subreddits = subreddits or DEFAULT_SUBREDDITS
+        self.batch_size = batch_size
+        self.window_seconds = window_hours * 3600
+        self.retry_seconds = retry_seconds
+
+        # Ventana de posts recientes con contadores mantenidos al entrar/salir
+        self.window = deque()
+        self.counts = Counter()
+        self.mentions = Counter()
+        self.stats = {'posts': 0, 'skipped': 0, 'batches': 0, 'errors': 0, 'last_post': None,
+                      'last_error': None}
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def process(self, posts: List[Dict]) -> int:
+        """Puntúa un lote de posts nuevos y los incorpora a los agregados"""
+        fresh = []
+        for post in posts:
+            if self.checkpoint.is_new(post):
+                fresh.append(post)
+                self.checkpoint.mark(post)
+            else:
+                self.stats['skipped'] += 1
+        if not fresh:
+            return 0
+
+        scores = self.analyzer.score_texts([p['title'] + ' ' + p['selftext'] for p in fresh])
+        with self._lock:
+            for post, score in zip(fresh, scores):
+                # Trending solo con menciones del título, como el análisis original
+                mentions = self.analyzer.extract_crypto_mentions(post['title'])
+                self.window.append((post['created_utc'], score['sentiment'], mentions))
+                self.counts[score['sentiment']] += 1
+                self.mentions.update(mentions)
+                if self.aggregator:
+                    self.aggregator.record(score['sentiment'], score['mentions'], post['created_utc'])
+            self._expire(clock.timestamp())
+            self.stats['posts'] += len(fresh)
+            self.stats['batches'] += 1
+            self.stats['last_post'] = fresh[-1]['created_utc']
+
+        self.checkpoint.save()
+        return len(fresh)
+
+    def _expire(self, now: float):
+        while self.window and self.window[0][0] < now - self.window_seconds:
+            _, sentiment, mentions = self.window.popleft()
+            self.counts[sentiment] -= 1
+            self.mentions.subtract(mentions)
+
+    def get_summary(self) -> Dict:
+        """Sentimiento de Reddit de la ventana actual, sin llamadas a la API"""
+        with self._lock:
+            self._expire(clock.timestamp())
+            return {
+                'positive': self.counts['positive'],
+                'negative': self.counts['negative'],
+                'neutral': self.counts['neutral'],
+                'total_posts': len(self.window),
+                'trending_topics': [symbol for symbol, count in self.mentions.most_common(10) if count > 0]
+            }
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, running=bool(self._thread and self._thread.is_alive()),
+                        last_id=self.checkpoint.last_id, window_posts=len(self.window))
+
+    def start(self):
+        """Inicia el consumo del stream en segundo plano"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='reddit-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = []
+            try:
+                for post in self.source.stream(self.subreddits):
+                    # El stream vuelve a responder: deja de contar como caído
+                    self.stats['last_error'] = None
+                    if post is not None:
+                        batch.append(post)
+                    if post is None or len(batch) >= self.batch_size:
+                        self.process(batch)
+                        batch = []
+                    if self._stop_event.is_set():
+                        break
+                self.process(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = str(e)
+                logging.error(f"Error in Reddit stream: {str(e)}")
+            # El stream terminó (replay agotado o error de red): reintentar tras una pausa
+            self._stop_event.wait(self.retry_seconds)
@@ -0,0 +1,241 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import clock
+from alert_backtest import PriceSeries, generate_synthetic_series, load_series_dir
+from alert_system import AlertSystem
+from analysis_store import AnalysisStore
+from auto_scheduler import AutoScheduler
+from crypto_service import CryptoService
+from external_sources import ExternalSources
+from job_runtime import SchedulerRuntime
+from sentiment_aggregates import SentimentAggregator
+from text_matcher import get_matcher
+
+
+class ReplayCryptoService(CryptoService):
+    """CryptoService que responde /simple/price desde series grabadas según el reloj activo"""
+
+    def __init__(self, series_list: List[PriceSeries]):
+        super().__init__()
+        self.series = {series.symbol: series for series in series_list}
+        self.supported_coins = [
+            {'id': series.symbol, 'symbol': series.symbol, 'name': series.name or series.symbol.upper()}
+            for series in series_list
+        ]
+
+    def _make_request(self, endpoint: str, params: dict = None) -> Optional[dict]:
+        self.api_calls.append(clock.timestamp())
+        if endpoint != 'simple/price':
+            return None
+
+        now = clock.timestamp()
+        data = {}
+        for symbol, series in self.series.items():
+            i = bisect_right(series.timestamps, now) - 1
+            if i < 0:
+                continue
+            # Cambio 24h contra la última muestra de hace al menos un día
+            j = bisect_right(series.timestamps, now - 86400) - 1
+            base = series.prices[j] if j >= 0 else series.prices[0]
+            data[symbol] = {
+                'usd': series.prices[i],
+                'usd_24h_change': (series.prices[i] / base - 1) * 100 if base else 0,
+                'usd_market_cap': series.market_caps[i],
+                'usd_24h_vol': series.volumes_24h[i]
+            }
+        return data or None
+
+
+class ReplayNewsSource:
+    """Fuente de sentimiento a partir de artículos grabados, liberados según el reloj activo.
+
+    Puntúa con el mismo matcher y agregados que ExternalSources y arma el resultado con
+    su mismo formato, presentando los artículos grabados como fuente 'rss'.
+    """
+
+    def __init__(self, articles: List[Dict]):
+        self.articles = sorted(articles, key=lambda a: a['published'])
+        self.published = [a['published'].timestamp() for a in self.articles]
+        self.matcher = get_matcher()
+        self.sentiment = SentimentAggregator()
+        self.released = 0
+
+    def _release(self, now: float):
+        due = bisect_right(self.published, now)
+        for article in self.articles[self.released:due]:
+            result = self.matcher.match(f"{article['title']} {article.get('summary', '')}")
+            article['sentiment'] = self.matcher.sentiment(result.counts)
+            article['mentions'] = result.mentions
+            self.sentiment.record(article['sentiment'], article['mentions'], article['published'].timestamp())
+        self.released = max(self.released, due)
+
+    def get_market_sentiment(self) -> Dict:
+        now = clock.now()
+        self._release(now.timestamp())
+
+        start = bisect_left(self.published, now.timestamp() - 86400)
+        recent = list(reversed(self.articles[start:self.released]))
+        sources = {
+            'cryptopanic': {'status': 'unavailable', 'updated': None, 'data': None},
+            'reddit': {'status': 'unavailable', 'updated': None, 'data': None},
+            'rss': {'status': 'ok', 'updated': now.isoformat(), 'data': recent}
+        }
+        coins = [self.sentiment.get(symbol) for symbol in self.sentiment.symbols()]
+        coins = [c for c in coins if c and c['windows']['6h']['total'] >= 1]
+        coins.sort(key=lambda c: c['windows']['6h']['total'], reverse=True)
+
+        result = {'timestamp': now.isoformat(), 'sources': sources, 'coins': coins[:5]}
+        result.update(ExternalSources._conclude(sources))
+        result['summary'] = ExternalSources.format_market_sentiment(result)
+        return result
+
+    def refresh_market_sentiment(self) -> Dict:
+        return self.get_market_sentiment()
+
+
+def load_articles_jsonl(path: str) -> List[Dict]:
+    """Artículos grabados: una línea JSON con published (ISO 8601), title y opcionalmente summary/source"""
+    articles = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                article = json.loads(line)
+                article['published'] = datetime.fromisoformat(article['published'])
+                articles.append(article)
+    return articles
+
+
+class ReplayRunner:
+    """Ejecuta el AutoScheduler completo sobre datos grabados con un reloj simulado.
+
+    No arranca el BackgroundScheduler: recorre los trabajos programados como una
+    simulación de eventos discretos, pidiendo a cada trigger (intervalo, cron o el
+    intervalo adaptativo reprogramado) su próxima ejecución según el reloj virtual,
+    avanzando el reloj hasta ella y ejecutando el trabajo de forma síncrona.
+    """
+
+    def __init__(self, series_list: List[PriceSeries], articles: Optional[List[Dict]] = None,
+                 start: Optional[datetime] = None, workdir: Optional[str] = None):
+        self.series_list = series_list
+        self.articles = articles or []
+        first_sample = min(series.timestamps[0] for series in series_list)
+        self.start = start or datetime.fromtimestamp(first_sample)
+        self.workdir = workdir  # None: directorio temporal por ejecución, se borra al terminar
+
+    def run(self, duration: timedelta = timedelta(days=1)) -> Dict:
+        sim = clock.SimulatedClock(self.start)
+        previous_clock = clock.set_clock(sim)
+        temp_dir = tempfile.TemporaryDirectory(prefix='replay_') if self.workdir is None else None
+        workdir = temp_dir.name if temp_dir else self.workdir
+        wall_started = time.perf_counter()
+        try:
+            service = ReplayCryptoService(self.series_list)
+            alert_system = AlertSystem(service, history_path=os.path.join(workdir, 'alert_history.json'))
+            analysis_store = AnalysisStore(os.path.join(workdir, 'analysis_history.db'), capacity=10000)
+            scheduler = AutoScheduler(
+                service, alert_system, None, ReplayNewsSource(self.articles),
+                analysis_store=analysis_store, runtime=SchedulerRuntime(io_workers=1, cpu_workers=1)
+            )
+            # El runner hace de scheduler en marcha (permite reprogramar el sondeo adaptativo)
+            scheduler.is_running = True
+            try:
+                runs, seconds = self._run_jobs(scheduler, sim, self.start + duration)
+            finally:
+                scheduler.stop()
+            analyses = analysis_store.count()
+            analysis_store.close()
+        finally:
+            clock.set_clock(previous_clock)
+            if temp_dir:
+                temp_dir.cleanup()
+
+        elapsed = time.perf_counter() - wall_started
+        alerts = Counter(alert.alert_type.value for alert in alert_system.alert_history)
+        return {
+            'start': self.start.isoformat(),
+            'end': sim.now().isoformat(),
+            'simulated_seconds': duration.total_seconds(),
+            'wall_seconds': round(elapsed, 3),
+            'speedup': round(duration.total_seconds() / elapsed, 1) if elapsed else None,
+            'job_runs': dict(runs),
+            'job_wall_seconds': {job_id: round(value, 3) for job_id, value in seconds.items()},
+            'api_calls': len(service.api_calls),
+            'alerts': dict(alerts),
+            'analyses': analyses,
+            'final_poll_interval': scheduler.cadence.interval,
+            'last_market_status': scheduler.last_analysis['market_status'] if scheduler.last_analysis else None,
+            'workdir': self.workdir
+        }
+
+    def _run_jobs(self, scheduler: AutoScheduler, sim: clock.SimulatedClock, end: datetime):
+        runs, seconds = Counter(), defaultdict(float)
+        end_ts = end.timestamp()
+
+        # Arranque en frío como AutoScheduler.start()
+        scheduler.initial_analysis()
+        runs['initial_analysis'] += 1
+
+        last_fire: Dict[str, datetime] = {}
+        planned: Dict[str, tuple] = {}  # job_id -> (trigger, próxima ejecución)
+        while True:
+            for job in scheduler.scheduler.get_jobs():
+                trigger, _ = planned.get(job.id, (None, None))
+                if trigger is not job.trigger:
+                    tz = job.trigger.timezone
+                    previous = last_fire.get(job.id) or clock.now(tz)
+                    planned[job.id] = (job.trigger, job.trigger.get_next_fire_time(previous, clock.now(tz)))
+
+            due = [(fire, job_id) for job_id, (_, fire) in planned.items() if fire is not None]
+            if not due:
+                break
+            fire, job_id = min(due)
+            if fire.timestamp() > end_ts:
+                break
+
+            sim.advance_to(fire)
+            job = scheduler.scheduler.get_job(job_id)
+            started = time.perf_counter()
+            job.func(*job.args, **job.kwargs)
+            seconds[job_id] += time.perf_counter() - started
+            runs[job_id] += 1
+            last_fire[job_id] = fire
+            planned.pop(job_id)
+
+        sim.advance_to(end)
+        return runs, seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay del AutoScheduler sobre datos grabados con reloj simulado")
+    parser.add_argument('data_dir', nargs='?', help="Directorio con archivos <símbolo>.csv (formato de alert_backtest)")
+    parser.add_argument('--synthetic-coins', type=int, default=0, help="Usar N series sintéticas en vez de CSV")
+    parser.add_argument('--news', help="Artículos grabados en JSONL (published, title, summary)")
+    parser.add_argument('--days', type=float, default=1, help="Días simulados")
+    parser.add_argument('--start', help="Inicio del replay (ISO 8601); por defecto la primera muestra")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.synthetic_coins:
+        data = generate_synthetic_series(args.synthetic_coins, max(1, int(args.days) + 1))
+    elif args.data_dir:
+        # El replay intercala todas las monedas en cada tick: necesita todas las series a la vez
+        data = list(load_series_dir(args.data_dir))
+    else:
+        parser.error("Indicar data_dir o --synthetic-coins")
+
+    runner = ReplayRunner(
+        data,
+        articles=load_articles_jsonl(args.news) if args.news else None,
+        start=datetime.fromisoformat(args.start) if args.start else None
+    )
+    print(json.dumps(runner.run(timedelta(days=args.days)), indent=2, ensure_ascii=False))
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from apscheduler.events import (EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES,
+                                EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED)
+
+import clock
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class JobTelemetry:
+    """Métricas por trabajo de APScheduler a partir de sus eventos.
+
+    Con max_instances=1 y coalesce=True las ejecuciones que se solapan o se acumulan
+    se descartan en silencio; aquí se cuentan: max_instances (solapadas), missed
+    (fuera de misfire_grace_time) y coalesced (ejecuciones debidas fusionadas en una,
+    deducidas del hueco entre ejecuciones de un trigger de intervalo).
+    """
+
+    def __init__(self, samples: int = 500):
+        self.samples = samples
+        self.jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, scheduler):
+        """Registra los listeners en un scheduler (se puede llamar con varios)"""
+        def listener(event):
+            self._on_event(scheduler, event)
+
+        scheduler.add_listener(
+            listener,
+            EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
+
+    def _job(self, scheduler, job_id: str) -> Dict:
+        job = self.jobs.get(job_id)
+        if job is None:
+            scheduled = scheduler.get_job(job_id)
+            job = self.jobs[job_id] = {
+                'name': scheduled.name if scheduled else job_id,
+                'trigger': None,
+                'interval_seconds': None,
+                'last_due': None,
+                'durations': deque(maxlen=self.samples),
+                'running_since': None,
+                'success': 0,
+                'failure': 0,
+                'missed': 0,
+                'coalesced': 0,
+                'max_instances': 0,
+                'last_success': None,
+                'last_error': None,
+                'last_duration': None
+            }
+        return job
+
+    @staticmethod
+    def _sync_trigger(scheduler, job_id: str, job: Dict):
+        """Relee el intervalo del trigger; si cambió (reschedule_job) la cuenta de fusionadas empieza de nuevo"""
+        scheduled = scheduler.get_job(job_id)
+        if scheduled is None:
+            return
+        interval = getattr(scheduled.trigger, 'interval', None)
+        start_date = getattr(scheduled.trigger, 'start_date', None)
+        # Se compara por valor: los jobstores persistentes devuelven un trigger nuevo en cada get_job
+        if job['trigger'] == (interval, start_date):
+            return
+        job['trigger'] = (interval, start_date)
+        job['interval_seconds'] = interval.total_seconds() if interval else None
+        # La primera ejecución debida es start_date; si llega tarde también se fusiona
+        job['last_due'] = start_date - interval if interval and start_date else None
+
+    def _count_coalesced(self, job: Dict, run_times):
+        # Un hueco de N intervalos entre ejecuciones debidas = N-1 ejecuciones fusionadas
+        due = max(run_times)
+        if job['last_due'] is not None and job['interval_seconds']:
+            gap = (due - job['last_due']).total_seconds()
+            job['coalesced'] += max(0, int(round(gap / job['interval_seconds'])) - 1)
+        job['last_due'] = due
+
+    def _on_event(self, scheduler, event):
+        with self._lock:
+            job = self._job(scheduler, event.job_id)
+
+            if event.code in (EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES):
+                self._sync_trigger(scheduler, event.job_id, job)
+
+            if event.code == EVENT_JOB_SUBMITTED:
+                self._count_coalesced(job, event.scheduled_run_times)
+                job['running_since'] = time.monotonic()
+            elif event.code == EVENT_JOB_MAX_INSTANCES:
+                self._count_coalesced(job, event.scheduled_run_times)
+                job['max_instances'] += 1
+            elif event.code == EVENT_JOB_MISSED:
+                job['missed'] += 1
+            elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+                if job['running_since'] is not None:
+                    duration = time.monotonic() - job['running_since']
+                    job['durations'].append(duration)
+                    job['last_duration'] = duration
+                    job['running_since'] = None
+                if event.code == EVENT_JOB_EXECUTED:
+                    job['success'] += 1
+                    job['last_success'] = clock.timestamp()
+                else:
+                    job['failure'] += 1
+                    job['last_error'] = str(event.exception)
+
+    def get_status(self) -> Dict:
+        """Resumen por trabajo para /api/scheduler/status"""
+        now = clock.timestamp()
+        status = {}
+        with self._lock:
+            for job_id, job in self.jobs.items():
+                durations = sorted(job['durations'])
+                p95 = percentile(durations, 95)
+                interval = job['interval_seconds']
+                status[job_id] = {
+                    'name': job['name'],
+                    'interval_seconds': interval,
+                    'runs': len(durations),
+                    'success': job['success'],
+                    'failure': job['failure'],
+                    'missed': job['missed'],
+                    'coalesced': job['coalesced'],
+                    'skipped_max_instances': job['max_instances'],
+                    'duration_p50_seconds': percentile(durations, 50),
+                    'duration_p95_seconds': p95,
+                    'duration_p99_seconds': percentile(durations, 99),
+                    'duration_max_seconds': durations[-1] if durations else None,
+                    'last_duration_seconds': job['last_duration'],
+                    'running': job['running_since'] is not None,
+                    'last_success': datetime.fromtimestamp(job['last_success']).isoformat() if job['last_success'] else None,
+                    'seconds_since_last_success': round(now - job['last_success'], 1) if job['last_success'] else None,
+                    'last_error': job['last_error'],
+                    # El p95 ya supera el intervalo: las ejecuciones empiezan a solaparse/fusionarse
+                    'exceeds_interval': bool(interval and p95 is not None and p95 >= interval)
+                }
+        return status
+
+    def render_metrics(self) -> str:
+        """Métricas en formato de texto de Prometheus"""
+        status = self.get_status()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {float(value)}")
+
+        jobs = sorted(status.items())
+        metric('scheduler_job_runs_total', 'counter', 'Job executions by outcome',
+               [({'job': job_id, 'outcome': outcome}, s[outcome]) for job_id, s in jobs
+                for outcome in ('success', 'failure')])
+        metric('scheduler_job_missed_total', 'counter', 'Runs missed past misfire_grace_time',
+               [({'job': job_id}, s['missed']) for job_id, s in jobs])
+        metric('scheduler_job_coalesced_total', 'counter', 'Due runs merged by coalescing',
+               [({'job': job_id}, s['coalesced']) for job_id, s in jobs])
+        metric('scheduler_job_skipped_max_instances_total', 'counter', 'Runs skipped because the job was still running',
+               [({'job': job_id}, s['skipped_max_instances']) for job_id, s in jobs])
+        metric('scheduler_job_duration_seconds', 'gauge', 'Job duration percentiles over recent runs',
+               [({'job': job_id, 'quantile': q}, s[f'duration_p{q}_seconds']) for job_id, s in jobs
+                for q in ('50', '95', '99')])
+        metric('scheduler_job_seconds_since_success', 'gauge', 'Seconds since the last successful run',
+               [({'job': job_id}, s['seconds_since_last_success']) for job_id, s in jobs])
+        metric('scheduler_job_interval_seconds', 'gauge', 'Configured interval of the job trigger',
+               [({'job': job_id}, s['interval_seconds']) for job_id, s in jobs])
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,146 @@
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import clock
+
+# Ventanas de agregación: constante de tiempo del decaimiento exponencial en segundos
+WINDOWS = {
+    '1h': 3600,
+    '6h': 6 * 3600,
+    '24h': 24 * 3600
+}
+
+MARKET = 'MARKET'
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+class SentimentAggregator:
+    """Contadores de sentimiento con decaimiento exponencial por moneda y de mercado.
+
+    Cada evento (artículo o post ya puntuado) suma 1 a su sentimiento en cada
+    ventana; los contadores decaen con exp(-Δt/ventana), así que la lectura es
+    O(1) y equivale a los eventos "efectivos" de la ventana sin guardarlos.
+    """
+
+    def __init__(self, windows: Dict[str, float] = None):
+        self.windows = windows or WINDOWS
+        self.state: Dict[str, Dict] = {}
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def _new_entry(self, stamp: float) -> Dict:
+        return {
+            'stamp': stamp,
+            'last_event': stamp,
+            'counts': {window: dict.fromkeys(SENTIMENTS, 0.0) for window in self.windows}
+        }
+
+    def record(self, sentiment: str, symbols: Iterable[str] = (), timestamp: Optional[float] = None,
+               weight: float = 1.0):
+        """Registra un evento puntuado para el mercado y para cada moneda mencionada"""
+        if sentiment not in SENTIMENTS:
+            sentiment = 'neutral'
+        timestamp = timestamp if timestamp is not None else clock.timestamp()
+        keys = {MARKET} | {symbol.upper() for symbol in symbols}
+
+        with self._lock:
+            for key in keys:
+                entry = self.state.get(key)
+                if entry is None:
+                    entry = self.state[key] = self._new_entry(timestamp)
+
+                if timestamp >= entry['stamp']:
+                    # Llevar los contadores al instante del evento antes de sumar
+                    elapsed = timestamp - entry['stamp']
+                    for window, tau in self.windows.items():
+                        decay = math.exp(-elapsed / tau)
+                        counts = entry['counts'][window]
+                        for name in SENTIMENTS:
+                            counts[name] *= decay
+                        counts[sentiment] += weight
+                    entry['stamp'] = timestamp
+                    entry['last_event'] = timestamp
+                else:
+                    # Evento atrasado (backfill): entra ya decaído hasta el estado actual
+                    for window, tau in self.windows.items():
+                        entry['counts'][window][sentiment] += weight * math.exp(-(entry['stamp'] - timestamp) / tau)
+            if weight > 0:
+                self.events += 1
+
+    def record_articles(self, articles: Iterable[Dict]):
+        """Registra artículos con 'sentiment', 'mentions' y 'published' (datetime)"""
+        for article in articles:
+            published = article.get('published')
+            self.record(
+                article.get('sentiment', 'neutral'),
+                article.get('mentions', []),
+                published.timestamp() if isinstance(published, datetime) else None
+            )
+
+    def replace(self, old_sentiment: str, old_symbols: Iterable[str], sentiment: str,
+                symbols: Iterable[str], timestamp: Optional[float] = None):
+        """Corrige un evento ya registrado (p. ej. al puntuar el texto completo del artículo)"""
+        self.record(old_sentiment, old_symbols, timestamp, weight=-1.0)
+        self.record(sentiment, symbols, timestamp)
+
+    def get(self, symbol: Optional[str] = None, now: Optional[float] = None) -> Optional[Dict]:
+        """Agregados actuales de una moneda (o del mercado si no se indica)"""
+        key = symbol.upper() if symbol else MARKET
+        now = now if now is not None else clock.timestamp()
+        with self._lock:
+            entry = self.state.get(key)
+            if entry is None:
+                return None
+            elapsed = max(0.0, now - entry['stamp'])
+            windows = {}
+            for window, tau in self.windows.items():
+                decay = math.exp(-elapsed / tau)
+                windows[window] = self._summarize({
+                    name: value * decay for name, value in entry['counts'][window].items()
+                })
+            last_event = entry['last_event']
+
+        return {
+            'symbol': key,
+            'windows': windows,
+            'last_event': datetime.fromtimestamp(last_event).isoformat()
+        }
+
+    @staticmethod
+    def _summarize(counts: Dict[str, float]) -> Dict:
+        total = sum(counts.values())
+        score = (counts['positive'] - counts['negative']) / total if total > 1e-9 else 0.0
+        if score > 0.2:
+            mood = 'optimista'
+        elif score < -0.2:
+            mood = 'pesimista'
+        else:
+            mood = 'neutral'
+        return {
+            'positive': round(counts['positive'], 3),
+            'negative': round(counts['negative'], 3),
+            'neutral': round(counts['neutral'], 3),
+            'total': round(total, 3),
+            'score': round(score, 3),
+            'mood': mood
+        }
+
+    def get_mood(self, symbol: Optional[str] = None, window: str = '6h') -> str:
+        """Estado de ánimo de la ventana indicada; 'neutral' si no hay datos"""
+        aggregate = self.get(symbol)
+        return aggregate['windows'][window]['mood'] if aggregate else 'neutral'
+
+    def symbols(self) -> List[str]:
+        """Monedas con eventos registrados"""
+        with self._lock:
+            return sorted(key for key in self.state if key != MARKET)
+
+    def snapshot(self) -> Dict:
+        """Agregados del mercado y de todas las monedas"""
+        return {
+            'market': self.get(),
+            'coins': {symbol: self.get(symbol) for symbol in self.symbols()},
+            'events': self.events
+        }
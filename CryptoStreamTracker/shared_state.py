@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import clock
+
+
+class SharedSnapshot:
+    """Instantánea JSON que el líder publica y los seguidores leen (mismo host y directorio).
+
+    publish() escribe en un temporal propio del hilo y lo renombra, así un lector
+    nunca ve un archivo a medias. read() solo vuelve a parsear cuando el archivo
+    cambió (inode o mtime), de modo que leerlo en cada petición cuesta un stat.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._payload: Optional[Dict] = None
+
+    def publish(self, data: Any):
+        """Reemplaza atómicamente la instantánea con data (lo no serializable se guarda como texto)"""
+        payload = {'published_at': clock.timestamp(), 'pid': os.getpid(), 'data': data}
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def read(self) -> Optional[Dict]:
+        """Última instantánea publicada ({'published_at', 'pid', 'data'}) o None si no hay"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._payload = json.load(f)
+                    self._stamp = stamp
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Error reading shared snapshot {self.path}: {str(e)}")
+            return self._payload
+
+    def get_status(self) -> Dict:
+        payload = self.read()
+        if not payload:
+            return {'path': self.path, 'published_at': None, 'age_seconds': None, 'publisher_pid': None}
+        return {
+            'path': self.path,
+            'published_at': payload['published_at'],
+            'age_seconds': round(clock.timestamp() - payload['published_at'], 1),
+            'publisher_pid': payload['pid']
+        }
@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+# Menor número = se dice antes
+PRIORITIES = {'critical': 0, 'alert': 1, 'normal': 2, 'summary': 3}
+
+# Dos mensajes que solo difieren en cifras (precios, porcentajes) se consideran el mismo
+_COALESCE_DIGITS = re.compile(r'\d+(?:[.,]\d+)*')
+_COALESCE_SPACES = re.compile(r'\s+')
+
+
+def coalesce_key(text: str) -> str:
+    return _COALESCE_SPACES.sub(' ', _COALESCE_DIGITS.sub('#', text.lower())).strip()
+
+
+class _Utterance:
+    __slots__ = ('text', 'payload', 'priority', 'key', 'enqueued', 'future', 'dropped')
+
+    def __init__(self, text: str, priority: int, key: str, payload: Any = None):
+        self.text = text
+        self.payload = text if payload is None else payload
+        self.priority = priority
+        self.key = key
+        self.enqueued = time.monotonic()
+        self.future = Future()
+        self.dropped = False
+
+
+class SpeechQueue:
+    """Un único hilo de síntesis con cola de prioridad acotada.
+
+    - Prioridad: las alertas críticas se dicen antes que los resúmenes.
+    - Coalescencia: un mensaje igual (salvo cifras) a uno en cola lo actualiza en su
+      lugar; si ya se dijo hace menos de coalesce_window segundos se descarta.
+    - Contrapresión: con la cola llena se descarta el mensaje más antiguo de la
+      peor prioridad presente, así hilos y memoria no crecen con una ráfaga de alertas.
+    """
+
+    def __init__(self, synthesize: Callable[[Any], bool], maxsize: int = 32, coalesce_window: float = 60.0):
+        self.synthesize = synthesize
+        self.maxsize = maxsize
+        self.coalesce_window = coalesce_window
+        self._heap = []
+        self._pending: Dict[str, _Utterance] = {}
+        self._recent: Dict[str, float] = {}  # clave -> momento en que se dijo
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.stats = {'enqueued': 0, 'spoken': 0, 'failed': 0, 'coalesced': 0, 'dropped': 0,
+                      'peak_depth': 0, 'wait_seconds': 0.0}
+        self._thread = threading.Thread(target=self._run, name='speech-worker', daemon=True)
+        self._thread.start()
+
+    def put(self, text: str, priority: str = 'normal', payload: Any = None) -> Future:
+        """Encola un mensaje; el Future se resuelve con el resultado de la síntesis (o False si se descarta).
+
+        synthesize recibe payload si se indica (p. ej. los fragmentos de una plantilla)
+        y si no el texto; la coalescencia siempre se decide por el texto.
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES['normal'])
+        key = coalesce_key(text)
+        now = time.monotonic()
+
+        with self._cond:
+            queued = self._pending.get(key)
+            if queued:
+                # Mismo mensaje ya en cola: se dice la versión más reciente, con la mejor prioridad
+                self.stats['coalesced'] += 1
+                queued.text = text
+                queued.payload = text if payload is None else payload
+                if rank < queued.priority:
+                    queued.dropped = True
+                    replacement = _Utterance(text, rank, key, payload)
+                    replacement.future = queued.future
+                    replacement.enqueued = queued.enqueued
+                    self._push(replacement)
+                return queued.future
+
+            spoken_at = self._recent.get(key)
+            if spoken_at is not None and now - spoken_at < self.coalesce_window:
+                self.stats['coalesced'] += 1
+                future = Future()
+                future.set_result(False)
+                return future
+
+            utterance = _Utterance(text, rank, key, payload)
+            if len(self._pending) >= self.maxsize:
+                self._evict(utterance)
+                if utterance.dropped:
+                    return utterance.future
+            self._push(utterance)
+            self.stats['enqueued'] += 1
+            self.stats['peak_depth'] = max(self.stats['peak_depth'], len(self._pending))
+            self._cond.notify()
+            return utterance.future
+
+    def _push(self, utterance: _Utterance):
+        self._pending[utterance.key] = utterance
+        heapq.heappush(self._heap, (utterance.priority, next(self._seq), utterance))
+
+    def _evict(self, incoming: _Utterance):
+        """Descarta el mensaje más antiguo de la peor prioridad (puede ser el entrante)"""
+        candidates = list(self._pending.values()) + [incoming]
+        worst = max(u.priority for u in candidates)
+        victim = min((u for u in candidates if u.priority == worst), key=lambda u: u.enqueued)
+        victim.dropped = True
+        if victim is not incoming:
+            del self._pending[victim.key]
+        victim.future.set_result(False)
+        self.stats['dropped'] += 1
+        logging.warning(f"Speech queue full; dropped: {victim.text[:60]}")
+
+    def _next(self) -> Optional[_Utterance]:
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, utterance = heapq.heappop(self._heap)
+                    if not utterance.dropped:
+                        del self._pending[utterance.key]
+                        return utterance
+                if self._stopped:
+                    return None
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            utterance = self._next()
+            if utterance is None:
+                return
+            started = time.monotonic()
+            try:
+                result = self.synthesize(utterance.payload)
+            except Exception as e:
+                logging.error(f"Error in speech worker: {str(e)}")
+                result = False
+            with self._cond:
+                self.stats['wait_seconds'] += started - utterance.enqueued
+                self.stats['spoken' if result else 'failed'] += 1
+                self._recent[utterance.key] = time.monotonic()
+                # Purga de claves vencidas para que la memoria no crezca
+                if len(self._recent) > self.maxsize * 4:
+                    cutoff = time.monotonic() - self.coalesce_window
+                    self._recent = {k: t for k, t in self._recent.items() if t >= cutoff}
+            utterance.future.set_result(result)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def get_status(self) -> Dict:
+        with self._cond:
+            by_priority = {name: 0 for name in PRIORITIES}
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            for utterance in self._pending.values():
+                by_priority[names[utterance.priority]] += 1
+            done = self.stats['spoken'] + self.stats['failed']
+            return dict(
+                self.stats,
+                depth=len(self._pending),
+                depth_by_priority=by_priority,
+                maxsize=self.maxsize,
+                avg_wait_seconds=round(self.stats['wait_seconds'] / done, 3) if done else 0.0
+            )
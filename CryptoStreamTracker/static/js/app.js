@@ -537,7 +537,7 @@ class CryptoApp {
                         <div class="col-12">
                             <div class="alert alert-info">
                                 <i class="fas fa-info-circle me-2"></i>
-                                <strong>Loop Automático:</strong> El sistema ejecuta análisis completos cada 60 minutos y verifica alertas cada 5 minutos.
+                                <strong>Loop Automático:</strong> El sistema ejecuta análisis completos cada 60 minutos y verifica precios y alertas con una cadencia adaptativa (de 15 s en mercados volátiles a 5 minutos en calma).
                             </div>
                         </div>
                     </div>
@@ -558,10 +558,22 @@ class CryptoApp {
         const pre = content.querySelector('pre');
         
         if (pre && pre.textContent) {
-            await this.speakText(pre.textContent);
+            this.streamText(pre.textContent);
         }
     }
 
+    streamText(text) {
+        // Reproduce en el navegador: el servidor envía el audio por frases a medida que las sintetiza
+        const url = this.getApiUrl('/api/voice/stream') + '?text=' + encodeURIComponent(text.slice(0, 1500));
+        if (this.streamAudio) {
+            this.streamAudio.pause();
+        }
+        this.streamAudio = new Audio(url);
+        this.streamAudio.play().catch(error => {
+            console.error('Error streaming voice:', error);
+        });
+    }
+
     async speakText(text) {
         try {
             const response = await fetch(this.getApiUrl('/api/voice/speak'), {
@@ -621,9 +633,9 @@ class CryptoApp {
             if (summaryStart !== -1 && recommendationStart !== -1) {
                 const summaryLines = lines.slice(summaryStart, recommendationStart + 3);
                 const summary = summaryLines.join(' ').replace(/[=\-]/g, '');
-                await this.speakText(summary);
+                this.streamText(summary);
             } else {
-                await this.speakText('Análisis colaborativo completado con éxito por la red de IAs especializadas');
+                this.streamText('Análisis colaborativo completado con éxito por la red de IAs especializadas');
             }
         }
     }
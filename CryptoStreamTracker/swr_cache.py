@@ -0,0 +1,90 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import clock
+
+
+class StaleWhileRevalidate:
+    """Caché de un único valor con TTL que sirve el valor vencido mientras se recalcula.
+
+    get() nunca espera a un recálculo si ya hay un valor: si está vencido devuelve
+    el anterior y lanza una sola actualización en segundo plano. El loader recibe
+    el valor previo para poder conservar resultados parciales si algo falla.
+    """
+
+    def __init__(self, loader: Callable[[Optional[Any]], Any], ttl: float, name: str = 'cache'):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self.value = None
+        self.updated = None  # clock.timestamp() de la última carga correcta
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def is_stale(self) -> bool:
+        return self.updated is None or clock.timestamp() - self.updated >= self.ttl
+
+    def get(self) -> Any:
+        """Valor actual; solo bloquea si todavía no hay ninguno"""
+        with self._lock:
+            has_value = self.updated is not None
+            stale = self.is_stale()
+            if has_value and not stale:
+                self.stats['hits'] += 1
+                return self.value
+            if has_value:
+                self.stats['stale_hits'] += 1
+                start_refresh = not self._refreshing
+                self._refreshing = True
+                value = self.value
+            else:
+                self.stats['misses'] += 1
+
+        if not has_value:
+            return self.refresh()
+
+        if start_refresh:
+            threading.Thread(target=self._background_refresh, name=f'{self.name}-refresh', daemon=True).start()
+        return value
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self) -> Any:
+        """Recalcula el valor de forma síncrona; las llamadas concurrentes comparten la misma carga"""
+        started = clock.timestamp()
+        with self._refresh_lock:
+            # Otro hilo terminó una carga mientras esperábamos: reutilizarla
+            if self.updated is not None and self.updated >= started:
+                return self.value
+            try:
+                value = self.loader(self.value)
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                logging.error(f"Error refreshing {self.name}: {str(e)}")
+                return self.value
+
+            with self._lock:
+                self.value = value
+                self.updated = clock.timestamp()
+                self.stats['refreshes'] += 1
+            return value
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            age = clock.timestamp() - self.updated if self.updated is not None else None
+            return dict(
+                self.stats,
+                ttl_seconds=self.ttl,
+                age_seconds=round(age, 3) if age is not None else None,
+                stale=self.is_stale(),
+                refreshing=self._refreshing
+            )
@@ -0,0 +1,75 @@
+import random
+from array import array
+
+from alert_backtest import AlertBacktester, PriceSeries, load_series_dir
+from alert_system import AlertSystem
+from volume_baseline import VolumeBaseline
+
+START = 1704067200.0  # 2024-01-01 00:00 UTC, múltiplo de 300
+STEP = 300
+BARS = 2 * 86400 // STEP
+
+
+def series(symbol, offset, crash):
+    """Dos días cada 5 min; con crash el precio cae un 30% a mitad del segundo día"""
+    timestamps = array('d', (START + offset + i * STEP for i in range(BARS)))
+    prices = array('d', (70.0 if crash and i >= BARS * 3 // 4 else 100.0 for i in range(BARS)))
+    return PriceSeries(symbol, timestamps, prices, array('d', [1e6] * BARS), array('d', [1e9] * BARS))
+
+
+def market_crash_report(series_list, tmp_path):
+    alert_system = AlertSystem(None, history_path=str(tmp_path / 'alert_history.json'))
+    result = AlertBacktester(alert_system, eval_interval=STEP).run(series_list)
+    return next(rule for rule in result['rules'] if rule['rule'] == 'market_crash')
+
+
+def test_jittered_series_share_one_market_instant(tmp_path):
+    # Cada serie desfasada unos segundos: sin rejilla común cada instante vería una sola moneda
+    coins = [series(f"coin{k}", offset=k * 7, crash=(k == 0)) for k in range(10)]
+    assert market_crash_report(coins, tmp_path)['fired'] == 0
+
+
+def test_jittered_market_crash_still_fires(tmp_path):
+    coins = [series(f"coin{k}", offset=k * 7, crash=(k < 8)) for k in range(10)]
+    assert market_crash_report(coins, tmp_path)['fired'] >= 1
+
+
+def test_too_few_coins_are_not_judged(tmp_path):
+    coins = [series(f"coin{k}", offset=0, crash=True) for k in range(3)]
+    assert market_crash_report(coins, tmp_path)['candidates'] == 0
+
+
+def volume_report(volumes, tmp_path):
+    baseline = VolumeBaseline(str(tmp_path / 'baseline.json'), half_life_hours=6, save_interval=float('inf'))
+    alert_system = AlertSystem(None, history_path=str(tmp_path / 'alert_history.json'), volume_baseline=baseline)
+    timestamps = array('d', (START + i * STEP for i in range(BARS)))
+    prices = array('d', (100.0 + i % 2 for i in range(BARS)))
+    coin = PriceSeries('btc', timestamps, prices, array('d', volumes), array('d', [1e9] * BARS))
+    result = AlertBacktester(alert_system, eval_interval=STEP).run([coin])
+    return next(rule for rule in result['rules'] if rule['rule'] == 'volume_surge')
+
+
+def test_volume_surges_are_scored_against_the_baseline(tmp_path):
+    rng = random.Random(7)
+    flat = [1e6 * (1 + rng.uniform(-0.002, 0.002)) for _ in range(BARS)]
+    assert volume_report(flat, tmp_path)['fired'] == 0
+
+    # 0.3% del market cap nunca dispara la regla por ratio; solo la línea base ve el salto
+    surge = [volume * 3 if i >= BARS * 3 // 4 else volume for i, volume in enumerate(flat)]
+    (tmp_path / 'surge').mkdir()
+    report = volume_report(surge, tmp_path / 'surge')
+    assert report['fired'] == 1
+    assert report['by_severity'] == {'high': 1}
+
+
+def test_series_are_streamed_from_the_csv_directory(tmp_path):
+    for symbol in ('btc', 'eth'):
+        rows = ''.join(f"{START + i * STEP},100.0,1000000,1000000000\n" for i in range(BARS))
+        (tmp_path / f"{symbol}.csv").write_text('timestamp,price,volume_24h,market_cap\n' + rows)
+
+    loaded = load_series_dir(str(tmp_path))
+    assert next(loaded).symbol == 'btc'
+
+    alert_system = AlertSystem(None, history_path=str(tmp_path / 'alert_history.json'))
+    result = AlertBacktester(alert_system, eval_interval=STEP).run(load_series_dir(str(tmp_path)))
+    assert (result['series'], result['points']) == (2, 2 * BARS)
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from alert_delivery import AlertDispatcher, DeadLetterFile, SinkWorker, WebhookSink
+
+
+class StubSink:
+    """Servidor webhook local que responde con los códigos indicados y registra cada petición"""
+
+    def __init__(self, statuses=None):
+        self.statuses = list(statuses or [])
+        self.requests = []  # (momento, alertas del lote, código devuelto)
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with stub.lock:
+                    status = stub.statuses.pop(0) if stub.statuses else 204
+                    stub.requests.append((time.monotonic(), body['alerts'], status))
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def delivered(self):
+        with self.lock:
+            return [alert for _, batch, status in self.requests if status < 400 for alert in batch]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def dead_letter_path(tmp_path):
+    return str(tmp_path / 'dead_letter.jsonl')
+
+
+def read_dead_letter(path):
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return []
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_dispatcher(stub, dead_letter_path, **sink_options):
+    sink = WebhookSink(name='stub', url=stub.url, max_concurrency=1, **sink_options)
+    return AlertDispatcher([sink], flush_interval=0.05, backoff_base=0.05, dead_letter_path=dead_letter_path)
+
+
+def alerts(count, prefix='a'):
+    return [{'id': f"{prefix}{i}", 'message': 'test', 'severity': 'high'} for i in range(count)]
+
+
+def test_retries_server_errors_with_exponential_backoff(dead_letter_path):
+    stub = StubSink([500, 503])
+    dispatcher = make_dispatcher(stub, dead_letter_path)
+    dispatcher.start()
+    try:
+        dispatcher.submit(alerts(1))
+        assert wait_for(lambda: len(stub.delivered()) == 1)
+    finally:
+        dispatcher.stop()
+        stub.close()
+
+    times = [t for t, _, _ in stub.requests]
+    assert [status for _, _, status in stub.requests] == [500, 503, 204]
+    # Backoff base 0.05: esperas de 0.05 y 0.1 s
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 0.1
+    sink = dispatcher.get_status()['sinks'][0]
+    assert sink['retries'] == 2 and sink['delivered'] == 1 and sink['failed'] == 0
+    assert read_dead_letter(dead_letter_path) == []
+
+
+def test_client_error_is_not_retried_and_goes_to_dead_letter(dead_letter_path):
+    stub = StubSink([400])
+    dispatcher = make_dispatcher(stub, dead_letter_path)
+    dispatcher.start()
+    try:
+        dispatcher.submit(alerts(2))
+        assert wait_for(lambda: read_dead_letter(dead_letter_path))
+    finally:
+        dispatcher.stop()
+        stub.close()
+
+    assert len(stub.requests) == 1
+    records = read_dead_letter(dead_letter_path)
+    assert len(records) == 1
+    assert records[0]['sink'] == 'stub'
+    assert records[0]['url'] == stub.url
+    assert records[0]['reason'] == 'HTTP 400'
+    assert [a['id'] for a in records[0]['alerts']] == ['a0', 'a1']
+    assert dispatcher.get_status()['sinks'][0]['failed'] == 2
+
+
+def test_rate_limited_is_retried(dead_letter_path):
+    stub = StubSink([429])
+    dispatcher = make_dispatcher(stub, dead_letter_path)
+    dispatcher.start()
+    try:
+        dispatcher.submit(alerts(1))
+        assert wait_for(lambda: len(stub.delivered()) == 1)
+    finally:
+        dispatcher.stop()
+        stub.close()
+
+    assert [status for _, _, status in stub.requests] == [429, 204]
+
+
+def test_exhausted_retries_write_dead_letter(dead_letter_path):
+    stub = StubSink([500] * 10)
+    dispatcher = make_dispatcher(stub, dead_letter_path, max_retries=2)
+    dispatcher.start()
+    try:
+        dispatcher.submit(alerts(1))
+        assert wait_for(lambda: read_dead_letter(dead_letter_path))
+    finally:
+        dispatcher.stop()
+        stub.close()
+
+    assert len(stub.requests) == 3
+    assert read_dead_letter(dead_letter_path)[0]['reason'] == 'HTTP 500'
+
+
+def test_alerts_are_batched_up_to_batch_size(dead_letter_path):
+    stub = StubSink()
+    dispatcher = make_dispatcher(stub, dead_letter_path, batch_size=4)
+    dispatcher.start()
+    try:
+        dispatcher.submit(alerts(10))
+        assert wait_for(lambda: len(stub.delivered()) == 10)
+    finally:
+        dispatcher.stop()
+        stub.close()
+
+    sizes = [len(batch) for _, batch, _ in stub.requests]
+    assert max(sizes) <= 4
+    assert len(sizes) < 10
+    assert sorted(a['id'] for a in stub.delivered()) == sorted(f"a{i}" for i in range(10))
+
+
+def test_dispatcher_overflow_goes_to_dead_letter(dead_letter_path):
+    sink = WebhookSink(name='stub', url='http://127.0.0.1:9/hook')
+    # Sin arrancar: nadie vacía la cola del dispatcher
+    dispatcher = AlertDispatcher([sink], queue_size=2, dead_letter_path=dead_letter_path)
+
+    assert dispatcher.submit(alerts(5)) == 2
+    records = read_dead_letter(dead_letter_path)
+    assert len(records) == 1
+    assert records[0]['sink'] == 'dispatcher'
+    assert records[0]['reason'] == 'dispatcher_queue_full'
+    assert [a['id'] for a in records[0]['alerts']] == ['a2', 'a3', 'a4']
+    assert dispatcher.get_status()['dropped'] == 3
+
+
+def test_sink_queue_overflow_goes_to_dead_letter(dead_letter_path):
+    sink = WebhookSink(name='slow', url='http://127.0.0.1:9/hook', queue_size=1)
+    worker = SinkWorker(sink, DeadLetterFile(dead_letter_path), flush_interval=0.05, backoff_base=0.05)
+
+    assert worker.offer({'id': 'kept'})
+    assert not worker.offer({'id': 'overflow'})
+    records = read_dead_letter(dead_letter_path)
+    assert [(r['sink'], r['reason'], r['alerts']) for r in records] == [('slow', 'queue_full', [{'id': 'overflow'}])]
+    assert worker.stats['dropped'] == 1
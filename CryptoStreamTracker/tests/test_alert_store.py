@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from alert_store import AlertStore
+
+HOUR = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AlertStore(str(tmp_path / 'alerts.db'))
+    yield store
+    store.close()
+
+
+def add(store, moment, severity='high', alert_type='price_spike'):
+    store.append([{'id': f"{moment.isoformat()}-{severity}", 'timestamp': moment.isoformat(),
+                   'crypto_symbol': 'BTC', 'alert_type': alert_type, 'severity': severity}])
+
+
+def test_partial_hours_at_both_ends_are_counted_exactly(store):
+    for minute in (5, 50):
+        add(store, HOUR + timedelta(minutes=minute))                  # 12:05, 12:50
+        add(store, HOUR + timedelta(hours=1, minutes=minute), 'low')  # 13:05, 13:50
+        add(store, HOUR + timedelta(hours=2, minutes=minute))         # 14:05, 14:50
+
+    summary = store.summarize(HOUR + timedelta(minutes=30), HOUR + timedelta(hours=2, minutes=30))
+    # 12:50, 13:05, 13:50 y 14:05
+    assert summary['total'] == 4
+    assert summary['by_severity'] == {'high': 2, 'low': 2}
+
+
+def test_range_inside_one_hour(store):
+    add(store, HOUR + timedelta(minutes=5))
+    add(store, HOUR + timedelta(minutes=20))
+    add(store, HOUR + timedelta(minutes=50))
+    assert store.summarize(HOUR + timedelta(minutes=10), HOUR + timedelta(minutes=40))['total'] == 1
+
+
+def test_hourly_buckets_keep_their_partial_counts(store):
+    add(store, HOUR + timedelta(minutes=5))
+    add(store, HOUR + timedelta(minutes=50))
+    add(store, HOUR + timedelta(hours=1, minutes=5))
+    rows = store.rollups(HOUR + timedelta(minutes=30), group_by=(), bucket='hour')
+    assert rows == [{'bucket': HOUR.isoformat(), 'count': 1},
+                    {'bucket': (HOUR + timedelta(hours=1)).isoformat(), 'count': 1}]
@@ -0,0 +1,67 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import requests
+
+from article_extractor import ArticleExtractor, ContentCache, _fixture_html
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession(requests.Session):
+    def get(self, url, **kwargs):
+        return FakeResponse(_fixture_html(0))
+
+
+class NullStore:
+    def update_analysis(self, url_hash, sentiment, mentions, body=None):
+        pass
+
+
+class Analyzer:
+    def score_texts(self, texts):
+        return [{'sentiment': 'neutral', 'mentions': []} for _ in texts]
+
+
+def test_concurrent_puts_of_the_same_article(tmp_path):
+    cache = ContentCache(str(tmp_path))
+    errors = []
+
+    def put(i):
+        try:
+            for _ in range(20):
+                cache.put('a' * 40, f"texto {i}")
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.get('a' * 40).startswith('texto')
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_extraction_pool_is_replaced_after_a_worker_dies(tmp_path):
+    extractor = ArticleExtractor(NullStore(), Analyzer(), cache=ContentCache(str(tmp_path)),
+                                 session=FakeSession(), max_workers=1, download_workers=1)
+    extractor.start()
+    try:
+        with pytest.raises(BrokenProcessPool):
+            extractor.pool.submit(os._exit, 1).result(timeout=30)
+        extractor.process({'url_hash': 'b' * 40, 'url': 'http://example.test/0', 'title': 'Story 0'})
+    finally:
+        extractor.stop()
+
+    assert extractor.get_status()['extracted'] == 1
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from audio_cache import AudioCache
+from speech_backends import ToneBackend
+
+
+def test_concurrent_stitch_of_the_same_message(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    backend = ToneBackend()
+    fragments = [cache.get_or_render(cache.key(text), lambda path, text=text: backend.render(text, path))
+                 for text in ('Bitcoin sube', 'un cinco por ciento')]
+    key = cache.key('Bitcoin sube un cinco por ciento')
+
+    results = []
+    barrier = threading.Barrier(8)
+
+    def stitch():
+        barrier.wait()
+        results.append(cache.stitch(key, fragments))
+
+    threads = [threading.Thread(target=stitch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [cache._path(key)] * 8
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp.wav')]
+
+
+def test_leftover_temp_files_are_removed_on_load(tmp_path):
+    (tmp_path / 'abc.wav.1234.tmp.wav').write_bytes(b'partial')
+    cache = AudioCache(str(tmp_path))
+    assert cache.get_status()['files'] == 0
+    assert os.listdir(tmp_path) == []
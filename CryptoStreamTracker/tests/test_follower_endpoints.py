@@ -0,0 +1,77 @@
+import pytest
+
+import clock
+from alert_store import AlertStore
+from leader_election import LeaderElection
+from shared_state import SharedSnapshot
+
+BTC = {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin', 'current_price': 65000.0,
+       'price_change_24h': 2.5, 'market_cap': 1.2e12, 'volume_24h': 3.1e10}
+
+
+@pytest.fixture
+def follower(tmp_path, monkeypatch):
+    """Proceso seguidor: otro descriptor tiene el lock y ya publicó su estado como lo haría el líder"""
+    monkeypatch.chdir(tmp_path)
+    leader = LeaderElection()
+    assert leader.try_acquire()
+
+    now = clock.now()
+    SharedSnapshot('prices_snapshot.json').publish({'prices': {'btc': BTC}, 'last_update': now.isoformat()})
+    SharedSnapshot('leader_state.json').publish({
+        'market_sentiment': {'sentiment_analysis': 'Mercado optimista', 'mood': 'bullish', 'sources': {},
+                             'coins': {}, 'generated_at': now.isoformat(), 'cache': {}},
+        'sentiment': {'market': {'windows': {}}, 'coins': {'BTC': {'symbol': 'BTC', 'windows': {}}},
+                      'events': 3},
+        'scheduler_status': {'running': True, 'jobs_count': 6},
+        'metrics': 'scheduler_job_runs_total{job="adaptive_poll"} 4\n'
+    })
+    store = AlertStore('alerts.db')
+    store.append([{'id': 'btc-spike', 'timestamp': now.isoformat(), 'crypto_symbol': 'BTC',
+                   'alert_type': 'price_spike', 'message': 'BTC sube 16%', 'severity': 'critical',
+                   'value': 16.0, 'threshold': 15.0, 'is_active': True}])
+    store.close()
+
+    import app
+    app.init_runtime()
+    try:
+        yield app
+    finally:
+        app.shutdown_runtime()
+        leader.release()
+
+
+def test_follower_serves_the_leader_state(follower):
+    assert not follower.leader_election.is_leader
+    client = follower.app.test_client()
+
+    prices = client.get('/api/crypto/prices')
+    assert prices.status_code == 200
+    assert prices.get_json()['data']['btc']['current_price'] == 65000.0
+    assert client.get('/api/crypto/prices/BTC').status_code == 200
+
+    alerts = client.get('/api/alerts').get_json()
+    assert alerts['active_alerts'] == 1
+    assert alerts['critical_alerts'] == 1
+
+    external = client.get('/api/external-sources')
+    assert external.status_code == 200
+    assert external.get_json()['mood'] == 'bullish'
+
+    assert client.get('/api/sentiment').get_json()['sentiment']['events'] == 3
+    assert client.get('/api/sentiment?symbol=btc').get_json()['sentiment']['symbol'] == 'BTC'
+
+    status = client.get('/api/scheduler/status')
+    assert status.status_code == 200
+    assert status.get_json()['scheduler_status']['jobs_count'] == 6
+
+    metrics = client.get('/api/scheduler/metrics')
+    assert metrics.status_code == 200
+    assert b'adaptive_poll' in metrics.data
+
+
+def test_follower_forwards_forced_analysis_to_the_leader(follower):
+    response = follower.app.test_client().post('/api/scheduler/force-analysis')
+    assert response.status_code == 202
+    assert response.get_json()['queued']
+    assert SharedSnapshot('force_analysis_request.json').read() is not None
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from news_store import NewsIngester, NewsStore, canonical_url
+
+
+def test_tracking_params_are_dropped():
+    url = 'http://www.coindesk.com/markets/btc/?utm_source=rss&utm_medium=feed&ref=twitter&fbclid=x&id=7'
+    assert canonical_url(url) == 'https://coindesk.com/markets/btc?id=7'
+
+
+def test_params_that_only_start_like_tracking_params_are_kept():
+    url = 'https://decrypt.co/news?referrer=home&ref_id=42&reference=abc'
+    assert canonical_url(url) == 'https://decrypt.co/news?ref_id=42&reference=abc&referrer=home'
+
+
+def test_read_only_ingester_never_fetches(tmp_path):
+    class NoFetch:
+        def fetch_feeds(self, urls):
+            raise AssertionError('followers must not ingest')
+
+    ingester = NewsIngester(NewsStore(str(tmp_path / 'news.db')), NoFetch(), analyzer=None)
+    ingester.read_only = True
+    ingester.ensure_fresh()
+    assert ingester.last_cycle is None
+
+
+def test_search_combines_text_symbol_and_since(tmp_path):
+    store = NewsStore(str(tmp_path / 'news.db'))
+    now = datetime(2024, 5, 1, 12, 0)
+    store.add_articles([
+        {'url_hash': 'old', 'url': 'https://a.test/old', 'title': 'Bitcoin ETF approved', 'source': 'a',
+         'published': now - timedelta(days=3), 'mentions': ['BTC']},
+        {'url_hash': 'new', 'url': 'https://a.test/new', 'title': 'Bitcoin ETF inflows', 'source': 'a',
+         'published': now - timedelta(hours=2), 'mentions': ['BTC']},
+        {'url_hash': 'eth', 'url': 'https://a.test/eth', 'title': 'Ethereum ETF filing', 'source': 'a',
+         'published': now - timedelta(hours=1), 'mentions': ['ETH']},
+    ])
+
+    results = store.search(query='etf', symbol='btc', since=now - timedelta(days=1))
+    assert [article['url_hash'] for article in results] == ['new']
+    store.close()
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import clock
+from reddit_stream import RedditCheckpoint, RedditStreamIngester, SubmissionSource
+
+START = 1704067200.0
+
+
+class FakeAnalyzer:
+    def score_texts(self, texts):
+        return [{'sentiment': 'positive', 'mentions': []} for _ in texts]
+
+    def extract_crypto_mentions(self, text):
+        return ['BTC'] if 'BTC' in text else []
+
+
+@pytest.fixture
+def simulated():
+    simulated = clock.SimulatedClock(START)
+    previous = clock.set_clock(simulated)
+    yield simulated
+    clock.set_clock(previous)
+
+
+def test_submission_source_is_abstract():
+    with pytest.raises(TypeError):
+        SubmissionSource()
+
+
+def test_window_expires_on_the_active_clock(tmp_path, simulated):
+    ingester = RedditStreamIngester(None, FakeAnalyzer(), window_hours=1,
+                                    checkpoint=RedditCheckpoint(str(tmp_path / 'checkpoint.json')))
+    ingester.process([{'id': 'p1', 'subreddit': 'bitcoin', 'title': 'BTC sube', 'selftext': '',
+                       'created_utc': START - 60}])
+    assert ingester.get_summary()['total_posts'] == 1
+
+    simulated.advance(3600)
+    summary = ingester.get_summary()
+    assert summary['total_posts'] == 0
+    assert summary['trending_topics'] == []
+
+
+class FailingSource(SubmissionSource):
+    def stream(self, subreddits):
+        yield None
+        raise ConnectionError('reddit down')
+
+
+def test_stream_failure_is_reported_in_status(tmp_path):
+    ingester = RedditStreamIngester(FailingSource(), FakeAnalyzer(), retry_seconds=60,
+                                    checkpoint=RedditCheckpoint(str(tmp_path / 'checkpoint.json')))
+    ingester.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not ingester.get_status()['last_error'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        ingester.stop()
+    assert ingester.get_status()['last_error'] == 'reddit down'
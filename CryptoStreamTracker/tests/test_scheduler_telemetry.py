@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from apscheduler.triggers.interval import IntervalTrigger
+
+from scheduler_telemetry import JobTelemetry
+
+START = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeScheduler:
+    def __init__(self, trigger):
+        self.job = SimpleNamespace(name='adaptive_poll', trigger=trigger)
+
+    def get_job(self, job_id):
+        return self.job
+
+
+def submitted(telemetry, scheduler, run_time):
+    event = SimpleNamespace(code=EVENT_JOB_SUBMITTED, job_id='adaptive_poll', scheduled_run_times=[run_time])
+    telemetry._on_event(scheduler, event)
+
+
+def test_reschedule_refreshes_interval_and_due_time():
+    scheduler = FakeScheduler(IntervalTrigger(seconds=60, start_date=START, timezone=timezone.utc))
+    telemetry = JobTelemetry()
+    for minute in range(3):
+        submitted(telemetry, scheduler, START + timedelta(minutes=minute))
+
+    # La cadencia baja a 15 s: con el intervalo viejo cada ejecución parecería a tiempo y sin el
+    # nuevo start_date el primer hueco se contaría como ejecuciones fusionadas
+    restart = START + timedelta(minutes=10)
+    scheduler.job.trigger = IntervalTrigger(seconds=15, start_date=restart, timezone=timezone.utc)
+    for step in range(4):
+        submitted(telemetry, scheduler, restart + timedelta(seconds=15 * step))
+    # Un hueco de 3 intervalos: 2 ejecuciones fusionadas
+    submitted(telemetry, scheduler, restart + timedelta(seconds=15 * 6))
+
+    status = telemetry.get_status()['adaptive_poll']
+    assert status['interval_seconds'] == 15
+    assert status['coalesced'] == 2
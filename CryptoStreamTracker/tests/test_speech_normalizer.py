@@ -0,0 +1,32 @@
+import pytest
+
+from speech_normalizer import SpeechNormalizer
+
+
+@pytest.fixture(scope='module')
+def normalizer():
+    return SpeechNormalizer()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$43,250.12 USD', 'cuarenta y tres mil doscientos cincuenta coma doce dólares'),
+    ('Sube 1,5%', 'Sube uno coma cinco por ciento'),
+    ('1,500 monedas', 'mil quinientos monedas'),
+    ('Cambio 24h: +5.23%.', 'Cambio veinticuatro horas: más cinco coma veintitrés por ciento.'),
+    ('📈📉BTC vs ETH!', 'subida bajada Bitcoin versus Ethereum!'),
+    ('¿BTC? precio*: 3', '¿Bitcoin? precio: tres'),
+    ('Versión 2.0.1 lista', 'Versión dos punto cero punto uno lista'),
+    ('Cierre a las 12:30h.', 'Cierre a las doce y treinta horas.'),
+    ('Abre 09:05, reporte a las 12:00', 'Abre nueve y cinco, reporte a las doce en punto'),
+    ('1000000 usuarios', 'un millón de usuarios'),
+    ('$2,000,000 en volumen', 'dos millones de dólares en volumen'),
+    ('1500000 usuarios', 'un millón quinientos mil usuarios'),
+    ('1000000 y más', 'un millón y más'),
+])
+def test_normalize(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+def test_no_space_before_punctuation(normalizer):
+    text = 'BTC: $1,234.50, ETH: 2.5%; DOGE 24h!'
+    assert not [c for c in ',.;:!?' if f" {c}" in normalizer.normalize(text)]
@@ -0,0 +1,25 @@
+import pytest
+
+import clock
+from swr_cache import StaleWhileRevalidate
+
+
+@pytest.fixture
+def simulated():
+    simulated = clock.SimulatedClock(1704067200.0)
+    previous = clock.set_clock(simulated)
+    yield simulated
+    clock.set_clock(previous)
+
+
+def test_ttl_follows_the_active_clock(simulated):
+    loads = []
+    cache = StaleWhileRevalidate(lambda previous: loads.append(1) or len(loads), ttl=60)
+
+    assert cache.get() == 1
+    simulated.advance(59)
+    assert not cache.is_stale()
+    simulated.advance(1)
+    assert cache.is_stale()
+    assert cache.refresh() == 2
+    assert cache.get_status()['age_seconds'] == 0
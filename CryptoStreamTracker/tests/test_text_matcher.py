@@ -0,0 +1,36 @@
+import pytest
+
+from text_matcher import LexiconMatcher
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return LexiconMatcher()
+
+
+@pytest.mark.parametrize('text', [
+    'The band played at the Bitcoin conference',
+    'Ball bearing maker adds Bitcoin to its treasury',
+    'Bank opens a second branch',
+])
+def test_unrelated_words_sharing_a_prefix_do_not_match(matcher, text):
+    counts = matcher.match(text).counts
+    assert counts['negative'] == 0
+    assert counts['regulation'] == 0
+
+
+@pytest.mark.parametrize('text, term_lexicon', [
+    ('Dropped', 'negative'),
+    ('Exchange banned in three countries', 'negative'),
+    ('Bears take control', 'negative'),
+    ('Prices rallied overnight', 'positive'),
+])
+def test_declared_inflections_match(matcher, text, term_lexicon):
+    assert matcher.match(text).counts[term_lexicon] == 1
+
+
+def test_a_term_is_not_claimed_by_another_terms_inflection(matcher):
+    # "launched" es un término neutral propio, no solo la flexión de "launch"
+    counts = matcher.match('Protocol launched').counts
+    assert counts['neutral'] == 1
+    assert counts['positive'] == 0
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from voice_system import VoiceSystem
+
+
+@pytest.fixture
+def voice(tmp_path):
+    voice = VoiceSystem(cache_dir=str(tmp_path / 'voice_cache'), backend='tone')
+    yield voice
+    voice.stop()
+
+
+def test_failed_sentences_are_skipped(voice):
+    synthesize = voice.synthesize_cached
+
+    def flaky(segments):
+        if segments[0].startswith('Dos'):
+            raise TimeoutError('render stuck')
+        path = synthesize(segments)
+        if segments[0].startswith('Tres'):
+            os.remove(path)  # expulsado de la caché antes de leerlo
+        return path
+
+    voice.synthesize_cached = flaky
+    chunks = list(voice.stream_speech('Uno bitcoin. Dos ethereum. Tres solana. Cuatro cardano.'))
+
+    assert chunks[0].startswith(b'RIFF')
+    # Cabecera, audio de 'Uno', pausa y audio de 'Cuatro'
+    assert len(chunks) == 4
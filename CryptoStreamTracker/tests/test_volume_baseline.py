@@ -0,0 +1,55 @@
+import math
+import os
+import random
+
+import pytest
+
+from volume_baseline import VolumeBaseline
+
+
+def feed(baseline, step, seconds, volume, start=0.0):
+    """Registra ticks cada `step` segundos con precio que alterna para que cada tick sea nuevo"""
+    t = start
+    while t < start + seconds:
+        baseline.update('btc', volume, 100.0 + (t / step) % 2, now=t)
+        t += step
+    return t
+
+
+@pytest.mark.parametrize('step', [15, 300])
+def test_memory_follows_half_life_not_poll_cadence(tmp_path, step):
+    baseline = VolumeBaseline(str(tmp_path / 'baseline.json'), half_life_hours=6)
+    end = feed(baseline, step, 24 * 3600, 1e6)
+    # Tras una vida media con el volumen duplicado, la media logarítmica está a mitad de camino
+    feed(baseline, step, 6 * 3600, 2e6, start=end)
+    typical = baseline.get_baseline('btc')['typical_volume']
+    assert math.log(typical / 1e6) / math.log(2) == pytest.approx(0.5, abs=0.03)
+
+
+def test_save_is_throttled(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    baseline = VolumeBaseline(path, save_interval=3600)
+    baseline.update('btc', 1e6, 100.0, now=0)
+    baseline.save()
+    assert not os.path.exists(path)
+    baseline.save(force=True)
+    assert 'btc' in VolumeBaseline(path).state
+
+
+def test_flat_noisy_volume_never_surges_through_warm_up(tmp_path):
+    baseline = VolumeBaseline(str(tmp_path / 'baseline.json'), half_life_hours=6)
+    rng = random.Random(7)
+    warm_scores = []
+    for i in range(12 * 60):
+        warm = baseline.is_warm('btc')
+        # ±0.2% de ruido alrededor de un volumen plano, un tick por minuto
+        scores = baseline.update('btc', 1e6 * (1 + rng.uniform(-0.002, 0.002)), 100.0 + i % 2, now=i * 60.0)
+        if warm and scores:
+            warm_scores.append(scores[0])
+
+    # El calentamiento dura una vida media aunque ya haya más de min_samples ticks
+    assert len(warm_scores) == pytest.approx(6 * 60, abs=2)
+    assert max(abs(z) for z in warm_scores) < 3.0
+
+    volume_z, _ = baseline.update('btc', 2e6, 100.5, now=12 * 3600.0)
+    assert volume_z > 4.5
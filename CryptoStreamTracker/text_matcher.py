@@ -0,0 +1,247 @@
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crypto_service import SUPPORTED_COINS
+
+# Léxicos compartidos por ExternalSources, CharlyNews y Sentinella
+LEXICONS = {
+    'positive': [
+        'bullish', 'moon', 'pump', 'rally', 'surge', 'breakthrough', 'adoption',
+        'partnership', 'upgrade', 'launch', 'success', 'milestone', 'growth',
+        'positive', 'gain', 'rise', 'increase', 'buy', 'bull', 'rocket'
+    ],
+    'negative': [
+        'bearish', 'crash', 'dump', 'drop', 'fall', 'decline', 'hack', 'scam',
+        'regulation', 'ban', 'fear', 'uncertainty', 'sell', 'bear', 'panic',
+        'negative', 'loss', 'decrease', 'risk', 'warning', 'concern'
+    ],
+    'news_positive': ['rally', 'surge', 'adoption', 'partnership', 'upgrade', 'bullish'],
+    'news_negative': ['crash', 'hack', 'regulation', 'ban', 'bearish', 'decline'],
+    'regulation': ['regulation', 'sec', 'law', 'legal', 'government'],
+    'technology': ['upgrade', 'protocol', 'blockchain', 'technology'],
+    'market': ['price', 'market', 'trading', 'rally', 'crash'],
+    'adoption': ['adoption', 'partnership', 'integration', 'accept'],
+    'security': ['hack', 'security', 'breach', 'exploit'],
+    'bias': [
+        'moon', 'crash', 'explode', 'rocket', 'pump', 'dump',
+        'shocking', 'amazing', 'incredible', 'unbelievable',
+        'secret', 'hidden', 'exposed', 'revealed'
+    ],
+    'neutral': [
+        'analysis', 'report', 'study', 'data', 'research',
+        'announced', 'launched', 'released', 'updated'
+    ]
+}
+
+# Nombres alternativos de monedas del registro
+COIN_ALIASES = {
+    'xrp': ['ripple']
+}
+
+# Formas flexionadas declaradas por término. Sin reglas de sufijos: "band" no es "ban",
+# "bearing" no es "bear" y "dropped" sí es "drop". Los términos sin entrada solo
+# coinciden tal cual.
+INFLECTIONS = {
+    'moon': ('moons', 'mooned', 'mooning'),
+    'pump': ('pumps', 'pumped', 'pumping'),
+    'rally': ('rallies', 'rallied', 'rallying'),
+    'surge': ('surges', 'surged', 'surging'),
+    'breakthrough': ('breakthroughs',),
+    'partnership': ('partnerships',),
+    'upgrade': ('upgrades', 'upgraded', 'upgrading'),
+    'launch': ('launches', 'launched', 'launching'),
+    'success': ('successes',),
+    'milestone': ('milestones',),
+    'gain': ('gains', 'gained', 'gaining'),
+    'rise': ('rises', 'rising', 'rose', 'risen'),
+    'increase': ('increases', 'increased', 'increasing'),
+    'buy': ('buys', 'buying', 'bought'),
+    'bull': ('bulls',),
+    'rocket': ('rockets', 'rocketed', 'rocketing'),
+    'crash': ('crashes', 'crashed', 'crashing'),
+    'dump': ('dumps', 'dumped', 'dumping'),
+    'drop': ('drops', 'dropped', 'dropping'),
+    'fall': ('falls', 'fell', 'falling', 'fallen'),
+    'decline': ('declines', 'declined', 'declining'),
+    'hack': ('hacks', 'hacked', 'hacking'),
+    'scam': ('scams', 'scammed', 'scamming'),
+    'regulation': ('regulations',),
+    'ban': ('bans', 'banned', 'banning'),
+    'fear': ('fears', 'feared', 'fearing'),
+    'uncertainty': ('uncertainties',),
+    'sell': ('sells', 'selling', 'sold'),
+    'bear': ('bears',),
+    'panic': ('panics', 'panicked', 'panicking'),
+    'loss': ('losses',),
+    'decrease': ('decreases', 'decreased', 'decreasing'),
+    'risk': ('risks', 'risked', 'risking'),
+    'warning': ('warnings',),
+    'concern': ('concerns', 'concerned'),
+    'law': ('laws',),
+    'government': ('governments',),
+    'protocol': ('protocols',),
+    'blockchain': ('blockchains',),
+    'technology': ('technologies',),
+    'price': ('prices',),
+    'market': ('markets',),
+    'integration': ('integrations',),
+    'accept': ('accepts', 'accepted', 'accepting'),
+    'breach': ('breaches', 'breached'),
+    'exploit': ('exploits', 'exploited'),
+    'explode': ('explodes', 'exploded', 'exploding'),
+    'report': ('reports', 'reported'),
+    'study': ('studies',),
+}
+
+WORD_PATTERN = re.compile(r'[A-Za-z]+')
+
+
+@dataclass
+class MatchResult:
+    counts: Dict[str, int]
+    mentions: List[str]
+
+
+class LexiconMatcher:
+    """Evalúa todos los léxicos y menciones de monedas en una sola pasada por texto.
+
+    Los léxicos se compilan al construir el matcher en una tabla forma -> término
+    (con las flexiones declaradas en INFLECTIONS), de modo que cada palabra del texto cuesta una búsqueda
+    en diccionario sin importar cuántos léxicos haya. Los términos se comparan por
+    palabra completa y sin distinguir mayúsculas; los tickers (BTC, LINK, DOT...)
+    solo en mayúsculas para no confundirlos con palabras comunes.
+    """
+
+    def __init__(self, lexicons: Dict[str, List[str]] = None, coins: List[Dict] = None,
+                 inflections: Dict[str, Tuple[str, ...]] = None):
+        lexicons = lexicons or LEXICONS
+        inflections = inflections if inflections is not None else INFLECTIONS
+        coins = coins if coins is not None else SUPPORTED_COINS
+        self.lexicon_names = list(lexicons)
+
+        # término -> léxicos que lo contienen
+        self.term_lexicons: Dict[str, Tuple[str, ...]] = {}
+        for name, words in lexicons.items():
+            for word in words:
+                word = word.lower()
+                self.term_lexicons[word] = self.term_lexicons.get(word, ()) + (name,)
+
+        # forma flexionada -> término base; si un término coincide con otra forma, gana el término
+        self.forms: Dict[str, str] = {}
+        for term in self.term_lexicons:
+            for form in inflections.get(term, ()):
+                self.forms.setdefault(form, term)
+        for term in self.term_lexicons:
+            self.forms[term] = term
+
+        # nombre de moneda -> símbolo; los tickers se comparan tal cual (mayúsculas)
+        self.name_symbols: Dict[str, str] = {}
+        self.tickers = set()
+        for coin in coins:
+            symbol = coin['symbol'].upper()
+            self.tickers.add(symbol)
+            self.name_symbols[coin['name'].lower()] = symbol
+            for alias in COIN_ALIASES.get(coin['symbol'].lower(), []):
+                self.name_symbols[alias] = symbol
+
+        self.vocabulary = frozenset(self.forms) | frozenset(self.name_symbols)
+
+    def match(self, text: str) -> MatchResult:
+        """Cuenta términos distintos por léxico y extrae menciones en una sola pasada"""
+        counts = dict.fromkeys(self.lexicon_names, 0)
+        if not text:
+            return MatchResult(counts=counts, mentions=[])
+
+        # Una tokenización por texto; los cruces con el vocabulario son intersecciones de sets
+        tokens = set(WORD_PATTERN.findall(text))
+        mentions = tokens & self.tickers
+        hits = set(' '.join(tokens).lower().split()) & self.vocabulary
+
+        terms = set(map(self.forms.get, hits))
+        terms.discard(None)
+        for term in terms:
+            for lexicon in self.term_lexicons[term]:
+                counts[lexicon] += 1
+
+        mentions.update(map(self.name_symbols.get, hits))
+        mentions.discard(None)
+        return MatchResult(counts=counts, mentions=sorted(mentions))
+
+    def score_batch(self, texts: Iterable[str]) -> List[MatchResult]:
+        """Evalúa un lote de textos, una pasada por texto"""
+        return [self.match(text) for text in texts]
+
+    @staticmethod
+    def sentiment(counts: Dict[str, int], positive: str = 'positive', negative: str = 'negative') -> str:
+        """Clasifica el sentimiento comparando dos léxicos"""
+        if counts[positive] > counts[negative]:
+            return 'positive'
+        elif counts[negative] > counts[positive]:
+            return 'negative'
+        return 'neutral'
+
+
+_default_matcher: Optional[LexiconMatcher] = None
+
+
+def get_matcher() -> LexiconMatcher:
+    """Matcher compartido, compilado una sola vez por proceso"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = LexiconMatcher()
+    return _default_matcher
+
+
+def _legacy_score(text: str) -> tuple:
+    """Ruta anterior: una comprobación de subcadena por palabra, léxico y símbolo"""
+    text_lower = text.lower()
+    text_upper = text.upper()
+    counts = {name: sum(1 for word in words if word in text_lower) for name, words in LEXICONS.items()}
+    mentions = [coin['symbol'].upper() for coin in SUPPORTED_COINS if coin['symbol'].upper() in text_upper]
+    mentions += [coin['name'].upper() for coin in SUPPORTED_COINS if coin['name'].lower() in text_lower]
+    return counts, list(set(mentions))
+
+
+def benchmark(headlines: int = 100000, seed: int = 11) -> Dict:
+    """Compara la ruta de subcadenas anterior con el matcher compilado"""
+    rng = random.Random(seed)
+    lexicon_terms = [w for words in LEXICONS.values() for w in words]
+    filler = [
+        'the', 'of', 'as', 'to', 'in', 'on', 'for', 'with', 'after', 'amid', 'says', 'new',
+        'second', 'bank', 'network', 'investors', 'week', 'traders', 'record', 'fund', 'ETF',
+        'exchange', 'million', 'billion', 'first', 'holders', 'whales', 'method', 'doted',
+        'BTC', 'ETH', 'SOL', 'Bitcoin', 'Ethereum', 'Solana', 'LINK', 'XRP'
+    ]
+    # Titulares de 6-14 palabras con ~20% de términos de léxico, como en los feeds reales
+    texts = [
+        ' '.join(rng.choice(lexicon_terms) if rng.random() < 0.2 else rng.choice(filler)
+                 for _ in range(rng.randint(6, 14)))
+        for _ in range(headlines)
+    ]
+
+    start = time.perf_counter()
+    for text in texts:
+        _legacy_score(text)
+    legacy = time.perf_counter() - start
+
+    matcher = LexiconMatcher()
+    start = time.perf_counter()
+    matcher.score_batch(texts)
+    compiled = time.perf_counter() - start
+
+    return {
+        'headlines': headlines,
+        'legacy_seconds': round(legacy, 3),
+        'compiled_seconds': round(compiled, 3),
+        'legacy_per_second': round(headlines / legacy),
+        'compiled_per_second': round(headlines / compiled),
+        'lexicons_evaluated': len(matcher.lexicon_names)
+    }
+
+
+if __name__ == "__main__":
+    print("Benchmark de matcher de sentimiento/menciones:")
+    print(benchmark())
@@ -2,19 +2,50 @@ import pyttsx3
 import logging
 from gtts import gTTS
 import os
+import shutil
+import subprocess
+import sys
 import tempfile
 import threading
-from typing import Optional
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Union
 import time
+from audio_cache import AudioCache, wav_stream_header
+from speech_backends import BACKENDS
+from speech_normalizer import SpeechNormalizer, split_sentences
+from speech_queue import SpeechQueue
 
 class VoiceSystem:
     """Sistema de respuestas habladas para el asistente cripto"""
     
-    def __init__(self):
+    def __init__(self, queue_size: int = 32, coalesce_window: float = 60.0,
+                 cache_dir: str = 'voice_cache', cache_max_bytes: int = 50 * 1024 * 1024,
+                 backend: Optional[str] = None):
         self.tts_engine = None
+        self.voice_id = ''
+        self.rate = 180
         self.voice_enabled = True
         self.language = 'es'
+        self._engine_lock = threading.Lock()
+        self.normalizer = SpeechNormalizer()
         self.initialize_engine()
+        # Backend alternativo para renderizar a archivo (p. ej. 'tone', local y sin dependencias)
+        self.backend = None
+        if backend:
+            if backend in BACKENDS:
+                self.backend = BACKENDS[backend]()
+                self.voice_id = self.backend.name
+            else:
+                logging.warning(f"Unknown voice backend '{backend}'; using pyttsx3")
+        # WAV ya sintetizados: los mensajes repetidos se reproducen sin volver a sintetizar
+        self.audio_cache = AudioCache(cache_dir, cache_max_bytes)
+        self.player = self._find_player()
+        # Un solo hilo de síntesis (pyttsx3 no es reentrante) con cola de prioridad acotada
+        self.queue = SpeechQueue(self._speak_sync, maxsize=queue_size, coalesce_window=coalesce_window)
+        # Síntesis por adelantado de las frases que se envían por streaming al navegador
+        self.render_executor = ThreadPoolExecutor(1, thread_name_prefix='voice-render')
     
     def initialize_engine(self):
         """Inicializa el motor de síntesis de voz"""
@@ -33,9 +64,10 @@ class VoiceSystem:
             
             if spanish_voice:
                 self.tts_engine.setProperty('voice', spanish_voice)
+                self.voice_id = spanish_voice
             
             # Configurar velocidad y volumen
-            self.tts_engine.setProperty('rate', 180)  # Palabras por minuto
+            self.tts_engine.setProperty('rate', self.rate)  # Palabras por minuto
             self.tts_engine.setProperty('volume', 0.8)  # Volumen (0.0 a 1.0)
             
             logging.info("Voice engine initialized successfully")
@@ -44,8 +76,12 @@ class VoiceSystem:
             logging.error(f"Error initializing voice engine: {str(e)}")
             self.tts_engine = None
     
-    def speak_text(self, text: str, async_mode: bool = True) -> bool:
-        """Convierte texto a voz usando pyttsx3 (offline)"""
+    def speak_text(self, text: str, async_mode: bool = True, priority: str = 'normal') -> bool:
+        """Convierte texto a voz usando pyttsx3 (offline).
+
+        Todo pasa por la cola de síntesis; priority es 'critical', 'alert', 'normal'
+        o 'summary'. En modo síncrono espera a que el worker lo diga.
+        """
         if not self.voice_enabled or not text:
             return False
         
@@ -53,31 +89,166 @@ class VoiceSystem:
             # Limpiar texto para TTS
             clean_text = self.clean_text_for_speech(text)
             
+            # La coalescencia se decide sobre el texto original, donde las cifras siguen siendo dígitos
+            future = self.queue.put(text, priority, payload=clean_text)
             if async_mode:
-                # Ejecutar en hilo separado para no bloquear
-                thread = threading.Thread(target=self._speak_sync, args=(clean_text,))
-                thread.daemon = True
-                thread.start()
                 return True
-            else:
-                return self._speak_sync(clean_text)
+            return future.result()
                 
         except Exception as e:
             logging.error(f"Error in speak_text: {str(e)}")
             return False
     
-    def _speak_sync(self, text: str) -> bool:
-        """Ejecuta síntesis de voz sincronizada"""
+    def speak_template(self, segments: Sequence[str], async_mode: bool = True, priority: str = 'normal') -> bool:
+        """Dice un mensaje con plantilla armado a partir de fragmentos.
+
+        Cada fragmento (partes fijas y valores) se cachea por separado, así que un
+        mensaje nuevo solo sintetiza los fragmentos que no se han dicho antes.
+        """
+        if not self.voice_enabled or not segments:
+            return False
+        
+        try:
+            clean_segments = [self.clean_text_for_speech(segment) for segment in segments]
+            clean_segments = [segment for segment in clean_segments if segment]
+            future = self.queue.put(' '.join(segments), priority, payload=clean_segments)
+            if async_mode:
+                return True
+            return future.result()
+        
+        except Exception as e:
+            logging.error(f"Error in speak_template: {str(e)}")
+            return False
+    
+    def _speak_sync(self, speech: Union[str, List[str]]) -> bool:
+        """Ejecuta síntesis de voz sincronizada (desde el worker de la cola)"""
+        segments = [speech] if isinstance(speech, str) else list(speech)
         try:
+            if self.player:
+                path = self.synthesize_cached(segments)
+                if path:
+                    return self._play_wav(path)
             if self.tts_engine:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
+                with self._engine_lock:
+                    self.tts_engine.say(' '.join(segments))
+                    self.tts_engine.runAndWait()
                 return True
             return False
         except Exception as e:
             logging.error(f"Error in speech synthesis: {str(e)}")
             return False
     
+    def _cache_key(self, text: str) -> str:
+        return AudioCache.key(text, self.voice_id, self.rate, self.language)
+    
+    def render_to_file(self, text: str, path: str) -> bool:
+        """Sintetiza texto a un archivo WAV con el backend configurado o pyttsx3"""
+        if self.backend:
+            return self.backend.render(text, path)
+        if not self.tts_engine:
+            return False
+        with self._engine_lock:
+            self.tts_engine.save_to_file(text, path)
+            self.tts_engine.runAndWait()
+        return os.path.exists(path)
+    
+    def synthesize_cached(self, segments: Sequence[str]) -> Optional[str]:
+        """WAV del mensaje desde la caché, uniendo fragmentos cacheados si hace falta"""
+        if len(segments) > 1:
+            full_key = self._cache_key(' '.join(segments))
+            path = self.audio_cache.get(full_key)
+            if path:
+                return path
+        
+        paths = []
+        for segment in segments:
+            path = self.audio_cache.get_or_render(
+                self._cache_key(segment), lambda target, text=segment: self.render_to_file(text, target)
+            )
+            if not path:
+                return None
+            paths.append(path)
+        
+        if len(paths) == 1:
+            return paths[0]
+        return self.audio_cache.stitch(full_key, paths)
+    
+    def stream_speech(self, text: str, lookahead: int = 2, max_sentences: int = 60) -> Iterator[bytes]:
+        """Audio WAV de text por frases, para enviarlo con transferencia por bloques.
+
+        Las frases se sintetizan (o se leen de la caché) en el hilo de render con
+        `lookahead` frases de ventaja, así la primera se envía mientras se sintetizan
+        las siguientes. Si el cliente se desconecta se cancela lo pendiente.
+        """
+        sentences = [self.clean_text_for_speech(sentence) for sentence in split_sentences(text)]
+        sentences = iter([sentence for sentence in sentences if sentence][:max_sentences])
+        pending = deque()
+        
+        def schedule():
+            while len(pending) < lookahead:
+                sentence = next(sentences, None)
+                if sentence is None:
+                    return
+                pending.append(self.render_executor.submit(self.synthesize_cached, [sentence]))
+        
+        params = None
+        try:
+            schedule()
+            while pending:
+                future = pending.popleft()
+                try:
+                    path = future.result(timeout=120)
+                    if path:
+                        with wave.open(path, 'rb') as wav:
+                            current = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+                            frames = wav.readframes(wav.getnframes())
+                except Exception as e:
+                    # Render colgado o fallido, o la caché expulsó el WAV antes de leerlo: se salta la frase
+                    logging.warning(f"Skipping sentence in speech stream: {type(e).__name__}: {str(e)}")
+                    future.cancel()
+                    path = None
+                schedule()
+                if not path:
+                    continue
+                if params is None:
+                    params = current
+                    yield wav_stream_header(*params)
+                elif current != params:
+                    logging.warning(f"Skipping sentence with audio format {current}, stream is {params}")
+                    continue
+                else:
+                    # Pausa breve entre frases
+                    channels, sampwidth, rate = params
+                    yield b'\x00' * (int(rate * 0.15) * channels * sampwidth)
+                for start in range(0, len(frames), 64 * 1024):
+                    yield frames[start:start + 64 * 1024]
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _find_player() -> Optional[str]:
+        """Reproductor de WAV disponible; sin él se habla directamente con el motor"""
+        if sys.platform == 'win32':
+            return 'winsound'
+        for player in ('aplay', 'paplay', 'afplay'):
+            if shutil.which(player):
+                return player
+        return None
+    
+    def _play_wav(self, path: str) -> bool:
+        try:
+            if self.player == 'winsound':
+                import winsound
+                winsound.PlaySound(path, winsound.SND_FILENAME)
+            else:
+                subprocess.run([self.player, path], check=True, timeout=300,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except Exception as e:
+            logging.error(f"Error playing {path}: {str(e)}")
+            return False
+    
     def speak_with_gtts(self, text: str, save_file: bool = False) -> Optional[str]:
         """Genera audio usando Google TTS (requiere internet)"""
         if not self.voice_enabled or not text:
@@ -121,74 +292,18 @@ class VoiceSystem:
             logging.error(f"Error playing audio: {str(e)}")
     
     def clean_text_for_speech(self, text: str) -> str:
-        """Limpia texto para síntesis de voz"""
-        # Remover emojis y caracteres especiales
-        import re
-        
-        # Reemplazar emojis con descripciones
-        emoji_replacements = {
-            '🚨': 'alerta',
-            '📈': 'subida',
-            '📉': 'bajada',
-            '💰': 'dinero',
-            '🔴': 'rojo',
-            '🟢': 'verde',
-            '⚠️': 'advertencia',
-            '🔥': 'fuego',
-            '🌙': 'luna',
-            '🚀': 'cohete',
-            '💎': 'diamante',
-            '📊': 'gráfico',
-            '🔍': 'análisis',
-            '✅': 'correcto',
-            '❌': 'error',
-            '📰': 'noticias',
-            '🌐': 'internet',
-            '💡': 'idea'
-        }
-        
-        clean_text = text
-        for emoji, replacement in emoji_replacements.items():
-            clean_text = clean_text.replace(emoji, f' {replacement} ')
-        
-        # Remover caracteres especiales excepto puntuación básica
-        clean_text = re.sub(r'[^\w\s.,;:!?¿¡\-()]', ' ', clean_text)
-        
-        # Limpiar espacios múltiples
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        
-        # Reemplazar abreviaciones comunes
-        replacements = {
-            'BTC': 'Bitcoin',
-            'ETH': 'Ethereum',
-            'ADA': 'Cardano',
-            'SOL': 'Solana',
-            'XRP': 'Ripple',
-            'DOT': 'Polkadot',
-            'DOGE': 'Dogecoin',
-            'AVAX': 'Avalanche',
-            'LINK': 'Chainlink',
-            'BNB': 'Binance Coin',
-            'USD': 'dólares',
-            '24h': 'veinticuatro horas',
-            '%': 'por ciento',
-            'API': 'A P I',
-            'vs': 'versus'
-        }
-        
-        for abbr, full in replacements.items():
-            clean_text = clean_text.replace(abbr, full)
-        
-        return clean_text
+        """Limpia texto para síntesis de voz (emojis, números, porcentajes y abreviaturas)"""
+        return self.normalizer.normalize(text)
     
-    def speak_alert(self, alert_message: str) -> bool:
+    def speak_alert(self, alert_message: str, severity: str = 'high') -> bool:
         """Reproduce alerta de voz específica"""
         try:
             # Prefijo para alertas
             alert_prefix = "Alerta de criptomonedas. "
             full_message = alert_prefix + alert_message
             
-            return self.speak_text(full_message, async_mode=True)
+            priority = 'critical' if severity == 'critical' else 'alert'
+            return self.speak_text(full_message, async_mode=True, priority=priority)
             
         except Exception as e:
             logging.error(f"Error speaking alert: {str(e)}")
@@ -197,12 +312,10 @@ class VoiceSystem:
     def speak_price_update(self, crypto_name: str, price: float, change: float) -> bool:
         """Anuncia actualización de precio"""
         try:
-            if change >= 0:
-                message = f"{crypto_name} está en {price:.2f} dólares, con una subida del {change:.2f} por ciento"
-            else:
-                message = f"{crypto_name} está en {price:.2f} dólares, con una bajada del {abs(change):.2f} por ciento"
+            direction = "dólares, con una subida del" if change >= 0 else "dólares, con una bajada del"
+            segments = [crypto_name, "está en", f"{price:.2f}", direction, f"{abs(change):.2f}", "por ciento"]
             
-            return self.speak_text(message, async_mode=True)
+            return self.speak_template(segments, async_mode=True)
             
         except Exception as e:
             logging.error(f"Error speaking price update: {str(e)}")
@@ -225,7 +338,7 @@ class VoiceSystem:
             
             if important_lines:
                 speech_text = ". ".join(important_lines[:3])  # Solo las 3 primeras
-                return self.speak_text(speech_text, async_mode=True)
+                return self.speak_text(speech_text, async_mode=True, priority='summary')
             
             return False
             
@@ -254,5 +367,14 @@ class VoiceSystem:
             'enabled': self.voice_enabled,
             'engine_available': self.tts_engine is not None,
             'language': self.language,
-            'engine_type': 'pyttsx3' if self.tts_engine else 'none'
-        }
\ No newline at end of file
+            'engine_type': 'pyttsx3' if self.tts_engine else 'none',
+            'render_backend': self.backend.name if self.backend else ('pyttsx3' if self.tts_engine else 'none'),
+            'queue': self.queue.get_status(),
+            'player': self.player,
+            'audio_cache': self.audio_cache.get_status()
+        }
+    
+    def stop(self):
+        """Detiene el worker de la cola y el hilo de render"""
+        self.queue.stop()
+        self.render_executor.shutdown(wait=False, cancel_futures=True)
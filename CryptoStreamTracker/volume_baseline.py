@@ -0,0 +1,166 @@
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import clock
+
+
+class VolumeBaseline:
+    """Línea base por cripto de volumen y retornos con media/varianza exponencial.
+
+    Cada tick actualiza en O(1) la media y varianza ponderadas exponencialmente
+    (forma incremental tipo Welford) del log-volumen 24h y del log-retorno del
+    precio por raíz de minuto. El peso de cada tick sale del tiempo transcurrido
+    desde el anterior y de una vida media en horas, así la memoria de la línea
+    base no depende de la cadencia del sondeo. La memoria es constante por cripto
+    y el estado se persiste en JSON cada save_interval segundos.
+
+    La varianza arranca en 0, que pesa como historia: con poco tiempo acumulado
+    queda subestimada y el ruido parece anómalo. Se corrige dividiendo por el peso
+    acumulado de las observaciones, y la línea base solo se considera caliente
+    cuando ese peso llega a min_weight (0.5 equivale a una vida media de historia).
+    """
+
+    def __init__(self, path: str = 'volume_baseline.json', half_life_hours: float = 24.0,
+                 min_samples: int = 30, min_weight: float = 0.5, save_interval: float = 300.0):
+        self.path = path
+        self.half_life = half_life_hours * 3600
+        self.min_samples = min_samples
+        self.min_weight = min_weight
+        self.save_interval = save_interval
+        self.state: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._last_save = clock.timestamp()
+        self.load()
+
+    def alpha(self, elapsed: float) -> float:
+        """Peso de un tick tras `elapsed` segundos: la mitad de la historia pesa tras una vida media"""
+        return 1 - 0.5 ** (max(0.0, elapsed) / self.half_life)
+
+    @staticmethod
+    def _ew_update(mean: float, var: float, x: float, alpha: float) -> Tuple[float, float]:
+        """Actualización incremental de media y varianza exponenciales"""
+        diff = x - mean
+        increment = alpha * diff
+        return mean + increment, (1 - alpha) * (var + diff * increment)
+
+    @staticmethod
+    def _zscore(x: float, mean: float, var: float) -> float:
+        std = math.sqrt(var)
+        return (x - mean) / std if std > 1e-12 else 0.0
+
+    def weight(self, s: Dict) -> float:
+        """Peso acumulado de las observaciones frente a la varianza inicial (0 al empezar, tiende a 1)"""
+        return self.alpha(s['last_ts'] - s['first_ts'])
+
+    def _variances(self, s: Dict) -> Tuple[float, float]:
+        """Varianzas de volumen y retorno corregidas por el sesgo del arranque en 0"""
+        weight = self.weight(s)
+        if weight <= 0:
+            return 0.0, 0.0
+        return s['vol_var'] / weight, s['ret_var'] / weight
+
+    def update(self, symbol: str, volume: float, price: float,
+               now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """Registra un tick y devuelve (z_volumen, z_retorno) contra la línea base previa.
+
+        Devuelve None si el tick no aporta información (volumen/precio no válidos o
+        el mismo snapshot ya registrado).
+        """
+        if volume <= 0 or price <= 0:
+            return None
+
+        log_volume = math.log(volume)
+        now = clock.timestamp() if now is None else now
+        with self._lock:
+            s = self.state.get(symbol)
+            if s is None:
+                self.state[symbol] = {
+                    'n': 1,
+                    'vol_mean': log_volume,
+                    'vol_var': 0.0,
+                    'ret_mean': 0.0,
+                    'ret_var': 0.0,
+                    'last_volume': volume,
+                    'last_price': price,
+                    'first_ts': now,
+                    'last_ts': now
+                }
+                return 0.0, 0.0
+
+            # El mismo snapshot evaluado dos veces no debe contar como tick nuevo
+            if s['last_volume'] == volume and s['last_price'] == price:
+                return None
+
+            # Estados guardados antes de la ponderación por tiempo no tienen last_ts, y los
+            # anteriores a la corrección de sesgo no tienen first_ts: su calentamiento se reinicia
+            s.setdefault('last_ts', now - 60)
+            s.setdefault('first_ts', s['last_ts'])
+            elapsed = now - s['last_ts']
+            if elapsed <= 0:
+                return None
+            # Retorno por raíz de minuto: comparable entre sondeos de 15 s y de 5 min
+            log_return = math.log(price / s['last_price']) / math.sqrt(elapsed / 60)
+            alpha = self.alpha(elapsed)
+
+            # Puntuar contra la línea base antes de incorporar la observación
+            vol_var, ret_var = self._variances(s)
+            volume_z = self._zscore(log_volume, s['vol_mean'], vol_var)
+            return_z = self._zscore(log_return, s['ret_mean'], ret_var)
+
+            s['vol_mean'], s['vol_var'] = self._ew_update(s['vol_mean'], s['vol_var'], log_volume, alpha)
+            s['ret_mean'], s['ret_var'] = self._ew_update(s['ret_mean'], s['ret_var'], log_return, alpha)
+            s['n'] += 1
+            s['last_volume'] = volume
+            s['last_price'] = price
+            s['last_ts'] = now
+
+            return volume_z, return_z
+
+    def is_warm(self, symbol: str) -> bool:
+        """Indica si la cripto tiene suficientes muestras e historia para confiar en el z-score"""
+        s = self.state.get(symbol)
+        return (s is not None and s['n'] > self.min_samples and 'first_ts' in s
+                and self.weight(s) >= self.min_weight)
+
+    def get_baseline(self, symbol: str) -> Optional[Dict]:
+        """Obtiene la línea base actual de una cripto en unidades de volumen"""
+        s = self.state.get(symbol)
+        if not s:
+            return None
+        vol_var, ret_var = self._variances(s) if 'first_ts' in s else (s['vol_var'], s['ret_var'])
+        return {
+            'samples': s['n'],
+            'typical_volume': math.exp(s['vol_mean']),
+            'volume_log_std': math.sqrt(vol_var),
+            'return_std_per_sqrt_minute': math.sqrt(ret_var)
+        }
+
+    def save(self, force: bool = False):
+        """Guarda el estado de la línea base si pasó save_interval desde el último guardado (o si force)"""
+        now = clock.timestamp()
+        if not force and now - self._last_save < self.save_interval:
+            return
+        self._last_save = now
+        try:
+            with self._lock:
+                data = json.dumps(self.state)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Error guardando línea base de volumen: {str(e)}")
+
+    def load(self):
+        """Carga el estado de la línea base"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.state = json.load(f)
+        except Exception as e:
+            logging.error(f"Error cargando línea base de volumen: {str(e)}")
+            self.state = {}